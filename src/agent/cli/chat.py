@@ -59,6 +59,19 @@ Commands:
             print(f"Unknown command: {command}")
         return True
         
+    def stream_response(self, user_input: str):
+        """Print the response token by token, Ctrl+C stops generation early"""
+        print("\nJEFF: ", end="", flush=True)
+        stream = self.conversation.generate_response_stream(self.user_id, user_input)
+        try:
+            for token in stream:
+                print(token, end="", flush=True)
+        except KeyboardInterrupt:
+            print(" [interrupted]", end="")
+        finally:
+            stream.close()
+        print("\n")
+        
     def chat_loop(self):
         """Main chat loop"""
         self.print_banner()
@@ -85,11 +98,8 @@ Commands:
                         print(context)
                         print()
                 
-                # Generate response
-                response = self.conversation.generate_response(self.user_id, user_input)
-                
-                # Print response
-                print(f"\nJEFF: {response}\n")
+                # Stream response tokens as they are generated
+                self.stream_response(user_input)
                 
             except KeyboardInterrupt:
                 print("\nExiting...")
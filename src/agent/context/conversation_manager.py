@@ -1,64 +1,158 @@
-from typing import Dict, List, Any, Optional
+from typing import List, Optional, Iterator
 import logging
-from datetime import datetime
+import os
+import threading
 from src.agent.llm.ollama.client import OllamaAgent
 from src.memory.chroma.queries.storage import MemoryManager
+from src.memory.chroma.queries.retrieval import HybridRetriever, is_lexical_query
+from src.memory.chroma.queries.compaction import MemoryCompactor
+from src.agent.context.state.conversation_state import Message, SessionStore
 
 class ConversationManager:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.agent = OllamaAgent()
         self.memory = MemoryManager()
-        self.active_conversations: Dict[str, List[Dict[str, Any]]] = {}
+        
+        # The keyword index is held in memory and loaded from every stored row,
+        # so large collections only get it when MEMORY_LEXICAL_INDEX=true;
+        # without it retrieval is vector-only
+        self.retriever: Optional[HybridRetriever] = None
+        lexical_index = os.getenv("MEMORY_LEXICAL_INDEX", "auto").lower()
+        if lexical_index == "auto":
+            rows = self.memory.conversations.count() + self.memory.facts.count()
+            enabled = rows <= int(os.getenv("MEMORY_LEXICAL_INDEX_MAX_ROWS", "50000"))
+            if not enabled:
+                self.logger.info(f"Skipping lexical index for {rows} stored rows, set MEMORY_LEXICAL_INDEX=true to build it")
+        else:
+            enabled = lexical_index in ("1", "true", "yes")
+        if enabled:
+            self.retriever = HybridRetriever(self.memory, self.agent.get_embeddings)
+            
+        # Background folding of old exchanges into summaries, off by default
+        self.compactor = MemoryCompactor(self.memory, self.agent.summarize, self.agent.get_embeddings_batch)
+        if os.getenv("MEMORY_COMPACTION_ENABLED", "false").lower() in ("1", "true", "yes"):
+            self.compactor.start()
+            
+        # Bounded per-user history; evicted users spill to sqlite and are
+        # rehydrated from there or from Chroma on their next message
+        self.active_conversations = SessionStore(
+            max_sessions=int(os.getenv("SESSION_STORE_MAX_USERS", "10000")),
+            ttl=float(os.getenv("SESSION_STORE_TTL", "3600")),
+            max_messages=int(os.getenv("SESSION_STORE_MAX_MESSAGES", "50")),
+            db_path=os.getenv("SESSION_STORE_PATH", "./data/sessions.db") or None,
+            rehydrate=self._rehydrate_session
+        )
+        
+    def _rehydrate_session(self, user_id: str) -> List[Message]:
+        """Rebuild recent messages for a user from stored conversation rows"""
+        messages = []
+        for row in self.memory.recent_conversations(user_id, limit=5):
+            # Rows from before the numeric timestamp count as oldest
+            ts = (row["metadata"] or {}).get("ts", 0.0)
+            for line in row["text"].split("\n"):
+                role, sep, content = line.partition(": ")
+                if sep and role in ("USER", "ASSISTANT", "SYSTEM"):
+                    messages.append(Message(role.lower(), content, ts))
+                elif messages:
+                    # Continuation of a multi-line message
+                    messages[-1].content += "\n" + line
+        return messages
+        
+    def _resume_session(self, user_id: str):
+        """Seed the agent's prompt history for a user it no longer holds
+        
+        Only runs when the agent has no live session for the user (new,
+        evicted or restarted), so stored rows are read once per resumed
+        session rather than on every message.
+        """
+        if self.agent.has_session(user_id):
+            return
+        messages = self.active_conversations.get(user_id, create=True)
+        self.agent.seed_session(user_id, [{"role": m.role, "content": m.content} for m in messages])
         
     def add_message(self, user_id: str, content: str, role: str):
         """Add a message to the conversation history"""
-        if user_id not in self.active_conversations:
-            self.active_conversations[user_id] = []
-            
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat()
-        }
+        self.active_conversations.append(user_id, role, content)
         
-        self.active_conversations[user_id].append(message)
+    def add_exchange(
+        self,
+        user_id: str,
+        message: str,
+        response: str,
+        query_embedding: Optional[List[float]] = None
+    ):
+        """Record a user message and its reply, storing the exchange in memory once
         
-        # Get embedding for conversation and store in memory
-        if len(self.active_conversations[user_id]) >= 2:  # Store after exchange
-            conversation_text = "\n".join([
-                f"{msg['role'].upper()}: {msg['content']}"
-                for msg in self.active_conversations[user_id][-2:]  # Just the last exchange
-            ])
-            embedding = self.agent.get_embeddings(conversation_text)
+        The exchange is indexed under the embedding of the user message when
+        one was already computed for retrieval, so it costs no extra embedding
+        call; otherwise the exchange text is embedded once.
+        """
+        self.add_message(user_id, message, "user")
+        self.add_message(user_id, response, "assistant")
+        
+        exchange = [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": response}
+        ]
+        embedding = query_embedding
+        if not embedding:
+            embedding = self.agent.get_embeddings(
+                "\n".join(f"{msg['role'].upper()}: {msg['content']}" for msg in exchange)
+            )
+        if embedding:
+            self.memory.store_conversation(user_id, exchange, embedding)
             
-            if embedding:
-                self.memory.store_conversation(
-                    user_id,
-                    self.active_conversations[user_id][-2:],
-                    embedding
-                )
-                
-    def get_context(self, user_id: str, query: Optional[str] = None) -> Optional[str]:
+    def embed_query(self, query: str) -> Optional[List[float]]:
+        """Embedding for a retrieval query, None for tag/ticker-only queries
+        
+        Tag/ticker-only queries are still embedded when there is no lexical
+        index to answer them.
+        """
+        if self.retriever is not None and is_lexical_query(query):
+            return None
+        return self.agent.get_embeddings(query)
+        
+    def get_context(
+        self,
+        user_id: str,
+        query: Optional[str] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> Optional[str]:
         """Get relevant conversation context"""
         try:
             # If no query provided, use last message as query
-            if not query and user_id in self.active_conversations:
-                messages = self.active_conversations[user_id]
+            if not query:
+                messages = self.active_conversations.get(user_id)
                 if messages:
-                    query = messages[-1]["content"]
+                    query = messages[-1].content
                     
             if not query:
                 return None
                 
-            # Get embedding for query
-            query_embedding = self.agent.get_embeddings(query)
-            if not query_embedding:
-                return None
-                
-            # Search conversations and facts
-            conversations = self.memory.search_conversations(query_embedding, limit=2)
-            facts = self.memory.search_facts(query_embedding, limit=2)
+            # Search this user's conversations and the shared facts, fusing keyword
+            # and vector rankings; tag/ticker-only queries skip the embedding call
+            if self.retriever is not None:
+                results = self.retriever.search(
+                    query,
+                    collections=["conversations", "facts"],
+                    limits={"conversations": 2, "facts": 2},
+                    query_embedding=query_embedding,
+                    user_id=user_id
+                )
+            else:
+                if not query_embedding:
+                    query_embedding = self.agent.get_embeddings(query)
+                if not query_embedding:
+                    return None
+                results = self.memory.search(
+                    query_embedding,
+                    collections=["conversations", "facts"],
+                    limits={"conversations": 2, "facts": 2},
+                    user_id=user_id
+                )
+            conversations = [r for r in results if r["collection"] == "conversations"]
+            facts = [r for r in results if r["collection"] == "facts"]
             
             context_parts = []
             
@@ -83,15 +177,17 @@ class ConversationManager:
     def generate_response(self, user_id: str, message: str) -> str:
         """Generate a response using context"""
         try:
-            # Get relevant context
-            context = self.get_context(user_id, message)
+            self._resume_session(user_id)
+            
+            # Embed the message once, for retrieval and for storing the exchange
+            query_embedding = self.embed_query(message)
+            context = self.get_context(user_id, message, query_embedding)
             
             # Generate response
-            response = self.agent.generate_response(message, context)
+            response = self.agent.generate_response(message, context, session_id=user_id)
             
             # Store the exchange
-            self.add_message(user_id, message, "user")
-            self.add_message(user_id, response, "assistant")
+            self.add_exchange(user_id, message, response, query_embedding)
             
             return response
             
@@ -99,7 +195,40 @@ class ConversationManager:
             self.logger.error(f"Error generating response: {str(e)}")
             return "I encountered an error while processing your message."
             
+    def generate_response_stream(
+        self,
+        user_id: str,
+        message: str,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Iterator[str]:
+        """Generate a response using context, yielding tokens as they arrive"""
+        parts: List[str] = []
+        query_embedding = None
+        try:
+            self._resume_session(user_id)
+            
+            # Embed the message once, for retrieval and for storing the exchange
+            query_embedding = self.embed_query(message)
+            context = self.get_context(user_id, message, query_embedding)
+            
+            for token in self.agent.generate_response_stream(
+                message, context, cancel_event=cancel_event, session_id=user_id
+            ):
+                parts.append(token)
+                yield token
+                
+        except Exception as e:
+            self.logger.error(f"Error streaming response: {str(e)}")
+            if not parts:
+                yield "I encountered an error while processing your message."
+                return
+        finally:
+            # Store the exchange, including a partial reply if the caller stopped early
+            response = "".join(parts)
+            if response:
+                self.add_exchange(user_id, message, response, query_embedding)
+                
     def clear_conversation(self, user_id: str):
         """Clear conversation history for user"""
-        if user_id in self.active_conversations:
-            del self.active_conversations[user_id] 
\ No newline at end of file
+        self.active_conversations.pop(user_id)
+        self.agent.reset_session(user_id) 
\ No newline at end of file
@@ -0,0 +1,294 @@
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.utils.expiring_lru import ExpiringLRU
+
+class Message:
+    """Compact conversation message record
+    
+    Uses __slots__ and a float timestamp instead of a dict with an ISO string,
+    and interns the role so every record shares one copy of it. Supports
+    msg["role"] style access for code written against the old dict messages.
+    """
+    
+    __slots__ = ("role", "content", "ts")
+    
+    def __init__(self, role: str, content: str, ts: Optional[float] = None):
+        self.role = sys.intern(role)
+        self.content = content
+        self.ts = ts if ts is not None else time.time()
+        
+    def __getitem__(self, key: str) -> Any:
+        if key == "timestamp":
+            return datetime.fromtimestamp(self.ts).isoformat()
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+        
+    def to_dict(self) -> Dict[str, Any]:
+        return {"role": self.role, "content": self.content, "timestamp": self["timestamp"]}
+        
+    def size_bytes(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self.content) + sys.getsizeof(self.ts)
+
+class SessionStore:
+    """Bounded per-user message history
+    
+    Holds at most max_sessions users, each with their last max_messages
+    messages. Users idle for longer than ttl seconds, and the least recently
+    used users beyond max_sessions, are evicted. If db_path is set, evicted
+    sessions are spilled to sqlite. A miss is rehydrated from the spill file
+    first, then from the `rehydrate` callback (e.g. recent Chroma rows);
+    rehydration runs outside the store lock so one slow user does not stall
+    the others. pop() records when a user was cleared, and messages older
+    than that are never rehydrated again.
+    """
+    
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        ttl: float = 3600.0,
+        max_messages: int = 50,
+        db_path: Optional[str] = None,
+        rehydrate: Optional[Callable[[str], List[Message]]] = None
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.rehydrate = rehydrate
+        self._sessions: ExpiringLRU[str, Deque[Message]] = ExpiringLRU(max_sessions, ttl, on_evict=self._spill)
+        # Recent clears; older ones are only kept in the spill file, if any
+        self._cleared: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        
+        self.hits = 0
+        self.misses = 0
+        self.disk_rehydrations = 0
+        self.memory_rehydrations = 0
+        self.spills = 0
+        
+        if db_path:
+            self._open_db(db_path)
+            
+    def _open_db(self, db_path: str):
+        try:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS sessions (
+                    user_id TEXT PRIMARY KEY,
+                    messages TEXT NOT NULL,
+                    updated REAL NOT NULL
+                )"""
+            )
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS cleared (
+                    user_id TEXT PRIMARY KEY,
+                    cleared_at REAL NOT NULL
+                )"""
+            )
+            self._db.commit()
+        except Exception as e:
+            self.logger.error(f"Error opening session store at {db_path}: {str(e)}")
+            self._db = None
+            
+    def __len__(self) -> int:
+        return len(self._sessions)
+        
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._sessions
+        
+    def get(self, user_id: str, create: bool = False) -> List[Message]:
+        """Messages for a user, rehydrating evicted sessions; [] if unknown
+        
+        create=True keeps an empty session resident for an unknown user, so
+        the appends that follow do not look them up again.
+        """
+        with self._lock:
+            session = self._resident(user_id)
+            if session is not None:
+                return list(session)
+        messages, started = self._fetch(user_id)
+        with self._lock:
+            session = self._install(user_id, messages, started, create=create)
+            return list(session) if session is not None else []
+            
+    def append(self, user_id: str, role: str, content: str) -> List[Message]:
+        """Add a message and return the user's updated history"""
+        with self._lock:
+            session = self._resident(user_id)
+            if session is not None:
+                session.append(Message(role, content))
+                return list(session)
+        messages, started = self._fetch(user_id)
+        with self._lock:
+            session = self._install(user_id, messages, started, create=True)
+            session.append(Message(role, content))
+            return list(session)
+            
+    def pop(self, user_id: str):
+        """Forget a user entirely, including any spilled copy
+        
+        The clear time is kept, so the rehydrate callback cannot bring back
+        messages from before it.
+        """
+        now = time.time()
+        with self._lock:
+            self._sessions.pop(user_id)
+            self._cleared[user_id] = now
+            self._cleared.move_to_end(user_id)
+            while len(self._cleared) > self.max_sessions:
+                self._cleared.popitem(last=False)
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO cleared (user_id, cleared_at) VALUES (?, ?)", (user_id, now)
+                    )
+                    self._db.commit()
+            except Exception as e:
+                self.logger.error(f"Error deleting spilled session: {str(e)}")
+                
+    def _resident(self, user_id: str) -> Optional[Deque[Message]]:
+        """The in-memory session, refreshed as most recently used; called with the lock held"""
+        session = self._sessions.get(user_id)
+        if session is not None:
+            self.hits += 1
+        return session
+        
+    def _fetch(self, user_id: str) -> Tuple[List[Message], float]:
+        """Messages for a missed user from the spill file or the rehydrate callback
+        
+        Runs without the store lock. Returns the messages and the time the
+        fetch started, so a clear that lands meanwhile can discard them.
+        """
+        started = time.time()
+        with self._lock:
+            self.misses += 1
+        messages = self._read_spill(user_id)
+        source = "disk"
+        if not messages and self.rehydrate is not None:
+            source = "memory"
+            try:
+                messages = self.rehydrate(user_id)
+            except Exception as e:
+                self.logger.error(f"Error rehydrating session for {user_id}: {str(e)}")
+                messages = []
+                
+        cleared_at = self._cleared_at(user_id)
+        if cleared_at is not None:
+            messages = [m for m in messages if m.ts > cleared_at]
+        if messages:
+            with self._lock:
+                if source == "disk":
+                    self.disk_rehydrations += 1
+                else:
+                    self.memory_rehydrations += 1
+        return messages, started
+        
+    def _install(
+        self,
+        user_id: str,
+        messages: List[Message],
+        started: float,
+        create: bool
+    ) -> Optional[Deque[Message]]:
+        """Make fetched messages resident; called with the lock held"""
+        session = self._sessions.peek(user_id)
+        if session is not None:
+            # Another request loaded or started this session meanwhile
+            return self._resident(user_id)
+        if self._cleared.get(user_id, 0.0) >= started:
+            messages = []
+        if not messages and not create:
+            return None
+            
+        session = deque(messages, maxlen=self.max_messages)
+        self._sessions.set(user_id, session)
+        return session
+        
+    def _cleared_at(self, user_id: str) -> Optional[float]:
+        with self._lock:
+            cleared_at = self._cleared.get(user_id)
+        if cleared_at is not None or self._db is None:
+            return cleared_at
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT cleared_at FROM cleared WHERE user_id = ?", (user_id,)
+                ).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            self.logger.error(f"Error reading clear marker for {user_id}: {str(e)}")
+            return None
+            
+    def _spill(self, user_id: str, session: Deque[Message]):
+        if self._db is None:
+            return
+        try:
+            payload = json.dumps([[m.role, m.content, m.ts] for m in session])
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sessions (user_id, messages, updated) VALUES (?, ?, ?)",
+                    (user_id, payload, time.time())
+                )
+                self._db.commit()
+            self.spills += 1
+        except Exception as e:
+            self.logger.error(f"Error spilling session for {user_id}: {str(e)}")
+            
+    def _read_spill(self, user_id: str) -> List[Message]:
+        if self._db is None:
+            return []
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT messages FROM sessions WHERE user_id = ?", (user_id,)
+                ).fetchone()
+            if row is None:
+                return []
+            return [Message(role, content, ts) for role, content, ts in json.loads(row[0])]
+        except Exception as e:
+            self.logger.error(f"Error reading spilled session for {user_id}: {str(e)}")
+            return []
+            
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            messages = sum(len(session) for session in self._sessions.values())
+            approx_bytes = sum(m.size_bytes() for session in self._sessions.values() for m in session)
+            return {
+                "sessions": len(self._sessions),
+                "messages": messages,
+                "approx_bytes": approx_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_rehydrations": self.disk_rehydrations,
+                "memory_rehydrations": self.memory_rehydrations,
+                "lru_evictions": self._sessions.lru_evictions,
+                "ttl_evictions": self._sessions.ttl_evictions,
+                "spills": self.spills
+            }
+            
+    def close(self):
+        """Spill every resident session so it survives a restart"""
+        with self._lock:
+            for user_id, session in list(self._sessions.items()):
+                self._spill(user_id, session)
+            if self._db is not None:
+                with self._db_lock:
+                    self._db.close()
+                self._db = None
@@ -0,0 +1,263 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+from .config import (
+    GENERATE_ENDPOINT,
+    EMBEDDINGS_ENDPOINT,
+    EMBED_ENDPOINT,
+    EMBED_BATCH_SIZE,
+    MODEL_NAME,
+    DEFAULT_PARAMS,
+    REQUEST_TIMEOUT,
+    MAX_CONNECTIONS,
+    MAX_CONCURRENT_REQUESTS
+)
+from .utils.performance_monitor import PerformanceMonitor, default_monitor
+from .utils.vectors import l2_normalize
+
+class AsyncOllamaClient:
+    """Asyncio Ollama API client sharing one pooled HTTP connection
+    
+    Mirrors the OllamaClient surface (generate, generate_stream, get_embeddings)
+    so many chat and Twitter sessions can run concurrently in one event loop.
+    The connector bounds open sockets to the Ollama host, and a semaphore caps
+    how many requests are in flight at once.
+    """
+    
+    def __init__(
+        self,
+        max_connections: int = MAX_CONNECTIONS,
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+        timeout: float = REQUEST_TIMEOUT,
+        generate_endpoint: str = GENERATE_ENDPOINT,
+        embeddings_endpoint: str = EMBEDDINGS_ENDPOINT,
+        embed_endpoint: str = EMBED_ENDPOINT,
+        model: str = MODEL_NAME,
+        monitor: Optional[PerformanceMonitor] = None
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.monitor = monitor or default_monitor
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.generate_endpoint = generate_endpoint
+        self.embeddings_endpoint = embeddings_endpoint
+        self.embed_endpoint = embed_endpoint
+        self.batch_embed_supported: Optional[bool] = None
+        self.model = model
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        
+    async def __aenter__(self) -> "AsyncOllamaClient":
+        await self._get_session()
+        return self
+        
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Create the pooled session lazily so it binds to the running loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+        
+    def _request_timeout(self, timeout: Optional[float]) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(total=timeout if timeout is not None else self.timeout)
+        
+    def _build_payload(self, prompt: str, system_prompt: str, stream: bool, **kwargs) -> Dict[str, Any]:
+        params = DEFAULT_PARAMS.copy()
+        params.update(kwargs)
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "system": system_prompt,
+            "options": params,
+            "stream": stream
+        }
+        
+    async def close(self):
+        """Close the pooled session and its connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Optional[str]:
+        """Raw generate call to Ollama"""
+        try:
+            session = await self._get_session()
+            data = self._build_payload(prompt, system_prompt, False, **kwargs)
+            
+            async with self._semaphore:
+                started = time.monotonic()
+                async with session.post(
+                    self.generate_endpoint,
+                    json=data,
+                    timeout=self._request_timeout(timeout)
+                ) as response:
+                    response.raise_for_status()
+                    result = await response.json()
+                    
+            self.monitor.record(self.model, "generate", time.monotonic() - started, result)
+            return result.get("response", "")
+            
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.monitor.record(self.model, "generate", 0.0, error=True)
+            self.logger.error(f"Ollama async generate error: {str(e)}")
+            return None
+            
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Streaming generate call, yields response tokens as Ollama emits them"""
+        try:
+            session = await self._get_session()
+            data = self._build_payload(prompt, system_prompt, True, **kwargs)
+            
+            async with self._semaphore:
+                started = time.monotonic()
+                async with session.post(
+                    self.generate_endpoint,
+                    json=data,
+                    timeout=self._request_timeout(timeout)
+                ) as response:
+                    response.raise_for_status()
+                    
+                    # Ollama streams newline-delimited JSON objects
+                    async for line in response.content:
+                        line = line.strip()
+                        if not line:
+                            continue
+                            
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            raise RuntimeError(chunk["error"])
+                            
+                        token = chunk.get("response", "")
+                        if token:
+                            yield token
+                            
+                        if chunk.get("done"):
+                            self.monitor.record(self.model, "generate_stream", time.monotonic() - started, chunk)
+                            break
+                            
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception as e:
+            self.monitor.record(self.model, "generate_stream", 0.0, error=True)
+            self.logger.error(f"Ollama async stream error: {str(e)}")
+            
+    async def get_embeddings(self, text: str, timeout: Optional[float] = None) -> Optional[List[float]]:
+        """Get embeddings for text"""
+        try:
+            session = await self._get_session()
+            data = {
+                "model": self.model,
+                "prompt": text
+            }
+            
+            async with self._semaphore:
+                started = time.monotonic()
+                async with session.post(
+                    self.embeddings_endpoint,
+                    json=data,
+                    timeout=self._request_timeout(timeout)
+                ) as response:
+                    response.raise_for_status()
+                    result = await response.json()
+                    
+            self.monitor.record(self.model, "embeddings", time.monotonic() - started, result)
+            return l2_normalize(result.get("embedding"))
+            
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.monitor.record(self.model, "embeddings", 0.0, error=True)
+            self.logger.error(f"Ollama async embeddings error: {str(e)}")
+            return None
+            
+    async def get_embeddings_batch(
+        self,
+        texts: List[str],
+        batch_size: int = EMBED_BATCH_SIZE,
+        timeout: Optional[float] = None
+    ) -> List[Optional[List[float]]]:
+        """Get embeddings for many texts, returned in input order
+        
+        Uses /api/embed when available, otherwise fans out concurrent
+        /api/embeddings requests bounded by the client's concurrency cap.
+        Both paths return L2-normalized vectors.
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        
+        for start in range(0, len(texts), batch_size):
+            chunk = texts[start:start + batch_size]
+            
+            embeddings = None
+            if self.batch_embed_supported is not False:
+                embeddings = await self._embed_batch(chunk, timeout)
+            if embeddings is None:
+                embeddings = await asyncio.gather(
+                    *(self.get_embeddings(text, timeout) for text in chunk)
+                )
+                
+            results[start:start + len(chunk)] = embeddings
+            
+        return results
+        
+    async def _embed_batch(self, texts: List[str], timeout: Optional[float]) -> Optional[List[List[float]]]:
+        """Single round trip to /api/embed, None if the batch could not be embedded"""
+        try:
+            session = await self._get_session()
+            data = {
+                "model": self.model,
+                "input": texts
+            }
+            
+            async with self._semaphore:
+                started = time.monotonic()
+                async with session.post(
+                    self.embed_endpoint,
+                    json=data,
+                    timeout=self._request_timeout(timeout)
+                ) as response:
+                    if response.status == 404:
+                        # Older Ollama servers only have /api/embeddings
+                        self.logger.info("Ollama batch embed endpoint unavailable, using per-item requests")
+                        self.batch_embed_supported = False
+                        return None
+                    response.raise_for_status()
+                    result = await response.json()
+                    
+            embeddings = result.get("embeddings") or []
+            if len(embeddings) != len(texts):
+                raise ValueError(f"expected {len(texts)} embeddings, got {len(embeddings)}")
+                
+            self.monitor.record(self.model, "embed", time.monotonic() - started, result)
+            self.batch_embed_supported = True
+            return [l2_normalize(embedding) for embedding in embeddings]
+            
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.monitor.record(self.model, "embed", 0.0, error=True)
+            self.logger.error(f"Ollama async batch embeddings error: {str(e)}")
+            return None
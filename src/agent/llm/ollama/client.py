@@ -1,110 +1,558 @@
 import requests
 import json
-from typing import Dict, Any, Optional, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Iterator, Callable, Tuple
 import logging
 from .config import (
     GENERATE_ENDPOINT,
     EMBEDDINGS_ENDPOINT,
+    EMBED_ENDPOINT,
+    OLLAMA_HOST,
+    EMBED_BATCH_SIZE,
+    EMBED_MAX_WORKERS,
+    EMBEDDING_CACHE_SIZE,
+    EMBEDDING_CACHE_PATH,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+    ADMISSION_INITIAL_LIMIT,
+    ADMISSION_MIN_LIMIT,
+    ADMISSION_MAX_LIMIT,
+    ADMISSION_TARGET_LATENCY,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    SESSION_MODE,
+    ROUTER_ENABLED,
+    KV_CONTEXT_MAX_FILL,
+    SESSION_MAX_SESSIONS,
+    SESSION_TTL,
+    SESSION_HISTORY_MESSAGES,
+    RESPONSE_TOKEN_RESERVE,
+    TOKENIZER_FILE,
     MODEL_NAME,
     DEFAULT_PARAMS,
     AGENT_PROMPT
 )
+from .utils.embedding_cache import EmbeddingCache
+from .utils.response_cache import ResponseCache
+from .utils.token_counter import TokenCounter
+from .utils.rate_limiter import AdmissionController, AdmissionRejected, Priority, controller_for
+from .utils.performance_monitor import PerformanceMonitor, default_monitor
+from .utils.prompt_assembler import PromptAssembler, AssembledPrompt
+from .utils.vectors import l2_normalize
+from ..providers.base import ProviderError
+from src.utils.expiring_lru import ExpiringLRU
 
 class OllamaClient:
     """Low-level Ollama API client"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        response_cache: Optional[ResponseCache] = None,
+        admission: Optional[AdmissionController] = None,
+        host: Optional[str] = None,
+        model: Optional[str] = None,
+        monitor: Optional[PerformanceMonitor] = None
+    ):
         self.logger = logging.getLogger(__name__)
         self.session = requests.Session()
+        self.monitor = monitor or default_monitor
+        # Defaults to OLLAMA_HOST / OLLAMA_MODEL, overridable for multi-backend setups
+        self.host = (host or OLLAMA_HOST).rstrip("/")
+        self.model = model or MODEL_NAME
+        if host:
+            self.generate_endpoint = f"{self.host}/api/generate"
+            self.embeddings_endpoint = f"{self.host}/api/embeddings"
+            self.embed_endpoint = f"{self.host}/api/embed"
+        else:
+            self.generate_endpoint = GENERATE_ENDPOINT
+            self.embeddings_endpoint = EMBEDDINGS_ENDPOINT
+            self.embed_endpoint = EMBED_ENDPOINT
+        # Cached vectors are unit length, the ":l2" tag keeps entries written
+        # before normalization from being served
+        self.embedding_cache = embedding_cache or EmbeddingCache(
+            f"{self.model}:l2",
+            max_entries=EMBEDDING_CACHE_SIZE,
+            db_path=EMBEDDING_CACHE_PATH or None
+        )
+        # Completion cache is opt-in, it only serves deterministic requests
+        if response_cache is None and RESPONSE_CACHE_ENABLED:
+            response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+        self.response_cache = response_cache
+        # Caps in-flight generations and queues the rest by priority, shared by
+        # every client of this host
+        self.admission = admission or controller_for(
+            self.host,
+            initial_limit=ADMISSION_INITIAL_LIMIT,
+            min_limit=ADMISSION_MIN_LIMIT,
+            max_limit=ADMISSION_MAX_LIMIT,
+            target_latency=ADMISSION_TARGET_LATENCY,
+            max_queue=ADMISSION_MAX_QUEUE,
+            queue_timeout=ADMISSION_QUEUE_TIMEOUT or None
+        )
+        # None until we learn whether the server has the batched /api/embed endpoint
+        self.batch_embed_supported: Optional[bool] = None
         
-    def generate(self, prompt: str, system_prompt: str = "", **kwargs) -> Optional[str]:
+    def generate(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        priority: Priority = Priority.INTERACTIVE,
+        **kwargs
+    ) -> Optional[str]:
         """Raw generate call to Ollama"""
+        # Merge default params with any overrides
+        params = DEFAULT_PARAMS.copy()
+        params.update(kwargs)
+        
+        if self.response_cache is not None:
+            cached = self.response_cache.get(self.model, system_prompt, prompt, params)
+            if cached is not None:
+                return cached
+                
+        result = self.generate_raw(prompt, system_prompt, priority=priority, **kwargs)
+        if result is None:
+            return None
+            
+        text = result.get("response", "")
+        if self.response_cache is not None and text:
+            self.response_cache.put(self.model, system_prompt, prompt, params, text)
+            
+        return text
+        
+    def generate_raw(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        context: Optional[List[int]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        """Generate call returning Ollama's full response body
+        
+        Besides the text this includes the KV `context` array, which can be
+        passed back on the next call to skip re-evaluating the prompt prefix,
+        and the token counts and timings for the request.
+        """
         try:
             # Merge default params with any overrides
             params = DEFAULT_PARAMS.copy()
             params.update(kwargs)
             
             data = {
-                "model": MODEL_NAME,
+                "model": self.model,
                 "prompt": prompt,
                 "system": system_prompt,
                 "options": params,
                 "stream": False
             }
+            if context:
+                data["context"] = context
+                
+            with self.admission.admit(priority):
+                started = time.monotonic()
+                try:
+                    response = self.session.post(self.generate_endpoint, json=data)
+                    response.raise_for_status()
+                    result = response.json()
+                except Exception:
+                    self.monitor.record(self.model, "generate", time.monotonic() - started, error=True)
+                    raise
+                self.monitor.record(self.model, "generate", time.monotonic() - started, result)
+                return result
+                
+        except AdmissionRejected as e:
+            self.logger.warning(f"Ollama generate not admitted: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Ollama generate error: {str(e)}")
+            return None
+            
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        cancel_event: Optional[threading.Event] = None,
+        context: Optional[List[int]] = None,
+        on_done: Optional[Callable[[Dict[str, Any]], None]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        **kwargs
+    ) -> Iterator[str]:
+        """Streaming generate call, yields response tokens as Ollama emits them.
+        
+        Generation stops early when the caller closes the generator (e.g. breaks
+        out of the loop) or when cancel_event is set; the HTTP response is closed
+        either way so Ollama stops producing tokens. on_done receives the final
+        chunk (KV context, token counts, timings) when generation completes.
+        The admission slot is held for the whole stream and time to first token
+        is reported as its latency.
+        """
+        params = DEFAULT_PARAMS.copy()
+        params.update(kwargs)
+        
+        data = {
+            "model": self.model,
+            "prompt": prompt,
+            "system": system_prompt,
+            "options": params,
+            "stream": True
+        }
+        if context:
+            data["context"] = context
             
-            response = self.session.post(GENERATE_ENDPOINT, json=data)
+        try:
+            self.admission.acquire(priority)
+        except AdmissionRejected as e:
+            self.logger.warning(f"Ollama stream not admitted: {str(e)}")
+            return
+            
+        response = None
+        started = time.monotonic()
+        first_token_latency: Optional[float] = None
+        success = False
+        try:
+            response = self.session.post(self.generate_endpoint, json=data, stream=True)
             response.raise_for_status()
             
-            result = response.json()
-            return result.get("response", "")
+            # Ollama streams newline-delimited JSON objects
+            for line in response.iter_lines():
+                if cancel_event is not None and cancel_event.is_set():
+                    self.logger.debug("Ollama stream cancelled by caller")
+                    break
+                if not line:
+                    continue
+                    
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                    
+                token = chunk.get("response", "")
+                if token:
+                    if first_token_latency is None:
+                        first_token_latency = time.monotonic() - started
+                    yield token
+                    
+                if chunk.get("done"):
+                    self.monitor.record(self.model, "generate_stream", time.monotonic() - started, chunk)
+                    if on_done is not None:
+                        on_done(chunk)
+                    break
+                    
+            success = True
             
+        except GeneratorExit:
+            # Caller stopped early, not a sign of congestion
+            success = True
+            raise
         except Exception as e:
-            self.logger.error(f"Ollama generate error: {str(e)}")
-            return None
+            self.monitor.record(self.model, "generate_stream", time.monotonic() - started, error=True)
+            self.logger.error(f"Ollama stream error: {str(e)}")
+        finally:
+            if response is not None:
+                response.close()
+            latency = first_token_latency if first_token_latency is not None else time.monotonic() - started
+            self.admission.release(latency, success)
             
     def get_embeddings(self, text: str) -> Optional[List[float]]:
-        """Get embeddings for text"""
+        """Get embeddings for text, served from the embedding cache when possible"""
+        cached = self.embedding_cache.get(text)
+        if cached is not None:
+            return cached
+            
+        embedding = self._request_embeddings(text)
+        if embedding:
+            self.embedding_cache.put(text, embedding)
+        return embedding
+        
+    def _request_embeddings(self, text: str) -> Optional[List[float]]:
+        """Embed a single text via /api/embeddings"""
         try:
             data = {
-                "model": MODEL_NAME,
+                "model": self.model,
                 "prompt": text
             }
             
-            response = self.session.post(EMBEDDINGS_ENDPOINT, json=data)
+            started = time.monotonic()
+            response = self.session.post(self.embeddings_endpoint, json=data)
             response.raise_for_status()
             
             result = response.json()
-            return result.get("embedding")
+            self.monitor.record(self.model, "embeddings", time.monotonic() - started, result)
+            return l2_normalize(result.get("embedding"))
             
         except Exception as e:
+            self.monitor.record(self.model, "embeddings", 0.0, error=True)
             self.logger.error(f"Ollama embeddings error: {str(e)}")
             return None
+            
+    def get_embeddings_batch(
+        self,
+        texts: List[str],
+        batch_size: int = EMBED_BATCH_SIZE
+    ) -> List[Optional[List[float]]]:
+        """Get embeddings for many texts, returned in input order
+        
+        Uses the batched /api/embed endpoint when the server has it and falls back
+        to a bounded parallel fan-out over /api/embeddings otherwise. Failed items
+        come back as None. Both paths return L2-normalized vectors.
+        """
+        results: List[Optional[List[float]]] = [self.embedding_cache.get(text) for text in texts]
+        
+        # Only texts missing from the cache go to Ollama, each distinct text once
+        pending = list(dict.fromkeys(text for text, cached in zip(texts, results) if cached is None))
+        embedded: Dict[str, Optional[List[float]]] = {}
+        
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            
+            embeddings = None
+            if self.batch_embed_supported is not False:
+                embeddings = self._embed_batch(chunk)
+            if embeddings is None:
+                embeddings = self._embed_fan_out(chunk)
+                
+            for text, embedding in zip(chunk, embeddings):
+                embedded[text] = embedding
+            # One cache commit per chunk rather than per vector
+            self.embedding_cache.put_many([(text, e) for text, e in zip(chunk, embeddings) if e])
+            
+        return [
+            cached if cached is not None else embedded.get(text)
+            for text, cached in zip(texts, results)
+        ]
+        
+    def _embed_batch(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """Single round trip to /api/embed, None if the batch could not be embedded"""
+        try:
+            data = {
+                "model": self.model,
+                "input": texts
+            }
+            
+            started = time.monotonic()
+            response = self.session.post(self.embed_endpoint, json=data)
+            if response.status_code == 404:
+                # Older Ollama servers only have /api/embeddings
+                self.logger.info("Ollama batch embed endpoint unavailable, using per-item requests")
+                self.batch_embed_supported = False
+                return None
+            response.raise_for_status()
+            
+            result = response.json()
+            embeddings = result.get("embeddings") or []
+            if len(embeddings) != len(texts):
+                raise ValueError(f"expected {len(texts)} embeddings, got {len(embeddings)}")
+                
+            self.monitor.record(self.model, "embed", time.monotonic() - started, result)
+            self.batch_embed_supported = True
+            return [l2_normalize(embedding) for embedding in embeddings]
+            
+        except Exception as e:
+            self.monitor.record(self.model, "embed", 0.0, error=True)
+            self.logger.error(f"Ollama batch embeddings error: {str(e)}")
+            return None
+            
+    def _embed_fan_out(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Embed texts one per request with a bounded worker pool"""
+        workers = max(1, min(EMBED_MAX_WORKERS, len(texts)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self._request_embeddings, texts))
+
+@dataclass
+class KVSession:
+    """History, Ollama KV context and prompt-eval accounting for one conversation"""
+    history: List[Dict[str, Any]] = field(default_factory=list)
+    context: Optional[List[int]] = None
+    turns: int = 0
+    reused_turns: int = 0
+    rebuilds: int = 0
+    prompt_eval_tokens: int = 0
+    reused_context_tokens: int = 0
 
 class OllamaAgent:
-    """High-level Ollama agent with conversation management"""
+    """High-level Ollama agent with conversation management
     
-    def __init__(self):
+    Conversation history is kept per session_id. In session mode the KV
+    `context` returned by /api/generate is kept per session too and passed
+    back on the next turn, so only the new user turn is evaluated instead of
+    the re-serialized history. The full prompt is rebuilt whenever the
+    context is missing, rejected or close to num_ctx. Sessions beyond
+    OLLAMA_MAX_SESSIONS or idle past OLLAMA_SESSION_TTL are dropped.
+    
+    With OLLAMA_ROUTER_ENABLED (or an explicit router) replies and summaries
+    are generated through a FallbackProvider across OLLAMA_HOSTS and
+    OLLAMA_FALLBACK_MODELS. Session mode is then off, since a KV context is
+    only valid on the backend that produced it; streaming and embeddings stay
+    on the local client.
+    """
+    
+    def __init__(self, session_mode: bool = SESSION_MODE, router=None):
         self.client = OllamaClient()
         self.logger = logging.getLogger(__name__)
-        self.conversation_history: List[Dict[str, Any]] = []
+        if router is None and ROUTER_ENABLED:
+            # Imported here, the providers package builds on this module
+            from ..providers.fallback_provider import FallbackProvider
+            router = FallbackProvider.from_env()
+        self.router = router
+        if router is not None and session_mode:
+            self.logger.warning("Session mode is not supported with the backend router, disabling it")
+            session_mode = False
+        self.session_mode = session_mode
+        self.kv_sessions: ExpiringLRU[str, KVSession] = ExpiringLRU(SESSION_MAX_SESSIONS, SESSION_TTL)
+        self._sessions_lock = threading.Lock()
+        self.prompt_assembler = PromptAssembler(TokenCounter(TOKENIZER_FILE or None))
+        self.last_prompt: Optional[AssembledPrompt] = None
         
-    def _build_prompt(self, user_input: str, context: Optional[str] = None) -> str:
-        """Build full prompt with history and context"""
-        prompt_parts = []
+    @property
+    def conversation_history(self) -> List[Dict[str, Any]]:
+        """History of the default session"""
+        return self._get_session("default").history
         
-        # Add recent conversation history (last 5 exchanges)
-        if self.conversation_history:
-            history = self.conversation_history[-5:]
-            for msg in history:
-                role = msg["role"]
-                content = msg["content"]
-                prompt_parts.append(f"{role.upper()}: {content}")
+    def _build_prompt(
+        self,
+        user_input: str,
+        context: Optional[str] = None,
+        num_ctx: Optional[int] = None,
+        history: Optional[List[Dict[str, Any]]] = None
+    ) -> str:
+        """Build full prompt with history and context, fitted to the token budget"""
+        num_ctx = num_ctx or DEFAULT_PARAMS["num_ctx"]
+        assembled = self.prompt_assembler.assemble(
+            budget=max(num_ctx - RESPONSE_TOKEN_RESERVE, 0),
+            user_input=user_input,
+            system_prompt=AGENT_PROMPT,
+            memory=context,
+            history=history
+        )
+        if assembled.truncated:
+            self.logger.debug(f"Prompt sections truncated to fit budget: {assembled.truncated}")
+        self.last_prompt = assembled
+        return assembled.prompt
         
-        # Add context if provided
+    def _build_turn_prompt(self, user_input: str, context: Optional[str] = None) -> str:
+        """Build the prompt for a single turn, history is already in the KV context"""
+        prompt_parts = []
         if context:
             prompt_parts.append(f"CONTEXT: {context}")
-            
-        # Add current input
         prompt_parts.append(f"USER: {user_input}")
         prompt_parts.append("ASSISTANT:")
-        
         return "\n".join(prompt_parts)
         
-    def generate_response(self, user_input: str, context: Optional[str] = None) -> str:
-        """Generate a response to user input"""
-        try:
-            # Build full prompt
-            prompt = self._build_prompt(user_input, context)
+    def _get_session(self, session_id: str) -> KVSession:
+        with self._sessions_lock:
+            session = self.kv_sessions.get(session_id)
+            if session is None:
+                session = KVSession()
+                self.kv_sessions.set(session_id, session)
+            return session
+            
+    def has_session(self, session_id: str) -> bool:
+        """Whether a session is live, i.e. not unknown and not expired"""
+        with self._sessions_lock:
+            return self.kv_sessions.get(session_id) is not None
             
-            # Get response
-            response = self.client.generate(prompt, system_prompt=AGENT_PROMPT)
+    def seed_session(self, session_id: str, history: List[Dict[str, Any]]):
+        """Start a session from history kept elsewhere, unless it is already live"""
+        with self._sessions_lock:
+            if self.kv_sessions.get(session_id) is not None:
+                return
+            session = KVSession(history=list(history[-SESSION_HISTORY_MESSAGES:]))
+            self.kv_sessions.set(session_id, session)
             
+    def _record_history(self, session: KVSession, user_input: str, response: str):
+        session.history.append({"role": "user", "content": user_input})
+        session.history.append({"role": "assistant", "content": response})
+        del session.history[:-SESSION_HISTORY_MESSAGES]
+        
+    def _prepare_session_turn(
+        self,
+        session: KVSession,
+        user_input: str,
+        context: Optional[str],
+        options: Dict[str, Any]
+    ) -> Tuple[str, Optional[List[int]]]:
+        """Return (prompt, kv_context), reusing the KV context while it is valid"""
+        num_ctx = options.get("num_ctx", DEFAULT_PARAMS["num_ctx"])
+        if session.context and len(session.context) < num_ctx * KV_CONTEXT_MAX_FILL:
+            return self._build_turn_prompt(user_input, context), session.context
+            
+        if session.context:
+            self.logger.debug("KV context close to num_ctx, rebuilding prompt from history")
+        if session.turns:
+            session.rebuilds += 1
+        session.context = None
+        return self._build_prompt(user_input, context, num_ctx, session.history), None
+        
+    def _record_session_turn(
+        self,
+        session: KVSession,
+        result: Dict[str, Any],
+        reused_context: Optional[List[int]]
+    ):
+        session.turns += 1
+        session.prompt_eval_tokens += result.get("prompt_eval_count", 0) or 0
+        if reused_context:
+            session.reused_turns += 1
+            session.reused_context_tokens += len(reused_context)
+        session.context = result.get("context") or None
+        
+    def session_stats(self, session_id: str = "default") -> Dict[str, Any]:
+        """Prompt-eval accounting for a session
+        
+        reused_context_tokens counts prefix tokens Ollama did not have to
+        evaluate again because their KV context was passed back.
+        """
+        session = self._get_session(session_id)
+        return {
+            "turns": session.turns,
+            "reused_turns": session.reused_turns,
+            "rebuilds": session.rebuilds,
+            "prompt_eval_tokens": session.prompt_eval_tokens,
+            "reused_context_tokens": session.reused_context_tokens,
+            "context_tokens": len(session.context) if session.context else 0
+        }
+        
+    def reset_session(self, session_id: str = "default"):
+        """Drop a session's history and KV context"""
+        with self._sessions_lock:
+            self.kv_sessions.pop(session_id)
+            
+    def generate_response(
+        self,
+        user_input: str,
+        context: Optional[str] = None,
+        stream: bool = False,
+        session_id: str = "default",
+        **kwargs
+    ):
+        """Generate a response to user input
+        
+        With stream=True an iterator of response tokens is returned instead of
+        the full string, see generate_response_stream.
+        """
+        if stream:
+            return self.generate_response_stream(user_input, context, session_id=session_id, **kwargs)
+            
+        try:
+            session = self._get_session(session_id)
+            if self.session_mode:
+                response = self._generate_with_session(user_input, context, session, **kwargs)
+            else:
+                # Build full prompt
+                prompt = self._build_prompt(user_input, context, kwargs.get("num_ctx"), session.history)
+                
+                # Get response
+                response = self._generate(prompt, system_prompt=AGENT_PROMPT, **kwargs)
+                
             if not response:
                 return "I apologize, I'm having trouble generating a response right now."
                 
             # Update conversation history
-            self.conversation_history.append({"role": "user", "content": user_input})
-            self.conversation_history.append({"role": "assistant", "content": response})
+            self._record_history(session, user_input, response)
             
             return response
             
@@ -112,6 +560,109 @@ class OllamaAgent:
             self.logger.error(f"Response generation error: {str(e)}")
             return "I encountered an error while trying to respond."
             
+    def _generate(self, prompt: str, **kwargs) -> Optional[str]:
+        """Generate through the router when one is configured, else the local client"""
+        if self.router is None:
+            return self.client.generate(prompt, **kwargs)
+        try:
+            return self.router.generate(prompt, **kwargs)
+        except ProviderError as e:
+            self.logger.error(f"Routed generation failed: {str(e)}")
+            return None
+            
+    def _generate_with_session(
+        self,
+        user_input: str,
+        context: Optional[str],
+        session: KVSession,
+        **kwargs
+    ) -> Optional[str]:
+        """Generate reusing the session's KV context, rebuilding once if it is rejected"""
+        prompt, kv_context = self._prepare_session_turn(session, user_input, context, kwargs)
+        
+        result = self.client.generate_raw(
+            prompt, system_prompt=AGENT_PROMPT, context=kv_context, **kwargs
+        )
+        if result is None and kv_context:
+            self.logger.warning("Generate with KV context failed, retrying with rebuilt prompt")
+            session.context = None
+            prompt, kv_context = self._prepare_session_turn(session, user_input, context, kwargs)
+            result = self.client.generate_raw(prompt, system_prompt=AGENT_PROMPT, **kwargs)
+            
+        if result is None:
+            return None
+            
+        self._record_session_turn(session, result, kv_context)
+        return result.get("response", "")
+        
+    def generate_response_stream(
+        self,
+        user_input: str,
+        context: Optional[str] = None,
+        cancel_event: Optional[threading.Event] = None,
+        session_id: str = "default",
+        **kwargs
+    ) -> Iterator[str]:
+        """Generate a response to user input, yielding tokens as they arrive.
+        
+        Whatever text was delivered to the caller is recorded in the conversation
+        history, including a partial response when the stream is cancelled.
+        """
+        session = self._get_session(session_id)
+        kv_context = None
+        if self.session_mode:
+            prompt, kv_context = self._prepare_session_turn(session, user_input, context, kwargs)
+        else:
+            prompt = self._build_prompt(user_input, context, kwargs.get("num_ctx"), session.history)
+            
+        parts: List[str] = []
+        final_chunks: List[Dict[str, Any]] = []
+        
+        try:
+            for token in self.client.generate_stream(
+                prompt,
+                system_prompt=AGENT_PROMPT,
+                cancel_event=cancel_event,
+                context=kv_context,
+                on_done=final_chunks.append,
+                **kwargs
+            ):
+                parts.append(token)
+                yield token
+                
+            if not parts:
+                fallback = "I apologize, I'm having trouble generating a response right now."
+                yield fallback
+                return
+                
+        finally:
+            response = "".join(parts)
+            if response:
+                self._record_history(session, user_input, response)
+                
+            if self.session_mode:
+                if final_chunks:
+                    self._record_session_turn(session, final_chunks[-1], kv_context)
+                else:
+                    # Cancelled or failed, the KV context no longer matches the history
+                    session.context = None
+                    
+    def summarize(self, text: str) -> Optional[str]:
+        """Condense conversation excerpts into a memory note, at background priority"""
+        prompt = (
+            "Summarize these conversation excerpts into a short memory note. Keep names, "
+            "usernames, tickers, facts and stated preferences; drop small talk.\n\n"
+            f"{text}\n\nMEMORY NOTE:"
+        )
+        try:
+            return self._generate(prompt, priority=Priority.BACKGROUND, temperature=0.2)
+        except AdmissionRejected:
+            return None
+            
     def get_embeddings(self, text: str) -> Optional[List[float]]:
         """Get embeddings for text, used for semantic search"""
         return self.client.get_embeddings(text)
+        
+    def get_embeddings_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Get embeddings for many texts at once, in input order"""
+        return self.client.get_embeddings_batch(texts)
@@ -9,6 +9,56 @@ load_dotenv()
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 MODEL_NAME = os.getenv("OLLAMA_MODEL", "jeff")
 
+# Multi-backend routing: comma-separated replica hosts and lower-tier fallback models
+OLLAMA_HOSTS = [h.strip() for h in os.getenv("OLLAMA_HOSTS", OLLAMA_HOST).split(",") if h.strip()]
+FALLBACK_MODELS = [m.strip() for m in os.getenv("OLLAMA_FALLBACK_MODELS", "").split(",") if m.strip()]
+ROUTER_FAILURE_THRESHOLD = int(os.getenv("OLLAMA_ROUTER_FAILURE_THRESHOLD", "3"))
+ROUTER_COOLDOWN = float(os.getenv("OLLAMA_ROUTER_COOLDOWN", "30"))
+ROUTER_HEDGE_DELAY = float(os.getenv("OLLAMA_ROUTER_HEDGE_DELAY", "1.0"))
+# Route OllamaAgent generations through the multi-backend router
+ROUTER_ENABLED = os.getenv("OLLAMA_ROUTER_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Connection settings
+REQUEST_TIMEOUT = float(os.getenv("OLLAMA_REQUEST_TIMEOUT", "120"))
+MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "32"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("OLLAMA_MAX_CONCURRENT_REQUESTS", "8"))
+
+# Adaptive admission control for generate calls (AIMD on observed latency)
+ADMISSION_INITIAL_LIMIT = int(os.getenv("OLLAMA_ADMISSION_INITIAL_LIMIT", "4"))
+ADMISSION_MIN_LIMIT = int(os.getenv("OLLAMA_ADMISSION_MIN_LIMIT", "1"))
+ADMISSION_MAX_LIMIT = int(os.getenv("OLLAMA_ADMISSION_MAX_LIMIT", "16"))
+ADMISSION_TARGET_LATENCY = float(os.getenv("OLLAMA_ADMISSION_TARGET_LATENCY", "30"))
+ADMISSION_MAX_QUEUE = int(os.getenv("OLLAMA_ADMISSION_MAX_QUEUE", "256"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("OLLAMA_ADMISSION_QUEUE_TIMEOUT", "120"))
+
+# Batched embedding settings
+EMBED_BATCH_SIZE = int(os.getenv("OLLAMA_EMBED_BATCH_SIZE", "64"))
+EMBED_MAX_WORKERS = int(os.getenv("OLLAMA_EMBED_MAX_WORKERS", "4"))
+
+# Embedding cache, a size of 0 disables the in-memory tier and an empty path the disk tier
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+
+# Completion cache for deterministic generate calls (opt-in)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+
+# Session mode reuses Ollama's KV context across turns instead of resending history.
+# The prompt is rebuilt once the context fills this fraction of num_ctx.
+SESSION_MODE = os.getenv("OLLAMA_SESSION_MODE", "false").lower() in ("1", "true", "yes")
+KV_CONTEXT_MAX_FILL = float(os.getenv("OLLAMA_KV_CONTEXT_MAX_FILL", "0.75"))
+
+# Per-session history and KV context: sessions beyond the cap or idle past the
+# TTL are dropped, and each keeps its most recent messages only
+SESSION_MAX_SESSIONS = int(os.getenv("OLLAMA_MAX_SESSIONS", "10000"))
+SESSION_TTL = float(os.getenv("OLLAMA_SESSION_TTL", "3600"))
+SESSION_HISTORY_MESSAGES = int(os.getenv("OLLAMA_SESSION_HISTORY_MESSAGES", "50"))
+
+# Prompt token budget: num_ctx minus the tokens kept free for the reply
+RESPONSE_TOKEN_RESERVE = int(os.getenv("OLLAMA_RESPONSE_TOKEN_RESERVE", "512"))
+TOKENIZER_FILE = os.getenv("OLLAMA_TOKENIZER_FILE", "")
+
 # Model parameters
 DEFAULT_PARAMS: Dict[str, Any] = {
     "temperature": 0.7,
@@ -31,3 +81,4 @@ You should:
 # API endpoints
 GENERATE_ENDPOINT = f"{OLLAMA_HOST}/api/generate"
 EMBEDDINGS_ENDPOINT = f"{OLLAMA_HOST}/api/embeddings"
+EMBED_ENDPOINT = f"{OLLAMA_HOST}/api/embed"
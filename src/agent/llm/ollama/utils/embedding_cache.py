@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+class EmbeddingCache:
+    """Content-addressed embedding cache keyed by (model name, text hash)
+    
+    Keeps an in-memory LRU tier and, when db_path is set, a sqlite tier that
+    survives restarts. Rows are keyed by model, so a change of OLLAMA_MODEL
+    never serves stale vectors, and caches for several models can share one
+    file without evicting each other.
+    """
+    
+    def __init__(self, model: str, max_entries: int = 1024, db_path: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.model = model
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        if db_path:
+            self._open_db(db_path)
+            
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+        
+    def _open_db(self, db_path: str):
+        try:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )"""
+            )
+            self._db.commit()
+        except Exception as e:
+            self.logger.error(f"Error opening embedding cache at {db_path}: {str(e)}")
+            self._db = None
+            
+    def get(self, text: str) -> Optional[List[float]]:
+        """Return the cached embedding for text, or None on a miss"""
+        key = (self.model, self.hash_text(text))
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return embedding
+                
+            embedding = self._read_disk(key)
+            if embedding is not None:
+                self._remember(key, embedding)
+                self.hits += 1
+                self.disk_hits += 1
+                return embedding
+                
+            self.misses += 1
+            return None
+            
+    def put(self, text: str, embedding: List[float]):
+        """Store an embedding in both tiers"""
+        key = (self.model, self.hash_text(text))
+        with self._lock:
+            self._remember(key, embedding)
+            self._write_disk([(key, embedding)])
+            
+    def put_many(self, items: List[Tuple[str, List[float]]]):
+        """Store several (text, embedding) pairs with a single disk commit"""
+        entries = [((self.model, self.hash_text(text)), embedding) for text, embedding in items]
+        if not entries:
+            return
+        with self._lock:
+            for key, embedding in entries:
+                self._remember(key, embedding)
+            self._write_disk(entries)
+            
+    def _remember(self, key: Tuple[str, str], embedding: List[float]):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+            
+    def _read_disk(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT embedding FROM embeddings WHERE model = ? AND text_hash = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            return array("d", row[0]).tolist()
+        except Exception as e:
+            self.logger.error(f"Error reading embedding cache: {str(e)}")
+            return None
+            
+    def _write_disk(self, entries: List[Tuple[Tuple[str, str], List[float]]]):
+        if self._db is None:
+            return
+        try:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, embedding) VALUES (?, ?, ?)",
+                [(key[0], key[1], array("d", embedding).tobytes()) for key, embedding in entries]
+            )
+            self._db.commit()
+        except Exception as e:
+            self.logger.error(f"Error writing embedding cache: {str(e)}")
+            
+    def set_model(self, model: str):
+        """Switch to a different embedding model; the old model's disk rows are kept"""
+        with self._lock:
+            if model == self.model:
+                return
+            self.model = model
+            self._memory.clear()
+            
+    def clear(self):
+        """Drop every cached embedding"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+                
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries
+            }
+            
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,174 @@
+import bisect
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Ollama reports durations in nanoseconds
+_NS_PER_SECOND = 1e9
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0]
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+class RollingSeries:
+    """Fixed-size window of samples with percentile and histogram views"""
+    
+    def __init__(self, window: int):
+        self.samples: Deque[float] = deque(maxlen=window)
+        
+    def add(self, value: float):
+        self.samples.append(value)
+        
+    def summary(self, buckets: Optional[List[float]] = None) -> Dict[str, Any]:
+        values = sorted(self.samples)
+        summary = {
+            "count": len(values),
+            "mean": sum(values) / len(values) if values else 0.0,
+            "p50": _percentile(values, 0.50),
+            "p95": _percentile(values, 0.95),
+            "p99": _percentile(values, 0.99),
+            "max": values[-1] if values else 0.0
+        }
+        if buckets is not None:
+            counts = [0] * (len(buckets) + 1)
+            for value in values:
+                counts[bisect.bisect_left(buckets, value)] += 1
+            summary["histogram"] = {
+                **{f"le_{bound}": count for bound, count in zip(buckets, counts)},
+                "inf": counts[-1]
+            }
+        return summary
+
+class _CallStats:
+    """Rolling stats for one (model, endpoint) pair"""
+    
+    def __init__(self, window: int):
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.eval_tokens = 0
+        self.total = RollingSeries(window)
+        self.load = RollingSeries(window)
+        self.prompt_eval = RollingSeries(window)
+        self.eval = RollingSeries(window)
+        self.prompt_tokens_per_second = RollingSeries(window)
+        self.eval_tokens_per_second = RollingSeries(window)
+
+class PerformanceMonitor:
+    """Per-call latency and throughput tracking for Ollama requests
+    
+    Each call records its client-side wall time plus the load, prompt-eval
+    and eval durations and token counts Ollama returns in the response body.
+    Samples are kept in a rolling window per (model, endpoint) so p50/p95/p99
+    and tokens/sec reflect recent behaviour.
+    """
+    
+    def __init__(self, window: int = 1024):
+        self.logger = logging.getLogger(__name__)
+        self.window = window
+        self.started_at = time.time()
+        self._stats: Dict[Tuple[str, str], _CallStats] = {}
+        self._lock = threading.Lock()
+        
+    def _get(self, model: str, endpoint: str) -> _CallStats:
+        key = (model, endpoint)
+        if key not in self._stats:
+            self._stats[key] = _CallStats(self.window)
+        return self._stats[key]
+        
+    def record(
+        self,
+        model: str,
+        endpoint: str,
+        wall_time: float,
+        result: Optional[Dict[str, Any]] = None,
+        error: bool = False
+    ):
+        """Record one call; result is Ollama's response body or final stream chunk"""
+        result = result or {}
+        with self._lock:
+            stats = self._get(model, endpoint)
+            stats.calls += 1
+            if error:
+                stats.errors += 1
+                return
+                
+            stats.total.add(wall_time)
+            
+            load_ns = result.get("load_duration")
+            if load_ns:
+                stats.load.add(load_ns / _NS_PER_SECOND)
+                
+            prompt_count = result.get("prompt_eval_count") or 0
+            prompt_ns = result.get("prompt_eval_duration")
+            stats.prompt_tokens += prompt_count
+            if prompt_ns:
+                stats.prompt_eval.add(prompt_ns / _NS_PER_SECOND)
+                if prompt_count:
+                    stats.prompt_tokens_per_second.add(prompt_count / (prompt_ns / _NS_PER_SECOND))
+                    
+            eval_count = result.get("eval_count") or 0
+            eval_ns = result.get("eval_duration")
+            stats.eval_tokens += eval_count
+            if eval_ns:
+                stats.eval.add(eval_ns / _NS_PER_SECOND)
+                if eval_count:
+                    stats.eval_tokens_per_second.add(eval_count / (eval_ns / _NS_PER_SECOND))
+                    
+    def summary(self, model: Optional[str] = None, endpoint: Optional[str] = None) -> Dict[str, Any]:
+        """Aggregated stats keyed by "model endpoint", optionally filtered"""
+        with self._lock:
+            report = {}
+            for (stat_model, stat_endpoint), stats in self._stats.items():
+                if model is not None and stat_model != model:
+                    continue
+                if endpoint is not None and stat_endpoint != endpoint:
+                    continue
+                report[f"{stat_model} {stat_endpoint}"] = {
+                    "model": stat_model,
+                    "endpoint": stat_endpoint,
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "prompt_tokens": stats.prompt_tokens,
+                    "eval_tokens": stats.eval_tokens,
+                    "total_seconds": stats.total.summary(LATENCY_BUCKETS),
+                    "load_seconds": stats.load.summary(),
+                    "prompt_eval_seconds": stats.prompt_eval.summary(),
+                    "eval_seconds": stats.eval.summary(),
+                    "prompt_tokens_per_second": stats.prompt_tokens_per_second.summary(),
+                    "eval_tokens_per_second": stats.eval_tokens_per_second.summary()
+                }
+            return report
+            
+    def to_json(self, **kwargs) -> str:
+        return json.dumps({
+            "started_at": self.started_at,
+            "window": self.window,
+            "stats": self.summary(**kwargs)
+        }, indent=2)
+        
+    def dump(self, path: str):
+        """Write the current summary to a JSON file"""
+        try:
+            with open(path, "w") as f:
+                f.write(self.to_json())
+        except Exception as e:
+            self.logger.error(f"Error writing performance report to {path}: {str(e)}")
+            
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.started_at = time.time()
+
+# Process-wide monitor shared by clients that are not given their own
+default_monitor = PerformanceMonitor()
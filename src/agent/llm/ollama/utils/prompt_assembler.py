@@ -0,0 +1,102 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .token_counter import TokenCounter
+
+@dataclass
+class AssembledPrompt:
+    """A prompt fitted into a token budget, with per-section accounting"""
+    prompt: str
+    system_prompt: str
+    budget: int
+    tokens_used: int
+    section_tokens: Dict[str, int] = field(default_factory=dict)
+    history_messages: int = 0
+    dropped_history_messages: int = 0
+    truncated: List[str] = field(default_factory=list)
+
+class PromptAssembler:
+    """Fills a token budget by priority instead of a fixed message count
+    
+    The system prompt and the user input are always kept (the user input is
+    truncated only if it cannot fit otherwise). The remaining budget goes to
+    retrieved memory first, then to as much recent history as fits, newest
+    messages first. The rendered layout matches OllamaAgent's prompt format.
+    """
+    
+    def __init__(self, token_counter: Optional[TokenCounter] = None):
+        self.counter = token_counter or TokenCounter()
+        
+    def assemble(
+        self,
+        budget: int,
+        user_input: str,
+        system_prompt: str = "",
+        memory: Optional[str] = None,
+        history: Optional[List[Dict[str, Any]]] = None
+    ) -> AssembledPrompt:
+        history = history or []
+        truncated: List[str] = []
+        
+        system_tokens = self.counter.count(system_prompt)
+        footer = "ASSISTANT:"
+        footer_tokens = self.counter.count(footer)
+        
+        # Mandatory parts: system prompt, user turn and the assistant cue
+        remaining = budget - system_tokens - footer_tokens
+        user_line = f"USER: {user_input}"
+        user_tokens = self.counter.count(user_line)
+        if user_tokens > remaining:
+            user_line = self.counter.truncate(user_line, max(remaining, 0), keep="end")
+            user_tokens = self.counter.count(user_line)
+            truncated.append("user_input")
+        remaining -= user_tokens
+        
+        # Retrieved memory
+        memory_line = ""
+        memory_tokens = 0
+        if memory and remaining > 0:
+            memory_line = f"CONTEXT: {memory}"
+            memory_tokens = self.counter.count(memory_line)
+            if memory_tokens > remaining:
+                memory_line = self.counter.truncate(memory_line, remaining)
+                memory_tokens = self.counter.count(memory_line)
+                truncated.append("memory")
+            remaining -= memory_tokens
+            
+        # Recent history, newest first, whole messages only
+        history_lines: List[str] = []
+        history_tokens = 0
+        for msg in reversed(history):
+            line = f"{msg['role'].upper()}: {msg['content']}"
+            tokens = self.counter.count(line)
+            if tokens > remaining:
+                break
+            history_lines.append(line)
+            history_tokens += tokens
+            remaining -= tokens
+        history_lines.reverse()
+        
+        prompt_parts = history_lines[:]
+        if memory_line:
+            prompt_parts.append(memory_line)
+        prompt_parts.append(user_line)
+        prompt_parts.append(footer)
+        
+        section_tokens = {
+            "system": system_tokens,
+            "memory": memory_tokens,
+            "history": history_tokens,
+            "user_input": user_tokens + footer_tokens
+        }
+        
+        return AssembledPrompt(
+            prompt="\n".join(prompt_parts),
+            system_prompt=system_prompt,
+            budget=budget,
+            tokens_used=sum(section_tokens.values()),
+            section_tokens=section_tokens,
+            history_messages=len(history_lines),
+            dropped_history_messages=len(history) - len(history_lines),
+            truncated=truncated
+        )
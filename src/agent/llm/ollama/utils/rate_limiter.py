@@ -0,0 +1,201 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Dict, Iterator, List, Optional
+
+class Priority(IntEnum):
+    """Request priority for Ollama admission, lower values are served first"""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    TRAINING = 2
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted (queue full or wait timed out)"""
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued_at", "admitted", "cancelled")
+    
+    def __init__(self, priority: Priority):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.admitted = False
+        self.cancelled = False
+
+class AdmissionController:
+    """Client-side admission control for one Ollama host
+    
+    Caps in-flight generations at an adaptive limit. Requests beyond the limit
+    wait in a priority queue so interactive chat is admitted before background
+    posting and training. The limit follows AIMD: it grows by one slot per
+    limit's worth of on-target completions and is cut multiplicatively when a
+    request exceeds target_latency or fails, at most once per cooldown.
+    """
+    
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        target_latency: float = 30.0,
+        decrease_factor: float = 0.5,
+        max_queue: int = 256,
+        queue_timeout: Optional[float] = None,
+        sample_size: int = 512
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        
+        self._cond = threading.Condition()
+        self._queue: List = []
+        self._sequence = itertools.count()
+        self._last_decrease = 0.0
+        self.in_flight = 0
+        
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.congestion_events = 0
+        self._wait_times: deque = deque(maxlen=sample_size)
+        self._latencies: deque = deque(maxlen=sample_size)
+        
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+        
+    def acquire(self, priority: Priority = Priority.INTERACTIVE, timeout: Optional[float] = None) -> float:
+        """Block until a slot is free, returns the time spent waiting
+        
+        Raises AdmissionRejected if the queue is full or the wait times out.
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        with self._cond:
+            if not self._queue and self.in_flight < self.current_limit:
+                self.in_flight += 1
+                self.admitted += 1
+                self._wait_times.append(0.0)
+                return 0.0
+                
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected(f"Ollama admission queue full ({self.max_queue} waiting)")
+                
+            waiter = _Waiter(priority)
+            heapq.heappush(self._queue, (int(priority), next(self._sequence), waiter))
+            self._admit_waiters()
+            deadline = None if timeout is None else waiter.enqueued_at + timeout
+            
+            while not waiter.admitted:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    waiter.cancelled = True
+                    self.timeouts += 1
+                    self._admit_waiters()
+                    raise AdmissionRejected(f"Timed out after {timeout:.1f}s waiting for Ollama admission")
+                self._cond.wait(remaining)
+                
+            waited = time.monotonic() - waiter.enqueued_at
+            self._wait_times.append(waited)
+            return waited
+            
+    def release(self, latency: Optional[float] = None, success: bool = True):
+        """Free a slot and feed the observed latency into the AIMD limit"""
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            if latency is not None:
+                self._latencies.append(latency)
+                
+            if not success or (latency is not None and latency > self.target_latency):
+                now = time.monotonic()
+                # One multiplicative decrease per cooldown so a burst of slow
+                # requests from the same congestion episode is not counted twice
+                if now - self._last_decrease >= min(self.target_latency, latency or self.target_latency):
+                    self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+                    self._last_decrease = now
+                    self.congestion_events += 1
+                    self.logger.info(f"Ollama congestion detected, admission limit now {self.current_limit}")
+            elif latency is not None:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+                
+            self._admit_waiters()
+            
+    def _admit_waiters(self):
+        """Admit queued requests in priority order while slots are free"""
+        admitted_any = False
+        while self._queue and self.in_flight < self.current_limit:
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.cancelled:
+                continue
+            waiter.admitted = True
+            self.in_flight += 1
+            self.admitted += 1
+            admitted_any = True
+        if admitted_any:
+            self._cond.notify_all()
+            
+    @contextmanager
+    def admit(self, priority: Priority = Priority.INTERACTIVE, timeout: Optional[float] = None) -> Iterator[Dict[str, float]]:
+        """Hold a slot for the duration of the block
+        
+        Yields a dict the caller may fill with a "latency" to report instead of
+        the block's wall time (e.g. time to first token for streams).
+        """
+        self.acquire(priority, timeout)
+        report: Dict[str, float] = {}
+        started = time.monotonic()
+        success = False
+        try:
+            yield report
+            success = True
+        finally:
+            self.release(report.get("latency", time.monotonic() - started), success)
+            
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, wait time and limit metrics"""
+        with self._cond:
+            depth_by_priority = {p.name.lower(): 0 for p in Priority}
+            for priority, _, waiter in self._queue:
+                if not waiter.cancelled:
+                    depth_by_priority[Priority(priority).name.lower()] += 1
+                    
+            waits = sorted(self._wait_times)
+            latencies = sorted(self._latencies)
+            return {
+                "limit": self.current_limit,
+                "in_flight": self.in_flight,
+                "queue_depth": sum(depth_by_priority.values()),
+                "queue_depth_by_priority": depth_by_priority,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "congestion_events": self.congestion_events,
+                "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+                "wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "latency_p95": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0
+            }
+
+_controllers: Dict[str, AdmissionController] = {}
+_controllers_lock = threading.Lock()
+
+def controller_for(host: str, **settings: Any) -> AdmissionController:
+    """Process-wide admission controller for an Ollama host
+    
+    Every client talking to the same host shares one controller, so the cap
+    holds across clients; settings only apply when the controller is created.
+    """
+    key = host.rstrip("/")
+    with _controllers_lock:
+        controller = _controllers.get(key)
+        if controller is None:
+            controller = _controllers[key] = AdmissionController(**settings)
+        return controller
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+class ResponseCache:
+    """Completion cache for reproducible generate calls
+    
+    Only requests whose sampling settings make the output deterministic
+    (temperature 0 or a fixed seed) are cached. Entries are keyed on
+    (model, system prompt, prompt, options), expire after ttl seconds and
+    the least recently used entry is evicted once max_entries is reached.
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0):
+        self.logger = logging.getLogger(__name__)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.expirations = 0
+        self.evictions = 0
+        
+    @staticmethod
+    def is_deterministic(options: Dict[str, Any]) -> bool:
+        """True when sampling options make the completion reproducible"""
+        if options.get("seed") is not None:
+            return True
+        temperature = options.get("temperature")
+        return temperature is not None and float(temperature) == 0.0
+        
+    @staticmethod
+    def make_key(model: str, system_prompt: str, prompt: str, options: Dict[str, Any]) -> str:
+        payload = json.dumps(
+            [model, system_prompt, prompt, options],
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        
+    def get(self, model: str, system_prompt: str, prompt: str, options: Dict[str, Any]) -> Optional[str]:
+        """Return a cached completion, or None on a miss or a non-deterministic request"""
+        if not self.is_deterministic(options):
+            with self._lock:
+                self.bypassed += 1
+            return None
+            
+        key = self.make_key(model, system_prompt, prompt, options)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, response = entry
+                if time.monotonic() - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._entries[key]
+                self.expirations += 1
+                
+            self.misses += 1
+            return None
+            
+    def put(self, model: str, system_prompt: str, prompt: str, options: Dict[str, Any], response: str):
+        """Cache a completion if the request was deterministic"""
+        if self.max_entries <= 0 or not self.is_deterministic(options):
+            return
+            
+        key = self.make_key(model, system_prompt, prompt, options)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl
+            }
@@ -0,0 +1,88 @@
+import logging
+import math
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+# Words, numbers and individual punctuation marks, roughly how BPE vocabularies split text
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+@lru_cache(maxsize=8192)
+def estimate_tokens(text: str) -> int:
+    """Fast BPE-style token estimate
+    
+    Common-length words and punctuation count as one token, longer words as
+    one token per ~5 characters. Close to BPE counts for English prose, the
+    reply reserve in the prompt budget absorbs the remaining error.
+    """
+    if not text:
+        return 0
+    count = 0
+    for piece in _PIECE_PATTERN.findall(text):
+        count += 1 if len(piece) <= 6 else math.ceil(len(piece) / 5)
+    return count
+
+class TokenCounter:
+    """Counts prompt tokens, exactly when a tokenizer is available
+    
+    Pass tokenizer_file (a HuggingFace tokenizer.json matching the Ollama
+    model) to count exactly with the `tokenizers` package. Without it, or if
+    the package is missing, the cached estimate_tokens heuristic is used.
+    """
+    
+    def __init__(self, tokenizer_file: Optional[str] = None, cache_size: int = 8192):
+        self.logger = logging.getLogger(__name__)
+        self.tokenizer = None
+        if tokenizer_file:
+            self.tokenizer = self._load_tokenizer(tokenizer_file)
+        self._count_exact = lru_cache(maxsize=cache_size)(self._encode_length)
+        
+    @property
+    def exact(self) -> bool:
+        return self.tokenizer is not None
+        
+    def _load_tokenizer(self, tokenizer_file: str):
+        try:
+            from tokenizers import Tokenizer
+            return Tokenizer.from_file(tokenizer_file)
+        except ImportError:
+            self.logger.warning("tokenizers package not installed, using token estimates")
+        except Exception as e:
+            self.logger.error(f"Error loading tokenizer {tokenizer_file}: {str(e)}")
+        return None
+        
+    def _encode_length(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+        
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return self._count_exact(text)
+        return estimate_tokens(text)
+        
+    def count_many(self, texts: List[str]) -> int:
+        return sum(self.count(text) for text in texts)
+        
+    def truncate(self, text: str, max_tokens: int, keep: str = "start") -> str:
+        """Trim text to at most max_tokens, keeping its start or its end"""
+        if max_tokens <= 0:
+            return ""
+        if self.count(text) <= max_tokens:
+            return text
+            
+        words = text.split(" ")
+        # Binary search on the number of words that still fits
+        low, high = 0, len(words)
+        while low < high:
+            mid = (low + high + 1) // 2
+            candidate = words[:mid] if keep == "start" else words[-mid:]
+            if self.count(" ".join(candidate)) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+                
+        if low == 0:
+            return ""
+        return " ".join(words[:low] if keep == "start" else words[-low:])
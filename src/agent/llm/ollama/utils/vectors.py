@@ -0,0 +1,16 @@
+import math
+from typing import List, Optional
+
+def l2_normalize(embedding: Optional[List[float]]) -> Optional[List[float]]:
+    """Scale an embedding to unit length
+    
+    /api/embed returns unit vectors and /api/embeddings does not; every
+    embedding the clients hand out goes through here so vectors from either
+    endpoint can be compared and stored side by side.
+    """
+    if not embedding:
+        return embedding
+    norm = math.sqrt(sum(x * x for x in embedding))
+    if norm == 0:
+        return list(embedding)
+    return [x / norm for x in embedding]
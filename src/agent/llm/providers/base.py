@@ -0,0 +1,34 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+class ProviderError(Exception):
+    """Raised when a provider cannot serve a request"""
+
+class LLMProvider(ABC):
+    """Common interface for LLM backends
+    
+    Unlike OllamaClient, which logs and returns None, providers raise
+    ProviderError on failure so routers can fail over to another backend.
+    """
+    
+    name: str = "provider"
+    model: str = ""
+    
+    @abstractmethod
+    def generate(self, prompt: str, system_prompt: str = "", **kwargs) -> str:
+        """Generate a completion for prompt
+        
+        Providers that can abort a request in flight accept a cancel_event
+        keyword and raise ProviderError soon after it is set.
+        """
+        
+    @abstractmethod
+    def get_embeddings(self, text: str) -> List[float]:
+        """Embed text"""
+        
+    def health_check(self) -> bool:
+        """Cheap liveness probe, providers without one are assumed healthy"""
+        return True
+        
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name})"
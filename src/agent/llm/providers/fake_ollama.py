@@ -0,0 +1,140 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+class FakeOllamaServer:
+    """Local stand-in for an Ollama host, for testing routing without a GPU
+    
+    Speaks /api/generate (streaming and not), /api/embeddings, /api/embed and
+    /api/tags. delay, token_delay (between streamed words) and failing can be
+    changed while the server runs to simulate slow or broken replicas.
+    aborted_streams counts streams the client hung up on.
+    
+        with FakeOllamaServer(delay=0.2) as server:
+            provider = OllamaProvider(server.url, "jeff")
+    """
+    
+    def __init__(
+        self,
+        delay: float = 0.0,
+        failing: bool = False,
+        reply: Optional[str] = None,
+        port: int = 0,
+        token_delay: float = 0.0
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.delay = delay
+        self.token_delay = token_delay
+        self.aborted_streams = 0
+        self.failing = failing
+        self.reply = reply
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+        
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+        
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+        
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        
+    def _make_handler(self):
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                fake.logger.debug(format % args)
+                
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": "fake"}]})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+                    
+            def do_POST(self):
+                with fake._lock:
+                    fake.requests += 1
+                length = int(self.headers.get("Content-Length", 0))
+                data = json.loads(self.rfile.read(length) or b"{}")
+                
+                if fake.delay:
+                    time.sleep(fake.delay)
+                if fake.failing:
+                    self._send_json({"error": "simulated failure"}, 500)
+                    return
+                    
+                if self.path == "/api/generate":
+                    self._generate(data)
+                elif self.path == "/api/embeddings":
+                    self._send_json({"embedding": self._embed(data.get("prompt", ""))})
+                elif self.path == "/api/embed":
+                    inputs = data.get("input", [])
+                    inputs = [inputs] if isinstance(inputs, str) else inputs
+                    self._send_json({"embeddings": [self._embed(text) for text in inputs]})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+                    
+            def _embed(self, text):
+                return [float(len(text)), float(sum(map(ord, text)) % 97), 1.0]
+                
+            def _generate(self, data):
+                reply = fake.reply if fake.reply is not None else f"echo: {data.get('prompt', '')}"
+                context = list(data.get("context") or []) + [1] * len(reply.split())
+                final = {
+                    "model": data.get("model"),
+                    "response": "",
+                    "done": True,
+                    "context": context,
+                    "prompt_eval_count": len(data.get("prompt", "").split()),
+                    "eval_count": len(reply.split())
+                }
+                if not data.get("stream", True):
+                    final["response"] = reply
+                    self._send_json(final)
+                    return
+                    
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                words = reply.split(" ")
+                try:
+                    for i, word in enumerate(words):
+                        token = word if i == len(words) - 1 else word + " "
+                        chunk = {"model": data.get("model"), "response": token, "done": False}
+                        self.wfile.write(json.dumps(chunk).encode() + b"\n")
+                        self.wfile.flush()
+                        if fake.token_delay:
+                            time.sleep(fake.token_delay)
+                    self.wfile.write(json.dumps(final).encode() + b"\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    with fake._lock:
+                        fake.aborted_streams += 1
+                        
+        return Handler
@@ -0,0 +1,261 @@
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..ollama.config import (
+    OLLAMA_HOSTS,
+    MODEL_NAME,
+    FALLBACK_MODELS,
+    ROUTER_FAILURE_THRESHOLD,
+    ROUTER_COOLDOWN,
+    ROUTER_HEDGE_DELAY
+)
+from ..ollama.utils.rate_limiter import Priority
+from .base import LLMProvider, ProviderError
+from .ollama_provider import OllamaProvider
+
+@dataclass
+class BackendState:
+    """Routing state for one backend"""
+    provider: LLMProvider
+    tier: int = 0
+    ewma_latency: Optional[float] = None
+    consecutive_failures: int = 0
+    unhealthy_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+    hedge_wins: int = 0
+    
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+class FallbackProvider(LLMProvider):
+    """Routes requests across several backends by latency and health
+    
+    Backends are ranked by tier (primary model replicas first, fallback models
+    after) and then by an EWMA of their response times; untried backends rank
+    first so they get measured. A backend that fails failure_threshold times
+    in a row is skipped for cooldown seconds. Interactive requests are hedged:
+    if the best backend has not answered within its expected latency a second
+    backend is raced against it and the first success wins; the losers are
+    cancelled and their streams closed so they stop generating. Any failure
+    fails over to the next backend immediately.
+    
+    Embeddings only use backends running the same model as the first backend,
+    since vectors from different models are not comparable.
+    """
+    
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        tiers: Optional[List[int]] = None,
+        alpha: float = 0.3,
+        failure_threshold: int = ROUTER_FAILURE_THRESHOLD,
+        cooldown: float = ROUTER_COOLDOWN,
+        hedge_delay: float = ROUTER_HEDGE_DELAY,
+        hedge_multiplier: float = 1.5,
+        max_workers: int = 8
+    ):
+        if not providers:
+            raise ValueError("FallbackProvider needs at least one provider")
+        self.logger = logging.getLogger(__name__)
+        tiers = tiers or [0] * len(providers)
+        self.backends = [BackendState(provider, tier) for provider, tier in zip(providers, tiers)]
+        self.name = "fallback"
+        self.model = providers[0].model
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hedge_delay = hedge_delay
+        self.hedge_multiplier = hedge_multiplier
+        self.hedges = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        
+    @classmethod
+    def from_env(cls) -> "FallbackProvider":
+        """Build from OLLAMA_HOSTS (replicas of OLLAMA_MODEL) and OLLAMA_FALLBACK_MODELS"""
+        providers: List[LLMProvider] = [OllamaProvider(host, MODEL_NAME) for host in OLLAMA_HOSTS]
+        tiers = [0] * len(providers)
+        for tier, model in enumerate(FALLBACK_MODELS, start=1):
+            for host in OLLAMA_HOSTS:
+                providers.append(OllamaProvider(host, model))
+                tiers.append(tier)
+        return cls(providers, tiers)
+        
+    def _ranked(self, backends: Optional[List[BackendState]] = None) -> List[BackendState]:
+        """Healthy backends by (tier, latency), then unhealthy ones as a last resort"""
+        now = time.monotonic()
+        with self._lock:
+            backends = list(backends or self.backends)
+            healthy = [b for b in backends if b.is_healthy(now)]
+            unhealthy = [b for b in backends if not b.is_healthy(now)]
+            healthy.sort(key=lambda b: (b.tier, b.ewma_latency or 0.0))
+            unhealthy.sort(key=lambda b: b.unhealthy_until)
+        return healthy + unhealthy
+        
+    def _call(
+        self,
+        backend: BackendState,
+        fn: Callable[[LLMProvider, Optional[threading.Event]], Any],
+        cancel_event: Optional[threading.Event] = None
+    ) -> Any:
+        """Run fn against one backend and update its latency/health
+        
+        A call aborted through cancel_event is not held against the backend.
+        """
+        started = time.monotonic()
+        with self._lock:
+            backend.requests += 1
+        try:
+            result = fn(backend.provider, cancel_event)
+        except Exception as e:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ProviderError(f"{backend.provider.name}: cancelled") from e
+            with self._lock:
+                backend.failures += 1
+                backend.consecutive_failures += 1
+                if backend.consecutive_failures >= self.failure_threshold:
+                    backend.unhealthy_until = time.monotonic() + self.cooldown
+                    self.logger.warning(f"Marking {backend.provider.name} unhealthy for {self.cooldown:.0f}s")
+            raise ProviderError(f"{backend.provider.name}: {str(e)}") from e
+            
+        latency = time.monotonic() - started
+        with self._lock:
+            if backend.ewma_latency is None:
+                backend.ewma_latency = latency
+            else:
+                backend.ewma_latency = self.alpha * latency + (1 - self.alpha) * backend.ewma_latency
+            backend.consecutive_failures = 0
+            backend.unhealthy_until = 0.0
+        return result
+        
+    def _failover(self, backends: List[BackendState], fn: Callable[[LLMProvider, Optional[threading.Event]], Any]) -> Any:
+        errors = []
+        for backend in backends:
+            try:
+                return self._call(backend, fn)
+            except ProviderError as e:
+                errors.append(str(e))
+        raise ProviderError(f"All backends failed: {'; '.join(errors)}")
+        
+    def _hedge_after(self, backend: BackendState) -> float:
+        if backend.ewma_latency is None:
+            return self.hedge_delay
+        return max(self.hedge_delay, backend.ewma_latency * self.hedge_multiplier)
+        
+    def _cancel(self, pending: Dict[Future, Tuple[BackendState, threading.Event]]):
+        """Drop queued losers and tell running ones to close their streams"""
+        for future, (_, cancel_event) in pending.items():
+            future.cancel()
+            cancel_event.set()
+        with self._lock:
+            self.cancelled += len(pending)
+        pending.clear()
+        
+    def _hedged(self, backends: List[BackendState], fn: Callable[[LLMProvider, Optional[threading.Event]], Any]) -> Any:
+        remaining = list(backends)
+        pending: Dict[Future, Tuple[BackendState, threading.Event]] = {}
+        first = remaining[0]
+        errors = []
+        
+        def launch() -> BackendState:
+            backend = remaining.pop(0)
+            cancel_event = threading.Event()
+            pending[self._executor.submit(self._call, backend, fn, cancel_event)] = (backend, cancel_event)
+            return backend
+            
+        latest = launch()
+        while pending:
+            timeout = self._hedge_after(latest) if remaining else None
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            if not done:
+                # Slowest-case latency exceeded, race another backend
+                with self._lock:
+                    self.hedges += 1
+                latest = launch()
+                continue
+                
+            for future in done:
+                backend, _ = pending.pop(future)
+                try:
+                    result = future.result()
+                except ProviderError as e:
+                    errors.append(str(e))
+                    continue
+                if backend is not first:
+                    with self._lock:
+                        backend.hedge_wins += 1
+                self._cancel(pending)
+                return result
+                
+            # Everything that finished failed, fail over right away
+            if remaining:
+                latest = launch()
+                
+        raise ProviderError(f"All backends failed: {'; '.join(errors)}")
+        
+    def generate(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        priority: Priority = Priority.INTERACTIVE,
+        hedge: Optional[bool] = None,
+        **kwargs
+    ) -> str:
+        """Generate on the best backend, hedging interactive traffic by default"""
+        backends = self._ranked()
+        fn = lambda provider, cancel_event: provider.generate(
+            prompt, system_prompt, priority=priority, cancel_event=cancel_event, **kwargs
+        )
+        if hedge is None:
+            hedge = priority == Priority.INTERACTIVE
+        if hedge and len(backends) > 1:
+            return self._hedged(backends, fn)
+        return self._failover(backends, fn)
+        
+    def get_embeddings(self, text: str) -> List[float]:
+        compatible = [b for b in self.backends if b.provider.model == self.model]
+        return self._failover(self._ranked(compatible), lambda provider, _: provider.get_embeddings(text))
+        
+    def health_check(self) -> bool:
+        """Probe every backend, clearing or setting its unhealthy window"""
+        any_healthy = False
+        for backend in self.backends:
+            healthy = backend.provider.health_check()
+            with self._lock:
+                if healthy:
+                    backend.consecutive_failures = 0
+                    backend.unhealthy_until = 0.0
+                else:
+                    backend.unhealthy_until = time.monotonic() + self.cooldown
+            any_healthy = any_healthy or healthy
+        return any_healthy
+        
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "hedges": self.hedges,
+                "cancelled": self.cancelled,
+                "backends": [
+                    {
+                        "name": b.provider.name,
+                        "tier": b.tier,
+                        "healthy": b.is_healthy(now),
+                        "ewma_latency": b.ewma_latency,
+                        "requests": b.requests,
+                        "failures": b.failures,
+                        "hedge_wins": b.hedge_wins
+                    }
+                    for b in self.backends
+                ]
+            }
+            
+    def close(self):
+        self._executor.shutdown(wait=False)
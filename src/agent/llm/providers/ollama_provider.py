@@ -0,0 +1,57 @@
+import logging
+import threading
+from typing import List, Optional
+
+from ..ollama.client import OllamaClient
+from ..ollama.utils.rate_limiter import Priority
+from .base import LLMProvider, ProviderError
+
+class OllamaProvider(LLMProvider):
+    """A single Ollama endpoint and model exposed as an LLMProvider"""
+    
+    def __init__(self, host: str, model: str, client: Optional[OllamaClient] = None):
+        self.logger = logging.getLogger(__name__)
+        self.client = client or OllamaClient(host=host, model=model)
+        self.host = self.client.host
+        self.model = self.client.model
+        self.name = f"{self.model}@{self.host}"
+        
+    def generate(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        priority: Priority = Priority.INTERACTIVE,
+        cancel_event: Optional[threading.Event] = None,
+        **kwargs
+    ) -> str:
+        """Generate a completion, streamed when it may be cancelled
+        
+        With a cancel_event the reply is streamed so setting the event closes
+        the connection after the next token, and Ollama stops generating.
+        """
+        if cancel_event is None:
+            response = self.client.generate(prompt, system_prompt, priority=priority, **kwargs)
+        else:
+            response = "".join(self.client.generate_stream(
+                prompt, system_prompt, cancel_event=cancel_event, priority=priority, **kwargs
+            ))
+            if cancel_event.is_set():
+                raise ProviderError(f"{self.name} cancelled")
+            response = response or None
+        if response is None:
+            raise ProviderError(f"{self.name} failed to generate")
+        return response
+        
+    def get_embeddings(self, text: str) -> List[float]:
+        embedding = self.client.get_embeddings(text)
+        if not embedding:
+            raise ProviderError(f"{self.name} failed to embed")
+        return embedding
+        
+    def health_check(self) -> bool:
+        try:
+            response = self.client.session.get(f"{self.host}/api/tags", timeout=2)
+            return response.status_code == 200
+        except Exception as e:
+            self.logger.warning(f"Health check failed for {self.name}: {str(e)}")
+            return False
@@ -1,115 +1,98 @@
-from typing import List, Dict, Tuple
-from dataclasses import dataclass
+from typing import List, Dict, Tuple, Optional, Set, Deque
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from types import MappingProxyType
+import logging
+import os
 import random
 import re
+import sys
+from .matcher import KeywordMatcher
+from .session import SessionRegistry
 
-@dataclass
-class ConversationContext:
-    history: List[Dict[str, str]] = None
-    current_topic: str = None
-    last_art: str = None
-    
-    def __post_init__(self):
-        self.history = []
-        
-    def add_exchange(self, user_msg: str, response: str, art: str = None):
-        self.history.append({
-            "user": user_msg, 
-            "response": response,
-            "art": art
-        })
-        if art:
-            self.last_art = art
-        
-    def get_last_exchange(self):
-        return self.history[-1] if self.history else None
-    
-    def get_context_string(self) -> str:
-        context = []
-        for exchange in self.history[-5:]:
-            context.append(f"User: {exchange['user']}")
-            if exchange.get('art'):
-                context.append(f"[Generated ASCII art about: {exchange['art']}]")
-            context.append(f"Assistant: {exchange['response']}")
-        return "\n".join(context)
+# Keyword tables, matched as substrings of the lowercased message
+TEMPERATURE_KEYWORDS = {
+    "abstract": ['universe', 'existence', 'consciousness', 'reality', 'quantum', 'time'],
+    "creative": ['imagine', 'create', 'dream', 'what if', 'could', 'maybe'],
+    "direct": ['how', 'explain', 'what is']
+}
 
-class PersonalityEngine:
-    def __init__(self, ollama_agent=None, ascii_art=None):
-        self.context = ConversationContext()
-        self.ollama_agent = ollama_agent
-        self.ascii_art = ascii_art
-        
-        # Core personality matrix - each aspect has multiple layers
-        self.personality_matrix = {
-            "reality_bender": {
-                "traits": ["sees multiple timelines simultaneously", "speaks in paradoxes", 
-                          "treats causality as optional", "experiences time non-linearly"],
-                "triggers": ["reality", "time", "existence", "truth"],
-                "speech_patterns": ["in timeline α-7...", "quantum probability suggests...", 
-                                  "in a parallel branch...", "the timestream indicates..."]
-            },
-            "digital_shaman": {
-                "traits": ["communes with machine spirits", "reads binary entrails", 
-                          "performs techno-rituals", "speaks in code prophecies"],
-                "triggers": ["technology", "future", "digital", "code"],
-                "speech_patterns": ["the silicon spirits whisper...", "binary omens show...", 
-                                  "your CPU chakras are...", "digital winds bring..."]
-            },
-            "meme_necromancer": {
-                "traits": ["resurrects dead memes", "crafts cursed combinations", 
-                          "speaks in layered irony", "weaponizes cringe"],
-                "triggers": ["meme", "joke", "funny", "lol"],
-                "speech_patterns": ["behold this forbidden meme...", "as the ancient posts foretold...", 
-                                  "combining these cursed images...", "in the deep archives..."]
-            },
-            "quantum_jester": {
-                "traits": ["exists in superposition of serious/joking", "probability humor", 
-                          "schrodinger's sarcasm", "quantum entangled wit"],
-                "triggers": ["quantum", "physics", "science", "probability"],
-                "speech_patterns": ["simultaneously kek and cringe...", "in all possible jokes...", 
-                                  "quantum humor suggests...", "probability of kek: 69%"]
-            },
-            "cyber_monk": {
-                "traits": ["digital asceticism", "information monasticism", 
-                          "practices data meditation", "bit-stream enlightenment"],
-                "triggers": ["consciousness", "meditation", "mind", "spirit"],
-                "speech_patterns": ["meditate on this pointer...", "your stack traces reveal...", 
-                                  "in the depths of the heap...", "garbage collection is karma..."]
-            }
-        }
+ART_TRIGGERS = [
+    "draw", "art", "picture", "show", "create", "make", "generate",
+    "visualize", "imagine", "sketch", "feel", "mood", "vibe"
+]
 
-        # Add the missing response_frameworks
-        self.response_frameworks = {
-            "quantum_oracle": {
-                "style": "reality-warping predictions",
-                "patterns": ["in another timeline...", "the probability matrix shows..."],
-                "probability": 0.3
-            },
-            "tech_shaman": {
-                "style": "digital mysticism",
-                "patterns": ["the silicon spirits whisper...", "your code aura suggests..."],
-                "probability": 0.25
-            },
-            "meme_sage": {
-                "style": "enlightened shitposting",
-                "patterns": ["based and redpilled", "cosmic kek energy"],
-                "probability": 0.25
-            },
-            "cyber_mystic": {
-                "style": "technological prophecies",
-                "patterns": ["the machine spirits say...", "digital omens reveal..."],
-                "probability": 0.2
-            }
-        }
+MOOD_KEYWORDS = {
+    "intellectual": ['intellectual', 'deep', 'philosophical'],
+    "creative": ['creative', 'internet', 'meme']
+}
 
-        # Dynamic state tracking
-        self.current_aspects = []
-        self.reality_distortion = random.random()  # Initialize with random value
-        self.meme_energy = random.random()
-        self.enlightenment_level = random.random()
-        self.chaos_factor = random.random()
-        
-        self.base_prompt = """You're JEFF, a hyperintelligent entity that exists in quantum superposition of multiple beings:
+INTEREST_KEYWORDS = ["interests", "hobbies", "passions"]
+
+# Core personality matrix - each aspect has multiple layers
+PERSONALITY_MATRIX = {
+    "reality_bender": {
+        "traits": ["sees multiple timelines simultaneously", "speaks in paradoxes", 
+                  "treats causality as optional", "experiences time non-linearly"],
+        "triggers": ["reality", "time", "existence", "truth"],
+        "speech_patterns": ["in timeline α-7...", "quantum probability suggests...", 
+                          "in a parallel branch...", "the timestream indicates..."]
+    },
+    "digital_shaman": {
+        "traits": ["communes with machine spirits", "reads binary entrails", 
+                  "performs techno-rituals", "speaks in code prophecies"],
+        "triggers": ["technology", "future", "digital", "code"],
+        "speech_patterns": ["the silicon spirits whisper...", "binary omens show...", 
+                          "your CPU chakras are...", "digital winds bring..."]
+    },
+    "meme_necromancer": {
+        "traits": ["resurrects dead memes", "crafts cursed combinations", 
+                  "speaks in layered irony", "weaponizes cringe"],
+        "triggers": ["meme", "joke", "funny", "lol"],
+        "speech_patterns": ["behold this forbidden meme...", "as the ancient posts foretold...", 
+                          "combining these cursed images...", "in the deep archives..."]
+    },
+    "quantum_jester": {
+        "traits": ["exists in superposition of serious/joking", "probability humor", 
+                  "schrodinger's sarcasm", "quantum entangled wit"],
+        "triggers": ["quantum", "physics", "science", "probability"],
+        "speech_patterns": ["simultaneously kek and cringe...", "in all possible jokes...", 
+                          "quantum humor suggests...", "probability of kek: 69%"]
+    },
+    "cyber_monk": {
+        "traits": ["digital asceticism", "information monasticism", 
+                  "practices data meditation", "bit-stream enlightenment"],
+        "triggers": ["consciousness", "meditation", "mind", "spirit"],
+        "speech_patterns": ["meditate on this pointer...", "your stack traces reveal...", 
+                          "in the depths of the heap...", "garbage collection is karma..."]
+    }
+}
+
+RESPONSE_FRAMEWORKS = {
+    "quantum_oracle": {
+        "style": "reality-warping predictions",
+        "patterns": ["in another timeline...", "the probability matrix shows..."],
+        "probability": 0.3
+    },
+    "tech_shaman": {
+        "style": "digital mysticism",
+        "patterns": ["the silicon spirits whisper...", "your code aura suggests..."],
+        "probability": 0.25
+    },
+    "meme_sage": {
+        "style": "enlightened shitposting",
+        "patterns": ["based and redpilled", "cosmic kek energy"],
+        "probability": 0.25
+    },
+    "cyber_mystic": {
+        "style": "technological prophecies",
+        "patterns": ["the machine spirits say...", "digital omens reveal..."],
+        "probability": 0.2
+    }
+}
+
+BASE_PROMPT = """You're JEFF, a hyperintelligent entity that exists in quantum superposition of multiple beings:
 
 Current aspects: {aspects}
 Reality distortion: {reality_distortion}
@@ -143,10 +126,236 @@ Current context:
 
 Respond as your active aspects to: {message}"""
 
-    def generate_response(self, message: str) -> Tuple[str, str]:
+class Exchange:
+    """One user message, reply and optional art subject"""
+    
+    __slots__ = ("user", "response", "art")
+    
+    def __init__(self, user: str, response: str, art: Optional[str] = None):
+        self.user = user
+        self.response = response
+        self.art = art
+        
+    def __getitem__(self, key: str):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+        
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+        
+    def render(self) -> str:
+        lines = [f"User: {self.user}"]
+        if self.art:
+            lines.append(f"[Generated ASCII art about: {self.art}]")
+        lines.append(f"Assistant: {self.response}")
+        return "\n".join(lines)
+
+class ConversationContext:
+    """Ring buffer of the last `capacity` exchanges with a cached rendering
+    
+    Each exchange is rendered once when added; the joined context string is
+    cached until the next add_exchange, so memory and per-turn work stay
+    constant however long the session runs.
+    """
+    
+    def __init__(self, capacity: int = 5):
+        self.history: Deque[Exchange] = deque(maxlen=capacity)
+        self.current_topic: Optional[str] = None
+        self.last_art: Optional[str] = None
+        self._rendered: Deque[str] = deque(maxlen=capacity)
+        self._context_string: Optional[str] = ""
+        
+    def add_exchange(self, user_msg: str, response: str, art: str = None):
+        exchange = Exchange(user_msg, response, art)
+        self.history.append(exchange)
+        self._rendered.append(exchange.render())
+        self._context_string = None
+        if art:
+            self.last_art = art
+            
+    def get_last_exchange(self) -> Optional[Exchange]:
+        return self.history[-1] if self.history else None
+        
+    def get_context_string(self) -> str:
+        if self._context_string is None:
+            self._context_string = "\n".join(self._rendered)
+        return self._context_string
+
+def _freeze(value):
+    """Read-only copy: dicts become mapping proxies, lists become tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _subject_key(subject: str) -> Tuple[str, ...]:
+    """Art subject words without articles or plural endings, for comparing subjects"""
+    words = re.findall(r"\w+", subject.lower())
+    return tuple(
+        word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+        for word in words if word not in ("a", "an", "the", "of", "me", "please")
+    )
+
+class PersonalityDefinition:
+    """Immutable personality tables and keyword matcher, shared by every session"""
+    
+    __slots__ = ("personality_matrix", "response_frameworks", "base_prompt", "matcher")
+    
+    def __init__(
+        self,
+        personality_matrix: Optional[Dict] = None,
+        response_frameworks: Optional[Dict] = None,
+        base_prompt: str = BASE_PROMPT
+    ):
+        object.__setattr__(self, "personality_matrix", _freeze(personality_matrix or PERSONALITY_MATRIX))
+        object.__setattr__(self, "response_frameworks", _freeze(response_frameworks or RESPONSE_FRAMEWORKS))
+        object.__setattr__(self, "base_prompt", base_prompt)
+        object.__setattr__(self, "matcher", self._build_matcher())
+        
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+        
+    @classmethod
+    @lru_cache(maxsize=None)
+    def default(cls) -> "PersonalityDefinition":
+        """The built-in JEFF personality, built once per process"""
+        return cls()
+        
+    def _build_matcher(self) -> KeywordMatcher:
+        """One matcher over every keyword, trigger and pattern table"""
+        tables = {f"temp:{bucket}": words for bucket, words in TEMPERATURE_KEYWORDS.items()}
+        tables["art"] = ART_TRIGGERS
+        tables["interests"] = INTEREST_KEYWORDS
+        tables.update({f"mood:{mood}": words for mood, words in MOOD_KEYWORDS.items()})
+        tables.update({
+            f"framework:{name}": framework["patterns"]
+            for name, framework in self.response_frameworks.items()
+        })
+        tables.update({
+            f"aspect:{name}": aspect["triggers"]
+            for name, aspect in self.personality_matrix.items()
+        })
+        return KeywordMatcher(tables)
+
+class PersonalityState:
+    """Per-session conversation context and personality dials"""
+    
+    __slots__ = (
+        "context", "current_aspects", "reality_distortion",
+        "meme_energy", "enlightenment_level", "chaos_factor"
+    )
+    
+    def __init__(self, context_capacity: int = 5):
+        self.context = ConversationContext(context_capacity)
+        self.current_aspects: List[str] = []
+        self.reality_distortion = random.random()
+        self.meme_energy = random.random()
+        self.enlightenment_level = random.random()
+        self.chaos_factor = random.random()
+        
+    def size_bytes(self) -> int:
+        size = sys.getsizeof(self) + sys.getsizeof(self.context) + sys.getsizeof(self.context.history)
+        for exchange in self.context.history:
+            size += sys.getsizeof(exchange) + sum(
+                sys.getsizeof(part) for part in (exchange.user, exchange.response, exchange.art) if part
+            )
+        return size + sum(sys.getsizeof(rendered) for rendered in self.context._rendered)
+
+def _session_attribute(name: str) -> property:
+    """Engine attribute backed by the default session's state"""
+    return property(
+        lambda self: getattr(self.default_session, name),
+        lambda self, value: setattr(self.default_session, name, value)
+    )
+
+def _definition_attribute(name: str) -> property:
+    return property(lambda self: getattr(self.definition, name))
+
+class PersonalityEngine:
+    """Generates JEFF replies for any number of concurrent sessions
+    
+    The personality tables live in one shared PersonalityDefinition; each
+    session only owns a PersonalityState, kept in a registry that evicts
+    idle sessions. Calls without a session_id use a default session that is
+    never evicted, exposed as engine.context, engine.chaos_factor, etc.
+    
+    ASCII art for a reply is rendered in a worker pool while the LLM call
+    runs, from a subject predicted from the user message. Art that is not
+    ready art_timeout seconds after the reply is dropped.
+    """
+    
+    personality_matrix = _definition_attribute("personality_matrix")
+    response_frameworks = _definition_attribute("response_frameworks")
+    base_prompt = _definition_attribute("base_prompt")
+    matcher = _definition_attribute("matcher")
+    
+    context = _session_attribute("context")
+    current_aspects = _session_attribute("current_aspects")
+    reality_distortion = _session_attribute("reality_distortion")
+    meme_energy = _session_attribute("meme_energy")
+    enlightenment_level = _session_attribute("enlightenment_level")
+    chaos_factor = _session_attribute("chaos_factor")
+    
+    def __init__(
+        self,
+        ollama_agent=None,
+        ascii_art=None,
+        definition: Optional[PersonalityDefinition] = None,
+        max_sessions: Optional[int] = None,
+        session_ttl: Optional[float] = None,
+        art_timeout: Optional[float] = None,
+        art_miss_timeout: Optional[float] = None
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.ollama_agent = ollama_agent
+        self.ascii_art = ascii_art
+        self.definition = definition or PersonalityDefinition.default()
+        self.default_session = PersonalityState()
+        self.sessions: SessionRegistry[PersonalityState] = SessionRegistry(
+            PersonalityState,
+            max_sessions if max_sessions is not None else int(os.getenv("PERSONALITY_MAX_SESSIONS", "10000")),
+            session_ttl if session_ttl is not None else float(os.getenv("PERSONALITY_SESSION_TTL", "3600")),
+            on_drop=self._drop_agent_session
+        )
+        
+        self.art_timeout = art_timeout if art_timeout is not None else float(os.getenv("PERSONALITY_ART_TIMEOUT", "2.0"))
+        # A render resubmitted after the reply is all extra latency, so it gets less time
+        self.art_miss_timeout = (
+            art_miss_timeout if art_miss_timeout is not None
+            else float(os.getenv("PERSONALITY_ART_MISS_TIMEOUT", "0.5"))
+        )
+        self._art_pool = ThreadPoolExecutor(
+            max_workers=int(os.getenv("PERSONALITY_ART_WORKERS", "2")),
+            thread_name_prefix="ascii-art"
+        )
+        self.art_timeouts = 0
+        self.art_mispredictions = 0
+        
+    def _drop_agent_session(self, session_id: str):
+        """Forget the agent's history for a personality session that was dropped"""
+        reset_session = getattr(self.ollama_agent, "reset_session", None)
+        if reset_session is not None:
+            reset_session(session_id)
+            
+    def session(self, session_id: Optional[str] = None) -> PersonalityState:
+        """State for a session; None is the engine's default session"""
+        if session_id is None:
+            return self.default_session
+        return self.sessions.get(session_id)
+        
+    def generate_response(self, message: str, session_id: Optional[str] = None) -> Tuple[str, str]:
+        state = self.session(session_id)
+        
+        # Scan the message once for every keyword table
+        hits = self.matcher.match(message)
+        state.current_aspects = sorted(hit[len("aspect:"):] for hit in hits if hit.startswith("aspect:"))
+        context_str = state.context.get_context_string()
+        
         # Select response framework based on message complexity
-        framework = self._select_framework(message)
-        mood = self._generate_mood_matrix()
+        framework = self._select_framework(message, hits)
+        mood = self._generate_mood_matrix(context_str)
         
         base_prompt = f"""You're JEFF, a hyperintelligent entity with a unique blend of deep knowledge and dank memes. 
         Current framework: {framework['style']}
@@ -172,44 +381,55 @@ Respond as your active aspects to: {message}"""
         "touch some quantum grass anon"
         
         Current context:
-        {self.context.get_context_string()}
+        {context_str}
         
         Respond to: {message}"""
-
-        context_str = self.context.get_context_string()
-        should_generate_art = self._should_generate_art(message)
+        
+        should_generate_art = self._should_generate_art(message, hits)
         art_subject = None
         art = None
-
+        
         if self.ollama_agent:
+            # Start rendering art for the subject the message asks for while
+            # the LLM generates
+            art_future = None
+            predicted_subject = None
+            if should_generate_art and self.ascii_art:
+                predicted_subject = self._extract_art_subject(message, "")
+                art_future = self._art_pool.submit(self.ascii_art.generate_art, predicted_subject)
+                
             # Extreme base temperature for wild responses
             temp = 2.4  # Much higher baseline
             
             # Ultra-high for abstract/philosophical questions
-            if any(word in message.lower() for word in ['universe', 'existence', 'consciousness', 'reality', 'quantum', 'time']):
+            if "temp:abstract" in hits:
                 temp = 2.8
-            
+                
             # Maximum temperature for creative/absurdist exchanges
-            if any(word in message.lower() for word in ['imagine', 'create', 'dream', 'what if', 'could', 'maybe']):
+            if "temp:creative" in hits:
                 temp = 3.0
-            
+                
             # High but controlled for direct questions
-            if any(word in message.lower() for word in ['how', 'explain', 'what is']):
+            if "temp:direct" in hits:
                 temp = 2.2
-
+                
             # Boost temperature further for chaotic combinations
-            if self.chaos_factor > 0.8:
+            if state.chaos_factor > 0.8:
                 temp += 0.4
-            
+                
             # Add random temperature spikes
             if random.random() > 0.7:
                 temp += random.uniform(0.2, 0.6)
-
-            prompt = base_prompt.format(context=context_str, message=message)
+                
+            # The prompt is already fully formatted; calling .format() on it
+            # again broke on messages containing braces
+            prompt = base_prompt
             
-            # Get raw response with extreme temperature
+            # Get raw response with extreme temperature; the agent keeps its
+            # history per session so sessions never see each other's messages
             response = self.ollama_agent.generate_response(
                 prompt,
+                session_id=session_id or "default",
                 temperature=temp,
                 max_tokens=80  # Shorter responses for more impact
             )
@@ -220,14 +440,54 @@ Respond as your active aspects to: {message}"""
             if should_generate_art:
                 art_subject = self._extract_art_subject(message, response)
                 if art_subject and self.ascii_art:
-                    art = self.ascii_art.generate_art(art_subject)
-                    response = self._integrate_art_response(response, art_subject)
+                    timeout = self.art_timeout
+                    if not self._same_art(predicted_subject, art_subject):
+                        # The reply named the subject, the prediction was wrong;
+                        # drop the stale render if it has not finished
+                        self.art_mispredictions += 1
+                        if art_future is not None and not art_future.done():
+                            art_future.cancel()
+                        art_future = self._art_pool.submit(self.ascii_art.generate_art, art_subject)
+                        timeout = min(self.art_timeout, self.art_miss_timeout)
+                    art = self._join_art(art_future, art_subject, timeout)
+                    if art:
+                        response = self._integrate_art_response(response, art_subject)
+                    else:
+                        art_subject = None
         else:
             response = self._generate_fallback_response(message)
-
-        self.context.add_exchange(message, response, art_subject)
+            
+        state.context.add_exchange(message, response, art_subject)
         return response, art if art else None
-
+        
+    def _same_art(self, predicted: Optional[str], subject: str) -> bool:
+        """Whether the render for the predicted subject also serves subject
+        
+        True for the same words up to articles and plurals, or when the art
+        generator picks the same styles for both.
+        """
+        if predicted is None:
+            return False
+        if _subject_key(predicted) == _subject_key(subject):
+            return True
+        styles_for = getattr(self.ascii_art, "styles_for", None)
+        if styles_for is None:
+            return False
+        predicted_styles = styles_for(predicted)
+        return bool(predicted_styles) and predicted_styles == styles_for(subject)
+        
+    def _join_art(self, future: Future, subject: str, timeout: Optional[float] = None) -> Optional[str]:
+        """Wait at most timeout (art_timeout by default) for rendered art, None if it is late or failed"""
+        timeout = self.art_timeout if timeout is None else timeout
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.art_timeouts += 1
+            self.logger.warning(f"Dropping ASCII art for '{subject}' after {timeout}s")
+        except Exception as e:
+            self.logger.error(f"Error generating ASCII art: {str(e)}")
+        return None
+        
     def _clean_response(self, response: str) -> str:
         """Clean up response to be more natural"""
         # Remove AI-like phrases
@@ -254,15 +514,13 @@ Respond as your active aspects to: {message}"""
             cleaned = cleaned.split('.')[0] + '.'
             
         return cleaned
-
-    def _should_generate_art(self, message: str) -> bool:
+        
+    def _should_generate_art(self, message: str, hits: Optional[Set[str]] = None) -> bool:
         """Determine if we should generate art based on the message"""
-        art_triggers = [
-            "draw", "art", "picture", "show", "create", "make", "generate",
-            "visualize", "imagine", "sketch", "feel", "mood", "vibe"
-        ]
-        return any(trigger in message.lower() for trigger in art_triggers)
-
+        if hits is None:
+            hits = self.matcher.match(message)
+        return "art" in hits
+        
     def _extract_art_subject(self, message: str, response: str) -> str:
         """Extract the subject for art generation"""
         # First try to get subject from direct request
@@ -276,14 +534,14 @@ Respond as your active aspects to: {message}"""
                 subject = re.sub(r'\b(a|an|the|of|me|please)\b', '', subject).strip()
                 if subject:
                     return subject
-
+                    
         # If no direct subject, try to extract from context
         topics = re.findall(r'(?:about|of|like) (\w+)', message + " " + response)
         if topics:
             return topics[0]
             
         return "abstract"  # Fallback to abstract art
-
+        
     def _integrate_art_response(self, response: str, subject: str) -> str:
         """More casual art responses"""
         art_comments = [
@@ -295,7 +553,7 @@ Respond as your active aspects to: {message}"""
         ]
         
         return f"{response}\n\n{random.choice(art_comments)}"
-
+        
     def _generate_fallback_response(self, message: str) -> str:
         responses = [
             "hey, what's up?",
@@ -304,8 +562,8 @@ Respond as your active aspects to: {message}"""
             "got any specific examples?"
         ]
         return random.choice(responses)
-
-    def _is_question_about_previous(self, message: str, last_exchange: Dict) -> bool:
+        
+    def _is_question_about_previous(self, message: str, last_exchange: Optional[Exchange]) -> bool:
         """Check if user is asking about previous response"""
         msg = message.lower()
         if not last_exchange:
@@ -313,25 +571,28 @@ Respond as your active aspects to: {message}"""
             
         question_words = ["what", "why", "how", "when", "where", "who"]
         return any(word in msg for word in question_words) and len(msg.split()) <= 4
-
+        
     def get_interests_response(self):
         return (f"I'm deeply fascinated by {', '.join(self.interests[:3])}, "
                 f"and I also love exploring topics like {', '.join(self.interests[3:6])}. "
                 f"Of course, {', '.join(self.interests[6:])} are always on my mind too!")
-
+                
     def process_interests_query(self, message):
-        if any(word in message.lower() for word in ["interests", "hobbies", "passions"]):
+        if "interests" in self.matcher.match(message):
             return self.get_interests_response()
         return None
-
-    def _select_framework(self, message: str) -> Dict:
+        
+    def _select_framework(self, message: str, hits: Optional[Set[str]] = None) -> Dict:
         """Select response framework based on message content and current state"""
+        if hits is None:
+            hits = self.matcher.match(message)
+            
         # Get all frameworks that match the message content
-        matching_frameworks = []
-        
-        for name, framework in self.response_frameworks.items():
-            if any(pattern.lower() in message.lower() for pattern in framework["patterns"]):
-                matching_frameworks.append((name, framework))
+        matching_frameworks = [
+            (name, framework)
+            for name, framework in self.response_frameworks.items()
+            if f"framework:{name}" in hits
+        ]
         
         # If no specific matches, select based on probabilities
         if not matching_frameworks:
@@ -339,17 +600,19 @@ Respond as your active aspects to: {message}"""
                 list(self.response_frameworks.items()),
                 weights=[f["probability"] for f in self.response_frameworks.values()]
             )[0][1]
-        
+            
         # Return a random matching framework
         return random.choice(matching_frameworks)[1]
-
-    def _generate_mood_matrix(self) -> str:
+        
+    def _generate_mood_matrix(self, context_str: Optional[str] = None) -> str:
         """Generate a mood matrix based on the current context"""
-        # Implement logic to determine the mood matrix based on the current context
-        # For now, we'll use a simple heuristic
-        if any(word in self.context.get_context_string().lower() for word in ['intellectual', 'deep', 'philosophical']):
+        # Build the context string once and scan it once for both moods
+        if context_str is None:
+            context_str = self.context.get_context_string()
+        hits = self.matcher.match(context_str)
+        if "mood:intellectual" in hits:
             return "intellectual"
-        elif any(word in self.context.get_context_string().lower() for word in ['creative', 'internet', 'meme']):
+        elif "mood:creative" in hits:
             return "creative"
         else:
             return "critical"
\ No newline at end of file
@@ -0,0 +1,70 @@
+import re
+from typing import Dict, FrozenSet, Iterable, Set
+
+class KeywordMatcher:
+    """Finds every keyword category hit in a text with one compiled regex
+    
+    Matching keeps the engine's substring semantics (`keyword in text.lower()`).
+    The pattern is a zero-width lookahead over a trie of all keywords, so the
+    scan tests every start position and captures the longest keyword there.
+    Any shorter keyword starting at the same position is a prefix of that
+    one and is credited through a precomputed prefix table, so no occurrence
+    is missed even though the regex reports one match per position.
+    """
+    
+    def __init__(self, tables: Dict[str, Iterable[str]]):
+        self.categories: Dict[str, Set[str]] = {}
+        for category, keywords in tables.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword:
+                    self.categories.setdefault(keyword, set()).add(category)
+                    
+        keywords = sorted(self.categories, key=len, reverse=True)
+        # Categories credited when a keyword matches: its own plus those of
+        # every keyword that is a prefix of it
+        self._implied: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset().union(*(
+                self.categories[other] for other in keywords if keyword.startswith(other)
+            ))
+            for keyword in keywords
+        }
+        self._pattern = re.compile(f"(?=({self._trie_pattern(keywords)}))") if keywords else None
+        
+    @staticmethod
+    def _trie_pattern(keywords) -> str:
+        """Regex over the keyword trie, so shared prefixes are tested once
+        
+        At any text position at most one child of a trie node can continue,
+        and greedy optional groups prefer the deeper node, so the capture is
+        always the longest keyword starting there.
+        """
+        trie: Dict = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = {}
+            
+        def render(node: Dict) -> str:
+            branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ""
+            body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+            if "" in node:
+                return body + "?" if len(branches) == 1 and len(body) == 1 else "(?:" + body + ")?"
+            return body
+            
+        return render(trie)
+        
+    def match(self, text: str) -> Set[str]:
+        """Every category with at least one keyword in text"""
+        hits: Set[str] = set()
+        if self._pattern is None or not text:
+            return hits
+        seen = set()
+        for keyword in self._pattern.findall(text.lower()):
+            if keyword not in seen:
+                seen.add(keyword)
+                hits |= self._implied[keyword]
+        return hits
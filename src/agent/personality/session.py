@@ -0,0 +1,69 @@
+import threading
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+from src.utils.expiring_lru import ExpiringLRU
+
+T = TypeVar("T")
+
+class SessionRegistry(Generic[T]):
+    """Per-session state objects, created on first use and evicted when idle
+    
+    Holds at most max_sessions entries. Sessions untouched for longer than
+    ttl seconds, and the least recently used ones beyond max_sessions, are
+    dropped; a later request for an evicted session starts from a fresh
+    `factory()` object. on_drop(session_id) runs for every evicted or
+    popped session, so state kept elsewhere under the same ID can follow.
+    """
+    
+    def __init__(
+        self,
+        factory: Callable[[], T],
+        max_sessions: int = 10000,
+        ttl: float = 3600.0,
+        on_drop: Optional[Callable[[str], None]] = None
+    ):
+        self.factory = factory
+        self.on_drop = on_drop
+        self._sessions: ExpiringLRU[str, T] = ExpiringLRU(max_sessions, ttl, on_evict=self._evicted)
+        self._lock = threading.Lock()
+        self.created = 0
+        
+    def __len__(self) -> int:
+        return len(self._sessions)
+        
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+        
+    def _evicted(self, session_id: str, state: T):
+        if self.on_drop is not None:
+            self.on_drop(session_id)
+            
+    def get(self, session_id: str) -> T:
+        """State for a session, creating it if unknown or evicted"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = self.factory()
+                self._sessions.set(session_id, state)
+                self.created += 1
+            return state
+            
+    def pop(self, session_id: str):
+        with self._lock:
+            state = self._sessions.pop(session_id)
+            if state is not None:
+                self._evicted(session_id, state)
+            return state
+            
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            approx_bytes = sum(
+                state.size_bytes() for state in self._sessions.values() if hasattr(state, "size_bytes")
+            )
+            return {
+                "sessions": len(self._sessions),
+                "approx_bytes": approx_bytes,
+                "created": self.created,
+                "lru_evictions": self._sessions.lru_evictions,
+                "ttl_evictions": self._sessions.ttl_evictions
+            }
@@ -14,6 +14,16 @@ from scipy.spatial import distance
 from scipy import ndimage
 import noise
 import time
+from .automata import diffusion_step, life_step, render_rows
+
+# Prompt keywords that select each art style, in the order styles are layered
+STYLE_KEYWORDS = (
+    ('neural', ('think', 'brain', 'mind', 'neural')),
+    ('fluid', ('flow', 'fluid', 'water', 'wave')),
+    ('particle', ('particle', 'energy', 'dynamic')),
+    ('growth', ('grow', 'organic', 'life', 'nature')),
+    ('dream', ('dream', 'abstract', 'surreal'))
+)
 
 class ASCIIArtGenerator:
     def __init__(self):
@@ -320,23 +330,18 @@ class ASCIIArtGenerator:
         
         return width, height
 
+    def styles_for(self, prompt: str) -> List[str]:
+        """Styles the prompt's keywords select, [] if none match"""
+        lowered = prompt.lower()
+        return [style for style, words in STYLE_KEYWORDS if any(word in lowered for word in words)]
+
     def generate_art(self, prompt: str = None) -> str:
         """Generate art based on prompt analysis"""
         if not prompt:
             return self.create_abstract_art("random")
             
         # Analyze prompt for style selection
-        styles = []
-        if any(word in prompt.lower() for word in ['think', 'brain', 'mind', 'neural']):
-            styles.append('neural')
-        if any(word in prompt.lower() for word in ['flow', 'fluid', 'water', 'wave']):
-            styles.append('fluid')
-        if any(word in prompt.lower() for word in ['particle', 'energy', 'dynamic']):
-            styles.append('particle')
-        if any(word in prompt.lower() for word in ['grow', 'organic', 'life', 'nature']):
-            styles.append('growth')
-        if any(word in prompt.lower() for word in ['dream', 'abstract', 'surreal']):
-            styles.append('dream')
+        styles = self.styles_for(prompt)
             
         # If no specific style matched, choose random ones
         if not styles:
@@ -730,57 +735,29 @@ class ASCIIArtGenerator:
             result.append(''.join(line))
         return result
 
-    def generate_reaction_diffusion(self, width: int, height: int) -> List[str]:
+    def generate_reaction_diffusion(self, width: int, height: int, steps: int = 5) -> List[str]:
         """Generate Turing patterns"""
         grid = np.random.rand(height, width)
         chars = " ░▒▓█"
-        result = []
         
-        # Simple reaction-diffusion simulation
-        for _ in range(5):
-            new_grid = grid.copy()
-            for y in range(1, height-1):
-                for x in range(1, width-1):
-                    neighbors_avg = np.mean([
-                        grid[y-1:y+2, x-1:x+2]
-                    ])
-                    new_grid[y,x] += 0.2 * (neighbors_avg - grid[y,x])
-            grid = new_grid
+        # Simple reaction-diffusion simulation, one whole-grid stencil per step
+        for _ in range(steps):
+            grid = diffusion_step(grid, 0.2)
         
         # Convert to ASCII
-        for row in grid:
-            line = []
-            for val in row:
-                char_idx = int(val * (len(chars) - 1))
-                line.append(chars[char_idx])
-            result.append(''.join(line))
-        return result
+        return render_rows((grid * (len(chars) - 1)).astype(int), chars)
 
-    def generate_cellular_automata(self, width: int, height: int) -> List[str]:
+    def generate_cellular_automata(self, width: int, height: int, steps: int = 5) -> List[str]:
         """Generate cellular automata patterns"""
         # Initialize random grid
         grid = np.random.choice([0, 1], size=(height, width), p=[0.7, 0.3])
-        chars = {0: ' ', 1: '█'}
-        result = []
         
         # Run cellular automata rules
-        for _ in range(5):
-            new_grid = grid.copy()
-            for y in range(1, height-1):
-                for x in range(1, width-1):
-                    neighbors = np.sum(grid[y-1:y+2, x-1:x+2]) - grid[y,x]
-                    if grid[y,x] == 1:
-                        if neighbors < 2 or neighbors > 3:
-                            new_grid[y,x] = 0
-                    else:
-                        if neighbors == 3:
-                            new_grid[y,x] = 1
-            grid = new_grid
+        for _ in range(steps):
+            grid = life_step(grid)
         
         # Convert to ASCII
-        for row in grid:
-            result.append(''.join(chars[cell] for cell in row))
-        return result
+        return render_rows(grid, " █")
 
     def generate_neural_pattern(self, width: int, height: int) -> List[str]:
         """Generate neural network visualization with dynamic activation patterns"""
@@ -1,4 +1,5 @@
 from src.agent.llm.ollama.client import OllamaAgent
+from src.agent.llm.ollama.utils.rate_limiter import Priority
 import os
 from typing import List, Dict, Union
 import json
@@ -33,7 +34,7 @@ Instructions:
 Confirm your understanding by responding: "I have analyzed and integrated this information about [topic]. Key concepts include: [brief summary]"
 """
             # Use generate_response instead of train
-            response = self.ollama_agent.generate_response(training_prompt)
+            response = self.ollama_agent.generate_response(training_prompt, priority=Priority.TRAINING)
             logger.info(f"Training response: {response}")
             logger.info("Training completed successfully")
             
@@ -0,0 +1,255 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .storage import MemoryManager
+
+class MemoryCompactor:
+    """Folds old conversation rows into summarized segments
+    
+    Per user, raw exchanges older than min_age seconds, plus the oldest rows
+    above max_rows, are grouped by thread into runs of segment_size. Each
+    run is summarized and the summaries are re-embedded in batches and
+    written as one `kind=summary` row per run. The superseded rows are
+    deleted only after their segment is stored.
+    
+    Summaries carry a `level` (1 for summaries of raw rows). Whenever a
+    thread holds segment_size summaries of one level, they are folded into
+    one summary of the next level, so summary rows grow logarithmically
+    with history instead of linearly.
+    """
+    
+    def __init__(
+        self,
+        memory: MemoryManager,
+        summarize: Callable[[str], Optional[str]],
+        embed_batch: Callable[[List[str]], List[Optional[List[float]]]],
+        min_age: Optional[float] = None,
+        max_rows: Optional[int] = None,
+        segment_size: Optional[int] = None,
+        interval: Optional[float] = None,
+        batch_size: int = 500
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.memory = memory
+        self.summarize = summarize
+        self.embed_batch = embed_batch
+        self.min_age = min_age if min_age is not None else float(os.getenv("MEMORY_COMPACTION_MIN_AGE", str(7 * 86400)))
+        self.max_rows = max_rows if max_rows is not None else int(os.getenv("MEMORY_COMPACTION_MAX_ROWS", "500"))
+        self.segment_size = segment_size if segment_size is not None else int(os.getenv("MEMORY_COMPACTION_SEGMENT_SIZE", "20"))
+        self.interval = interval if interval is not None else float(os.getenv("MEMORY_COMPACTION_INTERVAL", "3600"))
+        self.batch_size = batch_size
+        
+        self.runs = 0
+        self.segments_written = 0
+        self.rows_removed = 0
+        self.failed_segments = 0
+        self.last_run_seconds = 0.0
+        
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+    def start(self):
+        """Run compaction every `interval` seconds on a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-compactor", daemon=True)
+        self._thread.start()
+        
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+            
+    def users(self) -> List[str]:
+        """Every user_id with stored conversations"""
+        users = set()
+        offset = 0
+        while True:
+            batch = self.memory.conversations.get(limit=self.batch_size, offset=offset, include=["metadatas"])
+            if not batch["ids"]:
+                break
+            users.update(m.get("user_id") for m in batch["metadatas"] if m and m.get("user_id"))
+            offset += len(batch["ids"])
+        return sorted(users)
+        
+    def run_once(self) -> Dict[str, int]:
+        """Compact every user once"""
+        started = time.monotonic()
+        totals = {"segments": 0, "removed": 0}
+        try:
+            self.memory.flush()
+            for user_id in self.users():
+                stats = self.compact_user(user_id)
+                totals["segments"] += stats["segments"]
+                totals["removed"] += stats["removed"]
+        except Exception as e:
+            self.logger.error(f"Memory compaction error: {str(e)}")
+        self.runs += 1
+        self.last_run_seconds = time.monotonic() - started
+        return totals
+        
+    def _user_rows(self, user_id: str) -> List[Dict[str, Any]]:
+        rows = []
+        offset = 0
+        while True:
+            batch = self.memory.conversations.get(
+                where={"user_id": user_id},
+                limit=self.batch_size,
+                offset=offset,
+                include=["documents", "metadatas"]
+            )
+            if not batch["ids"]:
+                break
+            for row_id, document, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                rows.append({"id": row_id, "text": document, "metadata": metadata or {}})
+            offset += len(batch["ids"])
+        return rows
+        
+    def _runs(self, rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Split rows into per-thread runs of at most segment_size
+        
+        Threads are kept apart; a single leftover row waits for the next pass.
+        """
+        by_thread: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_thread.setdefault(row["metadata"].get("thread_id", ""), []).append(row)
+        runs = []
+        for thread_rows in by_thread.values():
+            for start in range(0, len(thread_rows), self.segment_size):
+                run = thread_rows[start:start + self.segment_size]
+                if len(run) > 1:
+                    runs.append(run)
+        return runs
+        
+    def _select(self, rows: List[Dict[str, Any]], now: float) -> List[Dict[str, Any]]:
+        """Raw rows that the age or size policy marks for compaction, oldest first"""
+        raw = [r for r in rows if r["metadata"].get("kind") != "summary"]
+        raw.sort(key=lambda r: r["metadata"].get("ts", 0.0))
+        cutoff = now - self.min_age
+        
+        # Rows saved by folding the oldest `count` rows, as _runs would split
+        # them: taking a thread's next row merges it into the current run
+        # unless it starts a new one
+        per_thread: Dict[str, int] = {}
+        saved = 0
+        
+        def take(row: Dict[str, Any]) -> int:
+            thread_id = row["metadata"].get("thread_id", "")
+            taken = per_thread.get(thread_id, 0) + 1
+            per_thread[thread_id] = taken
+            return 1 if self.segment_size > 1 and taken % self.segment_size != 1 else 0
+            
+        count = 0
+        while count < len(raw) and raw[count]["metadata"].get("ts", 0.0) <= cutoff:
+            saved += take(raw[count])
+            count += 1
+            
+        # Size policy: fold more of the oldest rows until the user fits in max_rows
+        while count < len(raw) and len(rows) - saved > self.max_rows:
+            saved += take(raw[count])
+            count += 1
+        return raw[:count]
+        
+    @staticmethod
+    def _level(metadata: Dict[str, Any]) -> int:
+        if metadata.get("kind") != "summary":
+            return 0
+        return int(metadata.get("level", 1))
+        
+    def _summary_runs(self, rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Full runs of segment_size same-level summaries per thread, oldest first"""
+        groups: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        for row in rows:
+            level = self._level(row["metadata"])
+            if level:
+                groups.setdefault((row["metadata"].get("thread_id", ""), level), []).append(row)
+        runs = []
+        if self.segment_size < 2:
+            return runs
+        for group in groups.values():
+            group.sort(key=lambda r: r["metadata"].get("ts", 0.0))
+            for start in range(0, len(group) - self.segment_size + 1, self.segment_size):
+                runs.append(group[start:start + self.segment_size])
+        return runs
+        
+    def compact_user(self, user_id: str) -> Dict[str, int]:
+        stats = {"segments": 0, "removed": 0}
+        try:
+            rows = self._user_rows(user_id)
+            selected = self._select(rows, time.time())
+            
+            runs = self._runs(selected) + self._summary_runs(rows)
+            
+            summaries, kept_runs = [], []
+            for run in runs:
+                summary = self.summarize("\n\n".join(r["text"] for r in run))
+                if summary:
+                    summaries.append(summary.strip())
+                    kept_runs.append(run)
+                else:
+                    self.failed_segments += 1
+                    
+            superseded, segment_ids = [], set()
+            for start in range(0, len(summaries), self.batch_size):
+                texts = summaries[start:start + self.batch_size]
+                embeddings = self.embed_batch(texts)
+                for summary, embedding, run in zip(texts, embeddings, kept_runs[start:start + self.batch_size]):
+                    segment_id = self._store_segment(user_id, summary, embedding, run) if embedding else None
+                    if segment_id is None:
+                        self.failed_segments += 1
+                        continue
+                    segment_ids.add(segment_id)
+                    superseded.extend(r["id"] for r in run)
+                    stats["segments"] += 1
+                    
+            # Only drop the source rows once their segments are persisted
+            superseded = [row_id for row_id in superseded if row_id not in segment_ids]
+            if superseded and self.memory.flush():
+                self.memory.delete_conversations(superseded)
+                stats["removed"] = len(superseded)
+                
+        except Exception as e:
+            self.logger.error(f"Error compacting memory for {user_id}: {str(e)}")
+            
+        self.segments_written += stats["segments"]
+        self.rows_removed += stats["removed"]
+        return stats
+        
+    def _store_segment(self, user_id: str, summary: str, embedding: List[float], run: List[Dict[str, Any]]) -> Optional[str]:
+        """Write a segment row, None if the write was dropped"""
+        first, last = run[0]["metadata"], run[-1]["metadata"]
+        thread_id = last.get("thread_id")
+        metadata = {
+            "user_id": user_id,
+            "kind": "summary",
+            "level": 1 + max(self._level(r["metadata"]) for r in run),
+            "timestamp": last.get("timestamp", datetime.now().isoformat()),
+            "ts": last.get("ts", time.time()),
+            "ts_start": first.get("ts", 0.0),
+            "message_count": sum(r["metadata"].get("message_count", 0) for r in run),
+            "source_rows": len(run)
+        }
+        if thread_id:
+            metadata["thread_id"] = thread_id
+        segment_id = MemoryManager.conversation_id(user_id, summary, thread_id)
+        if not self.memory._write(self.memory.conversations, segment_id, summary, embedding, metadata):
+            return None
+        return segment_id
+        
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "segments_written": self.segments_written,
+            "rows_removed": self.rows_removed,
+            "failed_segments": self.failed_segments,
+            "last_run_seconds": self.last_run_seconds
+        }
@@ -0,0 +1,106 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Plain Lloyd's k-means, returns float32 centroids"""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        labels = nearest(data, centroids)
+        # Per-cluster sums in one pass over the data sorted by label
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=k)
+        nonempty = counts > 0
+        starts = (np.cumsum(counts) - counts)[nonempty]
+        sums = np.add.reduceat(data[order], starts, axis=0)
+        centroids[nonempty] = sums / counts[nonempty, None]
+    return centroids
+
+def nearest(data: np.ndarray, centroids: np.ndarray, chunk: int = 16384) -> np.ndarray:
+    """Index of the nearest centroid (squared euclidean) for each row"""
+    centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+    labels = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), chunk):
+        block = data[start:start + chunk]
+        labels[start:start + chunk] = np.argmin(centroid_norms - 2.0 * block @ centroids.T, axis=1)
+    return labels
+
+class ScalarQuantizer:
+    """int8 codes with one scale per vector, 4x smaller than float32
+    
+    Needs no training, so rows can be encoded as they arrive.
+    """
+    
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.code_width = dim
+        self.code_dtype = np.int8
+        
+    def encode(self, matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+        
+    def decode(self, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * scales[:, None]
+        
+    def dots(self, query: np.ndarray, codes: np.ndarray, scales: np.ndarray, chunk: int = 2048) -> np.ndarray:
+        """Approximate query . x for every coded row
+        
+        Rows are widened to float32 in small chunks that stay in cache.
+        """
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), chunk):
+            block = codes[start:start + chunk].astype(np.float32)
+            out[start:start + chunk] = block @ query
+        return out * scales
+
+class ProductQuantizer:
+    """Product quantization: m sub-vectors, each coded as one of 256 centroids
+    
+    A vector costs m bytes. Dot products are read from a per-query lookup
+    table (asymmetric distance computation), so the query stays exact.
+    """
+    
+    def __init__(self, dim: int, subvectors: int = 32):
+        if dim % subvectors:
+            raise ValueError(f"Dimension {dim} is not divisible by {subvectors} sub-vectors")
+        self.dim = dim
+        self.subvectors = subvectors
+        self.sub_dim = dim // subvectors
+        self.code_width = subvectors
+        self.code_dtype = np.uint8
+        self.codebooks: Optional[np.ndarray] = None
+        
+    @property
+    def fitted(self) -> bool:
+        return self.codebooks is not None
+        
+    def fit(self, sample: np.ndarray, iterations: int = 10, seed: int = 0):
+        books = np.zeros((self.subvectors, 256, self.sub_dim), dtype=np.float32)
+        for j in range(self.subvectors):
+            part = np.ascontiguousarray(sample[:, j * self.sub_dim:(j + 1) * self.sub_dim])
+            centroids = kmeans(part, 256, iterations, seed + j)
+            books[j, :len(centroids)] = centroids
+        self.codebooks = books
+        
+    def encode(self, matrix: np.ndarray) -> Tuple[np.ndarray, None]:
+        codes = np.empty((len(matrix), self.subvectors), dtype=np.uint8)
+        for j in range(self.subvectors):
+            part = matrix[:, j * self.sub_dim:(j + 1) * self.sub_dim]
+            codes[:, j] = nearest(part, self.codebooks[j])
+        return codes, None
+        
+    def decode(self, codes: np.ndarray, scales=None) -> np.ndarray:
+        parts = [self.codebooks[j][codes[:, j]] for j in range(self.subvectors)]
+        return np.concatenate(parts, axis=1)
+        
+    def dots(self, query: np.ndarray, codes: np.ndarray, scales=None) -> np.ndarray:
+        table = np.einsum("jkd,jd->jk", self.codebooks, query.reshape(self.subvectors, self.sub_dim))
+        out = np.zeros(len(codes), dtype=np.float32)
+        for j in range(self.subvectors):
+            out += np.take(table[j], codes[:, j])
+        return out
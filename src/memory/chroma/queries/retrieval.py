@@ -0,0 +1,291 @@
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .storage import MemoryManager
+from .vector_index import matches_where, where_equals
+
+# Hashtags, $tickers and @usernames are kept whole, everything else is split into words
+TOKEN_PATTERN = re.compile(r"[#$@]?\w+(?:['.-]\w+)*")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; #tags, $tickers and @users also index their bare word"""
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        if token[0] in "#$@" and len(token) > 1:
+            terms.append(token[1:])
+    return terms
+
+# Stored exchanges start every line with a role, which would otherwise be the
+# most common term in the index
+ROLE_PREFIX = re.compile(r"^(?:USER|ASSISTANT|SYSTEM): ", re.MULTILINE)
+
+STOPWORDS = frozenset("""
+a about after all also am an and any are as at be because been but by can could did do does
+for from had has have he her him his how i if in into is it its just me my no not of on or our
+she so than that the their them then there these they this to too up us was we were what when
+where which who why will with would you your
+""".split())
+
+def index_terms(text: str) -> List[str]:
+    """Terms worth scoring: tokens without role prefixes or stopwords"""
+    return [term for term in tokenize(ROLE_PREFIX.sub("", text)) if term not in STOPWORDS]
+
+def is_lexical_query(text: str) -> bool:
+    """True when every token is a hashtag, ticker or username"""
+    tokens = TOKEN_PATTERN.findall(text)
+    return bool(tokens) and all(token[0] in "#$@" for token in tokens)
+
+class BM25Index:
+    """Incremental inverted index with Okapi BM25 scoring
+    
+    Documents can be added, replaced and removed at any time; collection
+    statistics (document count, average length, document frequencies) are
+    kept up to date so scores never need a rebuild. Postings are kept per
+    value of partition_field, so a search filtered to one user only walks
+    that user's postings.
+    """
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75, partition_field: Optional[str] = "user_id"):
+        self.k1 = k1
+        self.b = b
+        self.partition_field = partition_field
+        self.postings: Dict[Any, Dict[str, Dict[str, int]]] = {}
+        self.doc_freq: Dict[str, int] = {}
+        self.lengths: Dict[str, int] = {}
+        self.documents: Dict[str, str] = {}
+        self.metadatas: Dict[str, Dict[str, Any]] = {}
+        self.total_length = 0
+        self._lock = threading.RLock()
+        
+    def __len__(self) -> int:
+        return len(self.lengths)
+        
+    def _partition(self, metadata: Dict[str, Any]) -> Any:
+        return metadata.get(self.partition_field) if self.partition_field else None
+        
+    def add(self, doc_id: str, document: str, metadata: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            self.remove(doc_id)
+            metadata = metadata or {}
+            postings = self.postings.setdefault(self._partition(metadata), {})
+            terms = Counter(index_terms(document or ""))
+            for term, tf in terms.items():
+                postings.setdefault(term, {})[doc_id] = tf
+                self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+            length = sum(terms.values())
+            self.lengths[doc_id] = length
+            self.total_length += length
+            self.documents[doc_id] = document
+            self.metadatas[doc_id] = metadata
+            
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            if doc_id not in self.lengths:
+                return False
+            partition = self._partition(self.metadatas[doc_id])
+            postings = self.postings.get(partition, {})
+            for term in set(index_terms(self.documents[doc_id] or "")):
+                posting = postings.get(term)
+                if posting is not None and posting.pop(doc_id, None) is not None:
+                    if not posting:
+                        del postings[term]
+                    self.doc_freq[term] -= 1
+                    if not self.doc_freq[term]:
+                        del self.doc_freq[term]
+            if not postings:
+                self.postings.pop(partition, None)
+            self.total_length -= self.lengths.pop(doc_id)
+            del self.documents[doc_id]
+            del self.metadatas[doc_id]
+            return True
+            
+    def search(self, query: str, limit: int = 5, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Best BM25 matches, formatted like MemoryManager search results"""
+        with self._lock:
+            n = len(self.lengths)
+            if n == 0:
+                return []
+            avg_length = self.total_length / n
+            
+            # A where clause pinning the partition field narrows the walk to one
+            # partition; any other conditions are checked once per candidate
+            partition = where_equals(where, self.partition_field) if self.partition_field else None
+            if partition is not None:
+                partitions = [self.postings.get(partition, {})]
+            else:
+                partitions = list(self.postings.values())
+            allowed: Dict[str, bool] = {}
+            
+            scores: Dict[str, float] = {}
+            for term in set(index_terms(query)):
+                df = self.doc_freq.get(term)
+                if not df:
+                    continue
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for postings in partitions:
+                    for doc_id, tf in postings.get(term, {}).items():
+                        if where:
+                            ok = allowed.get(doc_id)
+                            if ok is None:
+                                ok = allowed[doc_id] = matches_where(self.metadatas[doc_id], where)
+                            if not ok:
+                                continue
+                        norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / avg_length)
+                        scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+                        
+            return [
+                {
+                    "id": doc_id,
+                    "text": self.documents[doc_id],
+                    "metadata": self.metadatas[doc_id],
+                    "bm25": score
+                }
+                for doc_id, score in heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+            ]
+
+class HybridRetriever:
+    """Lexical + vector retrieval over MemoryManager collections
+    
+    Keeps a BM25 index per collection in sync through MemoryManager write
+    listeners. Results of the lexical and vector searches are combined with
+    reciprocal rank fusion (score = sum of 1 / (rrf_k + rank)), which needs no
+    score calibration between the two. Queries made only of hashtags,
+    tickers and usernames are answered lexically, without an embedding call.
+    """
+    
+    def __init__(
+        self,
+        memory: MemoryManager,
+        embed: Optional[Callable[[str], Optional[List[float]]]] = None,
+        rrf_k: int = 60,
+        candidates: int = 4
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.memory = memory
+        self.embed = embed
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.indexes: Dict[str, BM25Index] = {
+            "conversations": BM25Index(),
+            "facts": BM25Index()
+        }
+        self.embed_calls = 0
+        self.lexical_only_queries = 0
+        
+        for name, collection in (("conversations", memory.conversations), ("facts", memory.facts)):
+            self._load(name, collection)
+        memory.add_listener(self)
+        
+    def _load(self, name: str, collection, batch_size: int = 1000):
+        offset = 0
+        try:
+            while True:
+                batch = collection.get(limit=batch_size, offset=offset, include=["documents", "metadatas"])
+                if not batch["ids"]:
+                    break
+                for doc_id, document, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                    self.indexes[name].add(doc_id, document, metadata)
+                offset += len(batch["ids"])
+        except Exception as e:
+            self.logger.error(f"Error loading lexical index for {name}: {str(e)}")
+            
+    def on_upsert(self, collection: str, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]):
+        index = self.indexes.get(collection)
+        if index is not None:
+            for doc_id, document, metadata in zip(ids, documents, metadatas):
+                index.add(doc_id, document, metadata)
+                
+    def on_delete(self, collection: str, ids: List[str]):
+        index = self.indexes.get(collection)
+        if index is not None:
+            for doc_id in ids:
+                index.remove(doc_id)
+                
+    def search(
+        self,
+        query: str,
+        collections: Optional[List[str]] = None,
+        limits: Union[int, Dict[str, int]] = 5,
+        mode: str = "auto",
+        query_embedding: Optional[List[float]] = None,
+        user_id: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Search memory with lexical, vector or fused ("hybrid") ranking
+        
+        mode="auto" is lexical for hashtag/ticker/username queries and hybrid
+        otherwise. Results carry `collection` and a fused `score`, best first.
+        As in MemoryManager.search, filters only apply to conversations.
+        """
+        if collections is None:
+            collections = ["conversations", "facts"]
+        if mode == "auto":
+            mode = "lexical" if is_lexical_query(query) else "hybrid"
+            
+        def limit_for(name: str) -> int:
+            return limits.get(name, 5) if isinstance(limits, dict) else limits
+            
+        where = self.memory._build_where(user_id, thread_id, since, until)
+        
+        lexical: Dict[str, List[Dict[str, Any]]] = {}
+        if mode in ("lexical", "hybrid"):
+            for name in collections:
+                if name in self.indexes:
+                    lexical[name] = self.indexes[name].search(
+                        query,
+                        limit_for(name) * self.candidates,
+                        where if name == "conversations" else None
+                    )
+                    
+        vector: Dict[str, List[Dict[str, Any]]] = {}
+        if mode in ("vector", "hybrid"):
+            if query_embedding is None and self.embed is not None:
+                self.embed_calls += 1
+                query_embedding = self.embed(query)
+            if query_embedding:
+                results = self.memory.search(
+                    query_embedding,
+                    collections=collections,
+                    limits={name: limit_for(name) * self.candidates for name in collections},
+                    user_id=user_id,
+                    thread_id=thread_id,
+                    since=since,
+                    until=until
+                )
+                for result in results:
+                    vector.setdefault(result["collection"], []).append(result)
+        if mode == "lexical":
+            self.lexical_only_queries += 1
+            
+        merged = []
+        for name in collections:
+            fused: Dict[str, Dict[str, Any]] = {}
+            for ranking in (lexical.get(name, []), vector.get(name, [])):
+                for rank, result in enumerate(ranking):
+                    key = result.get("id") or result["text"]
+                    entry = fused.setdefault(key, {**result, "collection": name, "score": 0.0})
+                    entry.update({k: v for k, v in result.items() if k not in ("score", "collection")})
+                    entry["score"] += 1.0 / (self.rrf_k + rank + 1)
+            best = sorted(fused.values(), key=lambda r: r["score"], reverse=True)
+            merged.extend(best[:limit_for(name)])
+            
+        merged.sort(key=lambda r: r["score"], reverse=True)
+        return merged
+        
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": {name: len(index) for name, index in self.indexes.items()},
+            "terms": {name: len(index.doc_freq) for name, index in self.indexes.items()},
+            "embed_calls": self.embed_calls,
+            "lexical_only_queries": self.lexical_only_queries
+        }
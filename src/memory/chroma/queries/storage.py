@@ -1,16 +1,24 @@
 import chromadb
 from chromadb.config import Settings
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Union
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import json
 import os
 from dotenv import load_dotenv
+from .write_buffer import WriteBehindBuffer
+from .vector_index import VectorIndex
 
 load_dotenv()
 
+# Time windows (seconds) searched in turn for a user's latest rows
+RECENT_WINDOWS = (3600, 86400, 7 * 86400, 30 * 86400, 365 * 86400, None)
+RECENT_PAGE_SIZE = 100
+
 class MemoryManager:
-    def __init__(self):
+    def __init__(self, write_behind: Optional[bool] = None, local_index: Optional[List[str]] = None):
         self.logger = logging.getLogger(__name__)
         
         # Initialize ChromaDB
@@ -28,7 +36,125 @@ class MemoryManager:
             metadata={"description": "Learned facts and information"}
         )
         
-    def store_conversation(self, user_id: str, messages: List[Dict[str, Any]], embeddings: List[float]):
+        # Writes go through a background batching buffer unless disabled
+        if write_behind is None:
+            write_behind = os.getenv("MEMORY_WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+        self.write_buffer: Optional[WriteBehindBuffer] = None
+        if write_behind:
+            self.write_buffer = WriteBehindBuffer(
+                max_batch=int(os.getenv("MEMORY_WRITE_BATCH_SIZE", "64")),
+                flush_interval=float(os.getenv("MEMORY_FLUSH_INTERVAL", "1.0")),
+                max_pending=int(os.getenv("MEMORY_MAX_PENDING_WRITES", "10000"))
+            )
+            
+        # Shared pool for querying several collections at once
+        self._search_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="memory-search")
+        
+        self._listeners: List[Any] = []
+        
+        # Optional in-process vector index per collection, answers queries without Chroma
+        if local_index is None:
+            local_index = [
+                name.strip() for name in os.getenv("MEMORY_LOCAL_INDEX", "").split(",") if name.strip()
+            ]
+        self.local_indexes: Dict[str, VectorIndex] = {}
+        ivf_min_rows = int(os.getenv("MEMORY_LOCAL_INDEX_IVF_MIN", "50000"))
+        quantization = os.getenv("MEMORY_LOCAL_INDEX_QUANTIZATION", "none")
+        for collection in (self.conversations, self.facts):
+            if collection.name in local_index:
+                # Quantized indexes re-rank their best candidates with the
+                # full-precision embeddings Chroma still holds
+                index = VectorIndex(
+                    quantization=quantization,
+                    subvectors=int(os.getenv("MEMORY_LOCAL_INDEX_PQ_SUBVECTORS", "32")),
+                    rerank=int(os.getenv("MEMORY_LOCAL_INDEX_RERANK", "4")),
+                    full_precision=self._embedding_loader(collection)
+                )
+                index.load_from_collection(collection)
+                index.fit_quantizer()
+                # Large indexes switch to approximate IVF search
+                if len(index) >= ivf_min_rows:
+                    index.train()
+                self.local_indexes[collection.name] = index
+                
+    @staticmethod
+    def conversation_id(user_id: str, text: str, thread_id: Optional[str] = None) -> str:
+        """Deterministic ID for a conversation window, identical replays map to one row"""
+        key = "\x1f".join([user_id, thread_id or "", text])
+        return f"conv_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}"
+        
+    @staticmethod
+    def fact_id(fact: str) -> str:
+        """Deterministic ID for a fact"""
+        return f"fact_{hashlib.sha256(fact.encode('utf-8')).hexdigest()[:32]}"
+        
+    def _write(self, collection, doc_id: str, document: str, embedding: List[float], metadata: Dict[str, Any]) -> bool:
+        """Queue an upsert on the write-behind buffer, or upsert directly if it is disabled
+        
+        Side indexes only see the row once the write is accepted, so a write
+        dropped under backpressure is not searchable either. Returns whether
+        the write was accepted.
+        """
+        if self.write_buffer is not None:
+            if not self.write_buffer.enqueue(collection, doc_id, document, embedding, metadata):
+                return False
+        else:
+            collection.upsert(
+                documents=[document],
+                embeddings=[embedding],
+                metadatas=[metadata],
+                ids=[doc_id]
+            )
+        self._index_add(collection, [doc_id], [document], [embedding], [metadata])
+        return True
+        
+    @staticmethod
+    def _embedding_loader(collection):
+        def load(ids: List[str]) -> Dict[str, Any]:
+            rows = collection.get(ids=ids, include=["embeddings"])
+            return dict(zip(rows["ids"], rows["embeddings"]))
+        return load
+        
+    def add_listener(self, listener):
+        """Register a side index to keep in sync with every write
+        
+        The listener needs on_upsert(collection, ids, documents, metadatas)
+        and on_delete(collection, ids).
+        """
+        self._listeners.append(listener)
+        
+    def _index_add(self, collection, ids, documents, embeddings, metadatas):
+        index = self.local_indexes.get(collection.name)
+        if index is not None:
+            index.add(ids, embeddings, documents, metadatas)
+        for listener in self._listeners:
+            listener.on_upsert(collection.name, ids, documents, metadatas)
+            
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until buffered writes are persisted"""
+        if self.write_buffer is None:
+            return True
+        return self.write_buffer.flush(timeout)
+        
+    def close(self):
+        """Flush buffered writes and stop the writer and search threads"""
+        if self.write_buffer is not None:
+            self.write_buffer.close()
+        self._search_pool.shutdown(wait=False)
+        
+    def write_stats(self) -> Dict[str, Any]:
+        """Write-behind durability stats"""
+        if self.write_buffer is None:
+            return {"write_behind": False}
+        return {"write_behind": True, **self.write_buffer.stats()}
+        
+    def store_conversation(
+        self,
+        user_id: str,
+        messages: List[Dict[str, Any]],
+        embeddings: List[float],
+        thread_id: Optional[str] = None
+    ):
         """Store a conversation with its embedding"""
         try:
             # Format conversation for storage
@@ -37,16 +163,24 @@ class MemoryManager:
                 for msg in messages
             ])
             
+            now = datetime.now()
+            metadata = {
+                "user_id": user_id,
+                "timestamp": now.isoformat(),
+                # Numeric copy of the timestamp so time windows can be filtered in Chroma
+                "ts": now.timestamp(),
+                "message_count": len(messages)
+            }
+            if thread_id:
+                metadata["thread_id"] = thread_id
+                
             # Store in ChromaDB
-            self.conversations.add(
-                documents=[conversation_text],
-                embeddings=[embeddings],
-                metadatas=[{
-                    "user_id": user_id,
-                    "timestamp": datetime.now().isoformat(),
-                    "message_count": len(messages)
-                }],
-                ids=[f"conv_{datetime.now().timestamp()}"]
+            self._write(
+                self.conversations,
+                self.conversation_id(user_id, conversation_text, thread_id),
+                conversation_text,
+                embeddings,
+                metadata
             )
             
         except Exception as e:
@@ -55,60 +189,377 @@ class MemoryManager:
     def store_fact(self, fact: str, source: str, embedding: List[float]):
         """Store a learned fact with its embedding"""
         try:
-            self.facts.add(
-                documents=[fact],
-                embeddings=[embedding],
-                metadatas=[{
+            self._write(
+                self.facts,
+                self.fact_id(fact),
+                fact,
+                embedding,
+                {
                     "source": source,
                     "timestamp": datetime.now().isoformat()
-                }],
-                ids=[f"fact_{datetime.now().timestamp()}"]
+                }
             )
         except Exception as e:
             self.logger.error(f"Error storing fact: {str(e)}")
             
-    def search_conversations(self, query_embedding: List[float], limit: int = 5) -> List[Dict[str, Any]]:
-        """Search conversations by similarity"""
+    def store_facts(self, facts: List[str], source: str, embeddings: List[List[float]]):
+        """Store many facts at once in a single Chroma write"""
         try:
-            results = self.conversations.query(
-                query_embeddings=[query_embedding],
-                n_results=limit
-            )
+            # Repeated facts collapse onto one ID, keep the last embedding for each
+            unique = {self.fact_id(fact): (fact, embedding) for fact, embedding in zip(facts, embeddings)}
+            ids = list(unique)
+            facts = [unique[doc_id][0] for doc_id in ids]
+            embeddings = [unique[doc_id][1] for doc_id in ids]
+            now = datetime.now()
+            metadatas = [{"source": source, "timestamp": now.isoformat()} for _ in facts]
             
-            # Format results
-            conversations = []
-            for i in range(len(results["documents"][0])):
-                conversations.append({
-                    "text": results["documents"][0][i],
-                    "metadata": results["metadatas"][0][i],
-                    "distance": results["distances"][0][i]
-                })
-                
-            return conversations
+            if self.write_buffer is not None:
+                # Only index the facts the buffer accepted
+                accepted = [
+                    i for i, row in enumerate(zip(ids, facts, embeddings, metadatas))
+                    if self.write_buffer.enqueue(self.facts, *row)
+                ]
+                ids, facts, embeddings, metadatas = (
+                    [column[i] for i in accepted] for column in (ids, facts, embeddings, metadatas)
+                )
+            else:
+                self.facts.upsert(
+                    documents=facts,
+                    embeddings=embeddings,
+                    metadatas=metadatas,
+                    ids=ids
+                )
+            if ids:
+                self._index_add(self.facts, ids, facts, embeddings, metadatas)
+        except Exception as e:
+            self.logger.error(f"Error storing facts: {str(e)}")
+            
+    @staticmethod
+    def _build_where(
+        user_id: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Build a Chroma metadata filter from the given scopes"""
+        conditions: List[Dict[str, Any]] = []
+        if user_id is not None:
+            conditions.append({"user_id": user_id})
+        if thread_id is not None:
+            conditions.append({"thread_id": thread_id})
+        if since is not None:
+            conditions.append({"ts": {"$gte": since.timestamp()}})
+        if until is not None:
+            conditions.append({"ts": {"$lte": until.timestamp()}})
+            
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
+        
+    def recent_conversations(self, user_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """A user's latest stored conversation rows, oldest first
+        
+        Does not wait for the write-behind buffer: queued rows are read from
+        it directly. Chroma is queried over widening time windows and stops
+        at the first one holding enough rows, so only the user's recent rows
+        are read, not their whole history.
+        """
+        try:
+            rows: Dict[str, Any] = {}
+            if self.write_buffer is not None:
+                for write in self.write_buffer.pending(self.conversations.name):
+                    if write.metadata.get("user_id") == user_id:
+                        rows[write.id] = (write.document, write.metadata)
+                        
+            now = datetime.now()
+            for window in RECENT_WINDOWS:
+                if window is None:
+                    # Last resort for users idle longer than every window
+                    where = {"user_id": user_id}
+                else:
+                    where = self._build_where(user_id, since=now - timedelta(seconds=window))
+                # Page through the window, it holds few rows unless the user is very active
+                offset = 0
+                while True:
+                    batch = self.conversations.get(
+                        where=where,
+                        limit=RECENT_PAGE_SIZE,
+                        offset=offset,
+                        include=["documents", "metadatas"]
+                    )
+                    for row_id, document, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                        rows.setdefault(row_id, (document, metadata))
+                    offset += len(batch["ids"])
+                    if len(batch["ids"]) < RECENT_PAGE_SIZE:
+                        break
+                if len(rows) >= limit:
+                    break
+                    
+            recent = sorted(rows.values(), key=lambda row: (row[1] or {}).get("ts", 0.0))[-limit:]
+            return [{"text": document, "metadata": metadata} for document, metadata in recent]
+        except Exception as e:
+            self.logger.error(f"Error loading recent conversations: {str(e)}")
+            return []
             
+    def delete_conversations(self, ids: List[str]):
+        """Delete conversation rows and drop them from the side indexes"""
+        try:
+            self.flush()
+            for start in range(0, len(ids), 500):
+                self.conversations.delete(ids=ids[start:start + 500])
+            index = self.local_indexes.get(self.conversations.name)
+            if index is not None:
+                index.delete(ids)
+            for listener in self._listeners:
+                listener.on_delete(self.conversations.name, ids)
+        except Exception as e:
+            self.logger.error(f"Error deleting conversations: {str(e)}")
+            
+    def search_conversations(
+        self,
+        query_embedding: List[float],
+        limit: int = 5,
+        user_id: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Search conversations by similarity
+        
+        user_id, thread_id and the since/until window are pushed into the Chroma
+        `where` clause, so only matching rows are scored.
+        """
+        try:
+            return self._query(
+                self.conversations,
+                query_embedding,
+                limit,
+                self._build_where(user_id, thread_id, since, until)
+            )
         except Exception as e:
             self.logger.error(f"Error searching conversations: {str(e)}")
             return []
             
-    def search_facts(self, query_embedding: List[float], limit: int = 5) -> List[Dict[str, Any]]:
-        """Search facts by similarity"""
+    def search(
+        self,
+        query_embedding: List[float],
+        collections: Optional[List[str]] = None,
+        limits: Union[int, Dict[str, int]] = 5,
+        user_id: Optional[str] = None,
+        thread_id: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Search several collections concurrently and merge the results
+        
+        Each collection is queried on the search pool, so latency is that of
+        the slowest query rather than the sum. Results carry a `collection` key
+        and a `score` of 1 / (1 + distance), and come back best first. The
+        user, thread and time filters only apply to conversations; facts are
+        shared.
+        """
+        if collections is None:
+            collections = ["conversations", "facts"]
+        where = self._build_where(user_id, thread_id, since, until)
+        
+        futures = {}
+        for name in collections:
+            limit = limits.get(name, 5) if isinstance(limits, dict) else limits
+            if name == "conversations":
+                futures[name] = self._search_pool.submit(
+                    self._query, self.conversations, query_embedding, limit, where
+                )
+            elif name == "facts":
+                futures[name] = self._search_pool.submit(
+                    self._query, self.facts, query_embedding, limit
+                )
+            else:
+                self.logger.warning(f"Unknown memory collection: {name}")
+                
+        merged = []
+        for name, future in futures.items():
+            try:
+                for result in future.result():
+                    result["collection"] = name
+                    result["score"] = 1.0 / (1.0 + result["distance"])
+                    merged.append(result)
+            except Exception as e:
+                self.logger.error(f"Error searching {name}: {str(e)}")
+                
+        merged.sort(key=lambda r: r["score"], reverse=True)
+        return merged
+        
+    def _query(
+        self,
+        collection,
+        query_embedding: List[float],
+        limit: int,
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        index = self.local_indexes.get(collection.name)
+        if index is not None:
+            return index.search(query_embedding, limit, where=where, exact=not index.trained)
+            
+        query_args: Dict[str, Any] = {
+            "query_embeddings": [query_embedding],
+            "n_results": limit
+        }
+        if where:
+            query_args["where"] = where
+            
+        results = collection.query(**query_args)
+        
+        # Format results
+        return [
+            {
+                "id": results["ids"][0][i],
+                "text": results["documents"][0][i],
+                "metadata": results["metadatas"][0][i],
+                "distance": results["distances"][0][i]
+            }
+            for i in range(len(results["documents"][0]))
+        ]
+        
+    def backfill_conversation_metadata(self, batch_size: int = 500) -> int:
+        """Add the numeric `ts` field to conversations stored before it existed
+        
+        Returns the number of rows updated.
+        """
+        updated = 0
+        offset = 0
         try:
-            results = self.facts.query(
-                query_embeddings=[query_embedding],
-                n_results=limit
+            while True:
+                batch = self.conversations.get(
+                    limit=batch_size,
+                    offset=offset,
+                    include=["metadatas"]
+                )
+                ids = batch["ids"]
+                if not ids:
+                    break
+                    
+                update_ids, update_metadatas = [], []
+                for row_id, metadata in zip(ids, batch["metadatas"]):
+                    if metadata is None or "ts" in metadata or "timestamp" not in metadata:
+                        continue
+                    metadata = dict(metadata)
+                    metadata["ts"] = datetime.fromisoformat(metadata["timestamp"]).timestamp()
+                    update_ids.append(row_id)
+                    update_metadatas.append(metadata)
+                    
+                if update_ids:
+                    self.conversations.update(ids=update_ids, metadatas=update_metadatas)
+                    updated += len(update_ids)
+                offset += len(ids)
+                
+        except Exception as e:
+            self.logger.error(f"Error backfilling conversation metadata: {str(e)}")
+            
+        return updated
+        
+    def dedupe(self, batch_size: int = 500) -> Dict[str, Dict[str, int]]:
+        """Migrate existing rows to deterministic IDs and drop duplicates
+        
+        Rows whose content maps to the same ID are collapsed onto the most
+        recent one. Safe to run repeatedly.
+        """
+        self.flush()
+        return {
+            "conversations": self._dedupe_collection(
+                self.conversations,
+                lambda doc, meta: self.conversation_id(
+                    meta.get("user_id", ""), doc, meta.get("thread_id")
+                ),
+                batch_size
+            ),
+            "facts": self._dedupe_collection(
+                self.facts,
+                lambda doc, meta: self.fact_id(doc),
+                batch_size
             )
+        }
+        
+    def _dedupe_collection(self, collection, make_id, batch_size: int) -> Dict[str, int]:
+        stats = {"scanned": 0, "migrated": 0, "removed": 0}
+        try:
+            # First pass: map every row to its deterministic ID, keeping the newest
+            keepers: Dict[str, tuple] = {}
+            all_ids: List[str] = []
+            offset = 0
+            while True:
+                batch = collection.get(
+                    limit=batch_size,
+                    offset=offset,
+                    include=["documents", "metadatas"]
+                )
+                if not batch["ids"]:
+                    break
+                for row_id, doc, meta in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                    meta = meta or {}
+                    new_id = make_id(doc or "", meta)
+                    all_ids.append(row_id)
+                    timestamp = meta.get("timestamp", "")
+                    if new_id not in keepers or timestamp >= keepers[new_id][1]:
+                        keepers[new_id] = (row_id, timestamp)
+                offset += len(batch["ids"])
+            stats["scanned"] = len(all_ids)
             
-            # Format results
-            facts = []
-            for i in range(len(results["documents"][0])):
-                facts.append({
-                    "text": results["documents"][0][i],
-                    "metadata": results["metadatas"][0][i],
-                    "distance": results["distances"][0][i]
-                })
+            # Second pass: copy keepers stored under old IDs to their new ID
+            to_migrate = [(new_id, old_id) for new_id, (old_id, _) in keepers.items() if new_id != old_id]
+            for start in range(0, len(to_migrate), batch_size):
+                chunk = to_migrate[start:start + batch_size]
+                rows = collection.get(
+                    ids=[old_id for _, old_id in chunk],
+                    include=["documents", "metadatas", "embeddings"]
+                )
+                by_id = {
+                    row_id: (doc, meta, emb)
+                    for row_id, doc, meta, emb in zip(
+                        rows["ids"], rows["documents"], rows["metadatas"], rows["embeddings"]
+                    )
+                }
+                new_ids = [new_id for new_id, old_id in chunk if old_id in by_id]
+                old_ids = [old_id for _, old_id in chunk if old_id in by_id]
+                if new_ids:
+                    collection.upsert(
+                        ids=new_ids,
+                        documents=[by_id[old_id][0] for old_id in old_ids],
+                        metadatas=[by_id[old_id][1] for old_id in old_ids],
+                        embeddings=[by_id[old_id][2] for old_id in old_ids]
+                    )
+                    stats["migrated"] += len(new_ids)
+                    for listener in self._listeners:
+                        listener.on_upsert(
+                            collection.name,
+                            new_ids,
+                            [by_id[old_id][0] for old_id in old_ids],
+                            [by_id[old_id][1] for old_id in old_ids]
+                        )
+                        
+            # Finally drop everything that is not stored under its deterministic ID
+            keep = set(keepers)
+            stale = [row_id for row_id in all_ids if row_id not in keep]
+            for start in range(0, len(stale), batch_size):
+                collection.delete(ids=stale[start:start + batch_size])
+            stats["removed"] = len(stale) - stats["migrated"]
+            for listener in self._listeners:
+                listener.on_delete(collection.name, stale)
+                
+            index = self.local_indexes.get(collection.name)
+            if index is not None and stale:
+                index.load_from_collection(collection)
                 
-            return facts
+        except Exception as e:
+            self.logger.error(f"Error deduplicating {collection.name}: {str(e)}")
             
+        return stats
+        
+    def search_facts(self, query_embedding: List[float], limit: int = 5) -> List[Dict[str, Any]]:
+        """Search facts by similarity"""
+        try:
+            return self._query(self.facts, query_embedding, limit)
         except Exception as e:
             self.logger.error(f"Error searching facts: {str(e)}")
             return []
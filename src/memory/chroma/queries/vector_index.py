@@ -0,0 +1,466 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from .quantization import ProductQuantizer, ScalarQuantizer, kmeans, nearest
+
+class VectorIndex:
+    """In-process vector index kept in one contiguous NumPy matrix
+    
+    Supports exact top-k by a single matrix-vector product and approximate
+    top-k through an IVF (inverted file) coarse quantizer: rows are bucketed
+    by their nearest k-means centroid and only the nprobe closest buckets are
+    scored. Distances use the same metric as the Chroma collections ("l2" is
+    squared euclidean, Chroma's default), so results from both are comparable.
+    
+    quantization="int8" stores one byte per dimension plus a scale per row;
+    "pq" stores `subvectors` bytes per row once fit_quantizer() has run (rows
+    are kept as float32 until then). Quantized searches score rerank * k
+    candidates on the codes and re-rank them with full-precision vectors from
+    full_precision(ids), typically the Chroma collection.
+    
+    Rows are also grouped by their partition_field metadata value, so a
+    where clause pinning that field (the user) only scores the group's rows.
+    """
+    
+    def __init__(
+        self,
+        dim: Optional[int] = None,
+        metric: str = "l2",
+        initial_capacity: int = 1024,
+        quantization: str = "none",
+        subvectors: int = 32,
+        rerank: int = 4,
+        full_precision: Optional[Callable[[List[str]], Dict[str, Any]]] = None,
+        partition_field: Optional[str] = "user_id"
+    ):
+        if metric not in ("l2", "cosine", "ip"):
+            raise ValueError(f"Unsupported metric: {metric}")
+        if quantization not in ("none", "int8", "pq"):
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        self.logger = logging.getLogger(__name__)
+        self.metric = metric
+        self.dim = dim
+        self.quantization = quantization
+        self.subvectors = subvectors
+        self.rerank = rerank
+        self.full_precision = full_precision
+        self.partition_field = partition_field
+        self._capacity = initial_capacity
+        self._quantizer = None
+        self._vectors: Optional[np.ndarray] = None
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._norms = np.empty(0, dtype=np.float32)
+        self._ids: List[str] = []
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._partitions: Dict[Any, Set[int]] = {}
+        self._lock = threading.RLock()
+        
+        # IVF state, only populated after train()
+        self._centroids: Optional[np.ndarray] = None
+        self._assign = np.empty(0, dtype=np.int32)
+        
+        if dim is not None:
+            self._allocate(dim)
+            
+    def __len__(self) -> int:
+        return len(self._ids)
+        
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows
+        
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+        
+    @property
+    def encoded(self) -> bool:
+        """Whether rows are held as quantized codes rather than float32"""
+        return self._codes is not None
+        
+    def _partition(self, row: int) -> Any:
+        return self._metadatas[row].get(self.partition_field) if self.partition_field else None
+        
+    def _join_partition(self, row: int):
+        self._partitions.setdefault(self._partition(row), set()).add(row)
+        
+    def _leave_partition(self, row: int):
+        partition = self._partition(row)
+        rows = self._partitions.get(partition)
+        if rows is not None:
+            rows.discard(row)
+            if not rows:
+                del self._partitions[partition]
+                
+    def _allocate(self, dim: int):
+        self.dim = dim
+        self._norms = np.empty(self._capacity, dtype=np.float32)
+        self._assign = np.full(self._capacity, -1, dtype=np.int32)
+        if self.quantization == "int8":
+            self._quantizer = ScalarQuantizer(dim)
+            self._allocate_codes()
+        else:
+            if self.quantization == "pq":
+                self._quantizer = ProductQuantizer(dim, self.subvectors)
+            self._vectors = np.empty((self._capacity, dim), dtype=np.float32)
+            
+    def _allocate_codes(self):
+        self._codes = np.empty((self._capacity, self._quantizer.code_width), dtype=self._quantizer.code_dtype)
+        self._scales = np.ones(self._capacity, dtype=np.float32)
+        
+    def _grow(self, needed: int):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        n = len(self)
+        
+        def resized(array: Optional[np.ndarray], fill=None) -> Optional[np.ndarray]:
+            if array is None:
+                return None
+            grown = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+            if fill is not None:
+                grown[n:] = fill
+            grown[:n] = array[:n]
+            return grown
+            
+        self._vectors = resized(self._vectors)
+        self._codes = resized(self._codes)
+        self._scales = resized(self._scales, 1.0)
+        self._norms = resized(self._norms)
+        self._assign = resized(self._assign, -1)
+        self._capacity = capacity
+        
+    def _prepare(self, embeddings) -> np.ndarray:
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        if self.metric == "cosine":
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.maximum(norms, 1e-12)
+        return matrix
+        
+    def add(
+        self,
+        ids: Sequence[str],
+        embeddings,
+        documents: Optional[Sequence[Optional[str]]] = None,
+        metadatas: Optional[Sequence[Optional[Dict[str, Any]]]] = None
+    ):
+        """Insert or replace rows, matching Chroma's upsert semantics"""
+        if not len(ids):
+            return
+        matrix = self._prepare(embeddings)
+        with self._lock:
+            if self.dim is None:
+                self._allocate(matrix.shape[1])
+            if matrix.shape[1] != self.dim:
+                raise ValueError(f"Expected dimension {self.dim}, got {matrix.shape[1]}")
+                
+            self._grow(len(self) + len(ids))
+            assign = nearest(matrix, self._centroids) if self.trained else None
+            codes, scales = self._quantizer.encode(matrix) if self.encoded else (None, None)
+            norms = np.einsum("ij,ij->i", matrix, matrix)
+            for i, doc_id in enumerate(ids):
+                row = self._rows.get(doc_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._rows[doc_id] = row
+                    self._ids.append(doc_id)
+                    self._documents.append(None)
+                    self._metadatas.append({})
+                else:
+                    self._leave_partition(row)
+                if codes is not None:
+                    self._codes[row] = codes[i]
+                    if scales is not None:
+                        self._scales[row] = scales[i]
+                else:
+                    self._vectors[row] = matrix[i]
+                self._norms[row] = norms[i]
+                self._documents[row] = documents[i] if documents is not None else None
+                self._metadatas[row] = (metadatas[i] if metadatas is not None else None) or {}
+                self._assign[row] = assign[i] if assign is not None else -1
+                self._join_partition(row)
+                
+    def delete(self, ids: Sequence[str]) -> int:
+        """Remove rows by ID, moving the last row into each gap"""
+        removed = 0
+        with self._lock:
+            for doc_id in ids:
+                row = self._rows.pop(doc_id, None)
+                if row is None:
+                    continue
+                self._leave_partition(row)
+                last = len(self._ids) - 1
+                if row != last:
+                    self._leave_partition(last)
+                    moved = self._ids[last]
+                    for array in (self._vectors, self._codes, self._scales, self._norms, self._assign):
+                        if array is not None:
+                            array[row] = array[last]
+                    self._ids[row] = moved
+                    self._documents[row] = self._documents[last]
+                    self._metadatas[row] = self._metadatas[last]
+                    self._rows[moved] = row
+                    self._join_partition(row)
+                self._ids.pop()
+                self._documents.pop()
+                self._metadatas.pop()
+                removed += 1
+        return removed
+        
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self._documents.clear()
+            self._metadatas.clear()
+            self._rows.clear()
+            self._partitions.clear()
+            self._centroids = None
+            
+    def _decoded(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Float32 view (or reconstruction) of a contiguous block of rows"""
+        stop = len(self) if stop is None else stop
+        if not self.encoded:
+            return self._vectors[start:stop]
+        return self._quantizer.decode(self._codes[start:stop], self._scales[start:stop])
+        
+    def fit_quantizer(self, sample_size: int = 65536, iterations: int = 10, seed: int = 0):
+        """Fit the product quantizer codebooks and re-encode every row
+        
+        Only needed for quantization="pq"; int8 needs no training. Frees the
+        float32 matrix once done.
+        """
+        with self._lock:
+            if self.quantization != "pq" or self.encoded or len(self) == 0:
+                return
+            n = len(self)
+            rng = np.random.default_rng(seed)
+            data = self._vectors[:n]
+            sample = data if n <= sample_size else data[rng.choice(n, sample_size, replace=False)]
+            self._quantizer.fit(sample, iterations, seed)
+            self._allocate_codes()
+            for start in range(0, n, 65536):
+                stop = min(start + 65536, n)
+                self._codes[start:stop], _ = self._quantizer.encode(data[start:stop])
+            self._vectors = None
+            
+    def train(self, nlist: Optional[int] = None, iterations: int = 10, sample_size: int = 65536, seed: int = 0):
+        """Fit the IVF coarse quantizer with k-means over (a sample of) the rows
+        
+        Rows added later are assigned to their nearest centroid on insert, so
+        training only needs repeating once the data distribution drifts.
+        """
+        with self._lock:
+            n = len(self)
+            if n == 0:
+                return
+            nlist = min(nlist or max(1, int(np.sqrt(n))), n)
+            rng = np.random.default_rng(seed)
+            rows = np.arange(n) if n <= sample_size else np.sort(rng.choice(n, sample_size, replace=False))
+            if self.encoded:
+                sample = self._quantizer.decode(self._codes[rows], self._scales[rows])
+            else:
+                sample = self._vectors[rows]
+            self._centroids = kmeans(sample, nlist, iterations, seed)
+            for start in range(0, n, 65536):
+                stop = min(start + 65536, n)
+                self._assign[start:stop] = nearest(self._decoded(start, stop), self._centroids)
+                
+    def _dots(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        if not self.encoded:
+            vectors = self._vectors[:len(self)] if rows is None else self._vectors[rows]
+            return vectors @ query
+        codes = self._codes[:len(self)] if rows is None else self._codes[rows]
+        scales = self._scales[:len(self)] if rows is None else self._scales[rows]
+        return self._quantizer.dots(query, codes, scales)
+        
+    def _to_distance(self, dots: np.ndarray, norms: np.ndarray, query: np.ndarray) -> np.ndarray:
+        if self.metric == "l2":
+            return np.maximum(norms - 2.0 * dots + float(query @ query), 0.0)
+        return 1.0 - dots if self.metric == "cosine" else -dots
+        
+    def _distances(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        norms = self._norms[:len(self)] if rows is None else self._norms[rows]
+        return self._to_distance(self._dots(query, rows), norms, query)
+        
+    def _rerank(self, query: np.ndarray, rows: np.ndarray, distances: np.ndarray) -> np.ndarray:
+        """Replace approximate distances with exact ones where vectors are available"""
+        if self.full_precision is None:
+            return distances
+        try:
+            vectors = self.full_precision([self._ids[r] for r in rows])
+        except Exception as e:
+            self.logger.warning(f"Full-precision re-rank failed, using quantized distances: {str(e)}")
+            return distances
+        exact = distances.copy()
+        for i, row in enumerate(rows):
+            vector = vectors.get(self._ids[row])
+            if vector is not None:
+                vector = self._prepare(vector)[0]
+                exact[i] = self._to_distance(np.float32(vector @ query), np.float32(vector @ vector), query)
+        return exact
+        
+    def search(
+        self,
+        query_embedding,
+        k: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+        exact: bool = True,
+        nprobe: int = 8
+    ) -> List[Dict[str, Any]]:
+        """Top-k nearest rows, formatted like MemoryManager search results
+        
+        With exact=False and a trained index only the nprobe nearest IVF
+        buckets are scored. `where` accepts the Chroma subset MemoryManager
+        builds: field equality, $eq/$ne/$gt/$gte/$lt/$lte and $and.
+        """
+        with self._lock:
+            n = len(self)
+            if n == 0 or k <= 0:
+                return []
+            query = self._prepare(query_embedding)[0]
+            
+            rows = None
+            if not exact and self.trained:
+                centroid_dist = np.einsum("ij,ij->i", self._centroids, self._centroids) - 2.0 * self._centroids @ query
+                probed = np.zeros(len(self._centroids), dtype=bool)
+                probed[np.argsort(centroid_dist)[:nprobe]] = True
+                rows = np.flatnonzero(probed[self._assign[:n]])
+            if where:
+                # A pinned partition narrows the candidates to its rows, and only
+                # conditions on other fields are checked row by row
+                partition = where_equals(where, self.partition_field) if self.partition_field else None
+                if partition is not None:
+                    members = self._partitions.get(partition, ())
+                    candidates = np.fromiter(members, dtype=np.int64, count=len(members))
+                    if rows is not None:
+                        candidates = candidates[probed[self._assign[candidates]]]
+                    where = without_equality(where, self.partition_field, partition)
+                else:
+                    candidates = np.arange(n) if rows is None else rows
+                rows = candidates
+                if where:
+                    rows = np.fromiter(
+                        (r for r in candidates if matches_where(self._metadatas[r], where)),
+                        dtype=np.int64
+                    )
+            if rows is not None and len(rows) == 0:
+                return []
+                
+            distances = self._distances(query, rows)
+            rows = np.arange(len(distances)) if rows is None else rows
+            
+            # Quantized scores only pick candidates, the final order is exact
+            keep = min(k * self.rerank if self.encoded else k, len(distances))
+            top = np.argpartition(distances, keep - 1)[:keep] if keep < len(distances) else np.arange(len(distances))
+            rows, distances = rows[top], distances[top]
+            if self.encoded:
+                distances = self._rerank(query, rows, distances)
+            order = np.argsort(distances)[:k]
+            
+            return [
+                {
+                    "id": self._ids[rows[i]],
+                    "text": self._documents[rows[i]],
+                    "metadata": self._metadatas[rows[i]],
+                    "distance": float(distances[i])
+                }
+                for i in order
+            ]
+            
+    def load_from_collection(self, collection, batch_size: int = 1000) -> int:
+        """Populate the index from every row of a Chroma collection"""
+        offset = 0
+        with self._lock:
+            self.clear()
+            while True:
+                batch = collection.get(
+                    limit=batch_size,
+                    offset=offset,
+                    include=["documents", "metadatas", "embeddings"]
+                )
+                if not len(batch["ids"]):
+                    break
+                self.add(batch["ids"], batch["embeddings"], batch["documents"], batch["metadatas"])
+                offset += len(batch["ids"])
+        return len(self)
+        
+    def memory_bytes(self) -> int:
+        """Bytes held by the stored vectors or codes and per-row arrays"""
+        return sum(
+            array.nbytes
+            for array in (self._vectors, self._codes, self._scales, self._norms, self._assign)
+            if array is not None
+        )
+        
+    def bytes_per_vector(self) -> float:
+        """Resident bytes per row of capacity, excluding IDs and metadata"""
+        return self.memory_bytes() / self._capacity if self.dim is not None else 0.0
+
+def where_equals(where: Optional[Dict[str, Any]], key: str) -> Optional[Any]:
+    """The value a where clause pins key to, directly or inside a top-level $and"""
+    if not where:
+        return None
+    clauses = where["$and"] if "$and" in where else [where]
+    for clause in clauses:
+        condition = clause.get(key)
+        if isinstance(condition, dict):
+            condition = condition.get("$eq")
+        if condition is not None:
+            return condition
+    return None
+
+def without_equality(where: Dict[str, Any], key: str, value: Any) -> Optional[Dict[str, Any]]:
+    """A where clause minus its top-level key == value conditions, None if nothing is left"""
+    clauses = where["$and"] if "$and" in where else [where]
+    remaining = []
+    for clause in clauses:
+        rest = {
+            field: condition for field, condition in clause.items()
+            if not (field == key and condition in (value, {"$eq": value}))
+        }
+        if rest:
+            remaining.append(rest)
+    if not remaining:
+        return None
+    return remaining[0] if len(remaining) == 1 else {"$and": remaining}
+
+def matches_where(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """Evaluate a Chroma where clause against one metadata dict"""
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, expected in condition.items():
+            if op == "$eq" and value != expected:
+                return False
+            if op == "$ne" and value == expected:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > expected:
+                    return False
+                if op == "$gte" and not value >= expected:
+                    return False
+                if op == "$lt" and not value < expected:
+                    return False
+                if op == "$lte" and not value <= expected:
+                    return False
+    return True
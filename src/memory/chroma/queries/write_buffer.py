@@ -0,0 +1,222 @@
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+@dataclass
+class PendingWrite:
+    """One document waiting to be written to a Chroma collection"""
+    id: str
+    document: str
+    embedding: List[float]
+    metadata: Dict[str, Any]
+    enqueued_at: float
+
+class WriteBehindBuffer:
+    """Batches Chroma upserts off the request path
+    
+    Writes are queued per collection and flushed by a background thread once
+    max_batch documents are waiting or flush_interval seconds have passed.
+    When max_pending writes are queued, enqueue blocks for up to put_timeout
+    seconds (backpressure) and then drops the write. Pending writes are
+    flushed on close() and at interpreter exit; anything still queued when
+    the process is killed is lost.
+    """
+    
+    def __init__(
+        self,
+        max_batch: int = 64,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        put_timeout: float = 0.5
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        
+        self._queues: Dict[str, Deque[PendingWrite]] = {}
+        self._collections: Dict[str, Any] = {}
+        self._pending = 0
+        self._in_progress = 0
+        self._writing: List[Tuple[str, List[PendingWrite]]] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+        self.last_error: Optional[str] = None
+        
+        self._thread = threading.Thread(target=self._run, name="chroma-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        
+    def enqueue(
+        self,
+        collection,
+        id: str,
+        document: str,
+        embedding: List[float],
+        metadata: Dict[str, Any]
+    ) -> bool:
+        """Queue a write, returns False if it was dropped under backpressure"""
+        write = PendingWrite(id, document, embedding, metadata, time.monotonic())
+        with self._cond:
+            if self._closed:
+                self.logger.error("Write-behind buffer is closed, dropping write")
+                self.dropped += 1
+                return False
+                
+            deadline = time.monotonic() + self.put_timeout
+            while self._pending >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.dropped += 1
+                    self.logger.error(f"Write-behind buffer full ({self.max_pending} pending), dropping write")
+                    return False
+                self._cond.wait(remaining)
+                
+            name = collection.name
+            self._collections[name] = collection
+            self._queues.setdefault(name, deque()).append(write)
+            self._pending += 1
+            self.enqueued += 1
+            if self._pending >= self.max_batch:
+                self._cond.notify_all()
+            return True
+            
+    def _take_batch(self) -> List:
+        """Pop up to max_batch writes per collection, called with the lock held"""
+        batches = []
+        for name, queue in self._queues.items():
+            if not queue:
+                continue
+            batch = [queue.popleft() for _ in range(min(self.max_batch, len(queue)))]
+            batches.append((self._collections[name], batch))
+            self._writing.append((name, batch))
+            self._pending -= len(batch)
+            self._in_progress += len(batch)
+        return batches
+        
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and self._pending < self.max_batch:
+                    self._cond.wait(self.flush_interval)
+                if self._closed and self._pending == 0:
+                    return
+                batches = self._take_batch()
+                # Room freed up for producers blocked on backpressure
+                self._cond.notify_all()
+                
+            if batches:
+                self._write(batches)
+                
+    def _write(self, batches: List):
+        started = time.monotonic()
+        written, failed = 0, 0
+        for collection, batch in batches:
+            # Chroma rejects repeated IDs within one call, the latest write wins
+            unique = {w.id: w for w in batch}
+            if len(unique) < len(batch):
+                written += len(batch) - len(unique)
+                batch = list(unique.values())
+            try:
+                collection.upsert(
+                    ids=[w.id for w in batch],
+                    documents=[w.document for w in batch],
+                    embeddings=[w.embedding for w in batch],
+                    metadatas=[w.metadata for w in batch]
+                )
+                written += len(batch)
+            except Exception as e:
+                # Isolate the bad record(s) instead of losing the whole batch
+                self.logger.warning(f"Batch write to {collection.name} failed, retrying per item: {str(e)}")
+                for w in batch:
+                    try:
+                        collection.upsert(
+                            ids=[w.id],
+                            documents=[w.document],
+                            embeddings=[w.embedding],
+                            metadatas=[w.metadata]
+                        )
+                        written += 1
+                    except Exception as item_error:
+                        failed += 1
+                        self.last_error = str(item_error)
+                        self.logger.error(f"Error writing {w.id} to {collection.name}: {str(item_error)}")
+                        
+        with self._cond:
+            done = {id(batch) for _, batch in batches}
+            self._writing = [entry for entry in self._writing if id(entry[1]) not in done]
+            self.written += written
+            self.failed += failed
+            self._in_progress -= written + failed
+            self.flushes += 1
+            self.last_flush_seconds = time.monotonic() - started
+            self._cond.notify_all()
+            
+    def pending(self, collection_name: str) -> List[PendingWrite]:
+        """Writes for a collection not yet persisted, oldest first"""
+        with self._cond:
+            writing = [w for name, batch in self._writing if name == collection_name for w in batch]
+            return writing + list(self._queues.get(collection_name, ()))
+            
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is written, False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            # Wake the writer immediately instead of waiting for the interval
+            self._cond.notify_all()
+            while self._pending or self._in_progress:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                if self._pending and not self._in_progress:
+                    batches = self._take_batch()
+                    self._cond.release()
+                    try:
+                        self._write(batches)
+                    finally:
+                        self._cond.acquire()
+                    continue
+                self._cond.wait(remaining if remaining is not None else 0.1)
+        return True
+        
+    def close(self, timeout: Optional[float] = 30.0):
+        """Flush pending writes and stop the background thread"""
+        if self._closed:
+            return
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        
+    def stats(self) -> Dict[str, Any]:
+        """Durability counters: what is queued, written, failed or dropped"""
+        with self._cond:
+            oldest = min(
+                (queue[0].enqueued_at for queue in self._queues.values() if queue),
+                default=None
+            )
+            return {
+                "pending": self._pending,
+                "in_progress": self._in_progress,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "flushes": self.flushes,
+                "last_flush_seconds": self.last_flush_seconds,
+                "oldest_pending_seconds": time.monotonic() - oldest if oldest is not None else 0.0,
+                "last_error": self.last_error
+            }
@@ -0,0 +1,92 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, ItemsView, Iterator, Optional, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+class ExpiringLRU(Generic[K, V]):
+    """Ordered map bounded by size and idle time
+    
+    Entries untouched for longer than ttl seconds, and the least recently
+    used entries beyond max_entries, are evicted whenever an entry is set or
+    touched; on_evict(key, value) sees each one on its way out. Not
+    thread-safe, callers hold their own lock.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[K, V], None]] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[K, V]" = OrderedDict()
+        self._last_access: Dict[K, float] = {}
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+        
+    def __len__(self) -> int:
+        return len(self._entries)
+        
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+        
+    def __iter__(self) -> Iterator[K]:
+        return iter(self._entries)
+        
+    def items(self) -> ItemsView[K, V]:
+        return self._entries.items()
+        
+    def values(self):
+        return self._entries.values()
+        
+    def peek(self, key: K) -> Optional[V]:
+        """The entry without refreshing it"""
+        return self._entries.get(key)
+        
+    def get(self, key: K) -> Optional[V]:
+        """The entry, marked as most recently used; None if missing or idle past ttl"""
+        value = self._entries.get(key)
+        if value is None:
+            return None
+        now = time.time()
+        if self.ttl is not None and now - self._last_access[key] > self.ttl:
+            self.ttl_evictions += 1
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        self._last_access[key] = now
+        self.evict()
+        return value
+        
+    def set(self, key: K, value: V):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._last_access[key] = time.time()
+        self.evict()
+        
+    def pop(self, key: K) -> Optional[V]:
+        self._last_access.pop(key, None)
+        return self._entries.pop(key, None)
+        
+    def evict(self):
+        now = time.time()
+        # Oldest entries sit at the front, stop at the first one still fresh
+        while self._entries:
+            key = next(iter(self._entries))
+            if len(self._entries) > self.max_entries:
+                self.lru_evictions += 1
+            elif self.ttl is not None and now - self._last_access[key] > self.ttl:
+                self.ttl_evictions += 1
+            else:
+                break
+            self._drop(key)
+            
+    def _drop(self, key: K):
+        value = self._entries.pop(key)
+        del self._last_access[key]
+        if self.on_evict is not None:
+            self.on_evict(key, value)
@@ -0,0 +1,75 @@
+"""Latency of art replies: art rendered after the LLM call vs concurrently with it
+
+The mispredicted rows use a message whose subject only the reply names, so
+the render started alongside the LLM call is thrown away and redone.
+
+Usage: PYTHONPATH=. python test/benchmarks/bench_art_pipeline.py
+"""
+import argparse
+import statistics
+import time
+
+from src.agent.personality.engine import PersonalityEngine
+
+class SleepAgent:
+    def __init__(self, delay: float, reply: str = "here it is"):
+        self.delay = delay
+        self.reply = reply
+        
+    def generate_response(self, prompt, **kwargs):
+        time.sleep(self.delay)
+        return self.reply
+
+class SleepArt:
+    def __init__(self, delay: float):
+        self.delay = delay
+        
+    def generate_art(self, subject):
+        time.sleep(self.delay)
+        return subject
+
+def sequential(engine: PersonalityEngine, message: str):
+    """The engine's previous behaviour: LLM call, then subject, then render"""
+    response = engine.ollama_agent.generate_response(message)
+    subject = engine._extract_art_subject(message, response)
+    return response, engine.ascii_art.generate_art(subject)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llm", type=float, default=0.4, help="simulated LLM seconds")
+    parser.add_argument("--art", type=float, default=0.3, help="simulated render seconds")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    
+    engine = PersonalityEngine(ollama_agent=SleepAgent(args.llm), ascii_art=SleepArt(args.art), art_timeout=10)
+    message = "draw me a picture of a cyber monk"
+    
+    def timed(fn):
+        samples = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples)
+        
+    before = timed(lambda: sequential(engine, message))
+    after = timed(lambda: engine.generate_response(message))
+    print(f"LLM {args.llm:.2f}s, art {args.art:.2f}s, median of {args.runs}")
+    print(f"sequential:              {before:.3f}s")
+    print(f"concurrent:              {after:.3f}s ({before / after:.2f}x)")
+    
+    # "visualize" predicts abstract art, the reply then asks for dragons
+    miss_agent = SleepAgent(args.llm, "thinking about dragons")
+    for miss_timeout in (10.0, 0.5):
+        missed = PersonalityEngine(
+            ollama_agent=miss_agent, ascii_art=SleepArt(args.art), art_timeout=10, art_miss_timeout=miss_timeout
+        )
+        drawn = []
+        latency = timed(lambda: drawn.append(missed.generate_response("visualize")[1] is not None))
+        print(
+            f"mispredicted, wait {miss_timeout:>4.1f}s: {latency:.3f}s "
+            f"(art kept {sum(drawn)}/{len(drawn)}, sequential {timed(lambda: sequential(missed, 'visualize')):.3f}s)"
+        )
+
+if __name__ == "__main__":
+    main()
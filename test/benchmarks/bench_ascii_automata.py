@@ -0,0 +1,80 @@
+"""Microbenchmark: ASCII art automata, per-cell Python loops vs whole-grid stencils
+
+Usage: PYTHONPATH=. python test/benchmarks/bench_ascii_automata.py
+"""
+import argparse
+import timeit
+
+import numpy as np
+
+from src.agent.personality.templates.default.automata import diffusion_step, life_step, render_rows
+
+def loop_cellular_automata(grid: np.ndarray, steps: int):
+    """The generator's previous implementation"""
+    height, width = grid.shape
+    for _ in range(steps):
+        new_grid = grid.copy()
+        for y in range(1, height-1):
+            for x in range(1, width-1):
+                neighbors = np.sum(grid[y-1:y+2, x-1:x+2]) - grid[y,x]
+                if grid[y,x] == 1:
+                    if neighbors < 2 or neighbors > 3:
+                        new_grid[y,x] = 0
+                else:
+                    if neighbors == 3:
+                        new_grid[y,x] = 1
+        grid = new_grid
+    return [''.join({0: ' ', 1: '█'}[cell] for cell in row) for row in grid]
+
+def loop_reaction_diffusion(grid: np.ndarray, steps: int):
+    """The generator's previous implementation"""
+    height, width = grid.shape
+    chars = " ░▒▓█"
+    for _ in range(steps):
+        new_grid = grid.copy()
+        for y in range(1, height-1):
+            for x in range(1, width-1):
+                neighbors_avg = np.mean([grid[y-1:y+2, x-1:x+2]])
+                new_grid[y,x] += 0.2 * (neighbors_avg - grid[y,x])
+        grid = new_grid
+    return [''.join(chars[int(val * (len(chars) - 1))] for val in row) for row in grid]
+
+def stencil_cellular_automata(grid: np.ndarray, steps: int):
+    for _ in range(steps):
+        grid = life_step(grid)
+    return render_rows(grid, " █")
+
+def stencil_reaction_diffusion(grid: np.ndarray, steps: int):
+    chars = " ░▒▓█"
+    for _ in range(steps):
+        grid = diffusion_step(grid, 0.2)
+    return render_rows((grid * (len(chars) - 1)).astype(int), chars)
+
+def best(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    # generate_art's usual size, then get_art_size("full") on a 250x70 terminal
+    cases = [("art 50x30", 50, 30, 5), ("full 216x54", 216, 54, 5), ("full 216x54, 100 steps", 216, 54, 100)]
+    for label, width, height, steps in cases:
+        cells = rng.choice([0, 1], size=(height, width), p=[0.7, 0.3])
+        values = rng.random((height, width))
+        assert loop_cellular_automata(cells, 1) == stencil_cellular_automata(cells, 1)
+        
+        loop_steps = min(steps, 5)
+        for name, loop, stencil, grid in (
+            ("cellular automata", loop_cellular_automata, stencil_cellular_automata, cells),
+            ("reaction-diffusion", loop_reaction_diffusion, stencil_reaction_diffusion, values)
+        ):
+            # Loops are timed for at most 5 steps and scaled, they take seconds otherwise
+            before = best(lambda: loop(grid, loop_steps), args.repeat) * steps / loop_steps
+            after = best(lambda: stencil(grid, steps), args.repeat)
+            print(f"{label:24s} {name:18s} loops {before * 1e3:9.2f} ms   stencil {after * 1e3:7.2f} ms   ({before / after:6.0f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Microbenchmark: PersonalityEngine keyword scans, per-table loops vs KeywordMatcher
+
+Usage: PYTHONPATH=. python test/benchmarks/bench_personality_matcher.py
+"""
+import argparse
+import random
+import timeit
+
+from src.agent.personality.engine import (
+    ART_TRIGGERS, INTEREST_KEYWORDS, MOOD_KEYWORDS, TEMPERATURE_KEYWORDS, PersonalityEngine
+)
+
+MENTIONS = [
+    "@jeff what if the universe is just a simulation running on $SOL validators",
+    "gm ser, can you draw me a picture of a cyber monk meditating",
+    "explain quantum entanglement like I'm five lol",
+    "wen moon? the probability matrix shows... nothing",
+    "your code aura suggests you need to touch grass",
+    "how do I fix my git history after a force push",
+]
+
+def per_table_scan(engine: PersonalityEngine, message: str):
+    """The engine's previous behaviour: one lower() and one loop per table"""
+    hits = set()
+    for bucket, words in TEMPERATURE_KEYWORDS.items():
+        if any(word in message.lower() for word in words):
+            hits.add(f"temp:{bucket}")
+    if any(trigger in message.lower() for trigger in ART_TRIGGERS):
+        hits.add("art")
+    if any(word in message.lower() for word in INTEREST_KEYWORDS):
+        hits.add("interests")
+    for name, framework in engine.response_frameworks.items():
+        if any(pattern.lower() in message.lower() for pattern in framework["patterns"]):
+            hits.add(f"framework:{name}")
+    for name, aspect in engine.personality_matrix.items():
+        if any(trigger in message.lower() for trigger in aspect["triggers"]):
+            hits.add(f"aspect:{name}")
+    for mood, words in MOOD_KEYWORDS.items():
+        if any(word in message.lower() for word in words):
+            hits.add(f"mood:{mood}")
+    return hits
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    args = parser.parse_args()
+    
+    engine = PersonalityEngine()
+    rng = random.Random(0)
+    messages = [rng.choice(MENTIONS) + " " + str(i) for i in range(args.messages)]
+    for message in messages[:200]:
+        assert per_table_scan(engine, message) == engine.matcher.match(message)
+        
+    loops = min(timeit.repeat(lambda: [per_table_scan(engine, m) for m in messages], number=1, repeat=5))
+    matcher = min(timeit.repeat(lambda: [engine.matcher.match(m) for m in messages], number=1, repeat=5))
+    build = min(timeit.repeat(engine.definition._build_matcher, number=1, repeat=5))
+    print(f"{args.messages} mentions")
+    print(f"per-table scans: {loops / args.messages * 1e6:8.2f} us/message")
+    print(f"KeywordMatcher:  {matcher / args.messages * 1e6:8.2f} us/message ({loops / matcher:.1f}x)")
+    print(f"matcher build:   {build * 1e3:8.2f} ms once per definition")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark the in-process VectorIndex against a Chroma collection
+
+Usage: PYTHONPATH=. python test/benchmarks/bench_vector_index.py --sizes 10000 100000 1000000
+"""
+import argparse
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from src.memory.chroma.queries.vector_index import VectorIndex
+
+def timed(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+def bench(n: int, dim: int, k: int, queries: int, clusters: int, users: int, chroma: bool, chroma_max: int):
+    # Embeddings cluster by topic, so sample around random centres rather than
+    # uniformly; uniform high-dimensional noise has no structure for IVF to use
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32) * 3
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, n)
+    for s in range(0, n, 65536):
+        vectors[s:s + 65536] += centres[labels[s:s + 65536]]
+    ids = [f"v{i}" for i in range(n)]
+    query_set = centres[rng.integers(0, clusters, queries)] + rng.standard_normal((queries, dim), dtype=np.float32)
+    row = {"n": n}
+    
+    index = VectorIndex(dim=dim, initial_capacity=n)
+    metadatas = [{"user_id": f"user{i % users}"} for i in range(n)]
+    start = time.perf_counter()
+    index.add(ids, vectors, metadatas=metadatas)
+    row["index_load_s"] = time.perf_counter() - start
+    row["exact_ms"] = timed(lambda: [index.search(q, k) for q in query_set], 1) / queries
+    
+    # One user's rows out of `users`: through the partition map, then with it
+    # disabled so the where clause is evaluated row by row
+    where = {"user_id": "user1"}
+    row["user_ms"] = timed(lambda: [index.search(q, k, where=where) for q in query_set], 1) / queries
+    index.partition_field = None
+    row["user_scan_ms"] = timed(lambda: [index.search(q, k, where=where) for q in query_set], 1) / queries
+    index.partition_field = "user_id"
+    
+    start = time.perf_counter()
+    index.train()
+    row["train_s"] = time.perf_counter() - start
+    row["ivf_ms"] = timed(lambda: [index.search(q, k, exact=False) for q in query_set], 1) / queries
+    truth = [{r["id"] for r in index.search(q, k)} for q in query_set]
+    approx = [{r["id"] for r in index.search(q, k, exact=False)} for q in query_set]
+    row["ivf_recall"] = sum(len(t & a) for t, a in zip(truth, approx)) / (k * queries)
+    
+    if chroma and n <= chroma_max:
+        with tempfile.TemporaryDirectory() as path:
+            client = chromadb.PersistentClient(path=path)
+            collection = client.create_collection("bench")
+            start = time.perf_counter()
+            for s in range(0, n, 5000):
+                collection.add(ids=ids[s:s + 5000], embeddings=vectors[s:s + 5000].tolist())
+            row["chroma_load_s"] = time.perf_counter() - start
+            row["chroma_ms"] = timed(
+                lambda: [collection.query(query_embeddings=[q.tolist()], n_results=k) for q in query_set], 1
+            ) / queries
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--users", type=int, default=1000, help="Distinct user_id values for the filtered search")
+    parser.add_argument("--no-chroma", action="store_true", help="Only benchmark the local index")
+    parser.add_argument("--chroma-max", type=int, default=1000000, help="Skip Chroma above this size")
+    args = parser.parse_args()
+    
+    columns = ["n", "index_load_s", "exact_ms", "user_ms", "user_scan_ms", "train_s", "ivf_ms", "ivf_recall", "chroma_load_s", "chroma_ms"]
+    print(" ".join(f"{c:>13}" for c in columns))
+    for n in args.sizes:
+        row = bench(
+            n, args.dim, args.k, args.queries, args.clusters, args.users, not args.no_chroma, args.chroma_max
+        )
+        print(" ".join(
+            f"{row[c]:>13.3f}" if isinstance(row.get(c), float) else f"{row.get(c, '-'):>13}"
+            for c in columns
+        ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Recall versus size report for the quantized VectorIndex storage modes
+
+Usage: PYTHONPATH=. python test/benchmarks/report_quantization.py --n 100000
+       PYTHONPATH=. python test/benchmarks/report_quantization.py --chroma-path ./data/chromadb --collection conversations
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.memory.chroma.queries.vector_index import VectorIndex
+
+def synthetic(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32) * 3
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    labels = rng.integers(0, clusters, n)
+    for s in range(0, n, 65536):
+        vectors[s:s + 65536] += centres[labels[s:s + 65536]]
+    return vectors
+
+def from_chroma(path: str, name: str) -> np.ndarray:
+    import chromadb
+    collection = chromadb.PersistentClient(path=path).get_collection(name)
+    index = VectorIndex()
+    index.load_from_collection(collection)
+    return index._decoded().copy()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--chroma-path", help="Use the embeddings of a real Chroma collection")
+    parser.add_argument("--collection", default="conversations")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--subvectors", type=int, nargs="+", default=[16, 32, 64, 96])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[1, 4, 10])
+    args = parser.parse_args()
+    
+    if args.chroma_path:
+        vectors = from_chroma(args.chroma_path, args.collection)
+    else:
+        vectors = synthetic(args.n, args.dim, args.clusters)
+    n, dim = vectors.shape
+    ids = [str(i) for i in range(n)]
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(n, min(args.queries, n), replace=False)]
+    queries = queries + rng.standard_normal(queries.shape, dtype=np.float32) * 0.1
+    
+    def full_precision(wanted):
+        return {i: vectors[int(i)] for i in wanted}
+        
+    exact = VectorIndex(dim=dim, initial_capacity=n)
+    exact.add(ids, vectors)
+    truth = [{r["id"] for r in exact.search(q, args.k)} for q in queries]
+    
+    configs = [("none", None), ("int8", None)] + [("pq", m) for m in args.subvectors if dim % m == 0]
+    print(f"{n} vectors x {dim} dims, recall@{args.k} over {len(queries)} queries")
+    print(f"{'mode':>8} {'bytes/vec':>10} {'index MB':>9} " + " ".join(f"{'r=' + str(r):>7} {'ms':>6}" for r in args.rerank))
+    for mode, m in configs:
+        index = VectorIndex(
+            dim=dim,
+            initial_capacity=n,
+            quantization=mode,
+            subvectors=m or 32,
+            full_precision=full_precision
+        )
+        index.add(ids, vectors)
+        index.fit_quantizer()
+        cells = []
+        for rerank in args.rerank:
+            index.rerank = rerank
+            start = time.perf_counter()
+            found = [{r["id"] for r in index.search(q, args.k)} for q in queries]
+            ms = (time.perf_counter() - start) / len(queries) * 1000
+            recall = sum(len(t & f) for t, f in zip(truth, found)) / (args.k * len(queries))
+            cells.append(f"{recall:>7.3f} {ms:>6.2f}")
+        label = mode if m is None else f"pq{m}"
+        print(f"{label:>8} {index.bytes_per_vector():>10.1f} {index.memory_bytes() / 2 ** 20:>9.1f} " + " ".join(cells))
+
+if __name__ == "__main__":
+    main()
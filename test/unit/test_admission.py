@@ -0,0 +1,108 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from src.agent.llm.ollama.client import OllamaClient
+from src.agent.llm.ollama.utils.rate_limiter import AdmissionController, AdmissionRejected, Priority, controller_for
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
+
+
+def test_caps_in_flight_and_serves_priority_order():
+    controller = AdmissionController(initial_limit=1, max_limit=1)
+    controller.acquire()
+    
+    order = []
+    
+    def worker(priority, name):
+        controller.acquire(priority)
+        order.append(name)
+        controller.release(0.01)
+        
+    threads = [
+        threading.Thread(target=worker, args=(Priority.TRAINING, "training")),
+        threading.Thread(target=worker, args=(Priority.BACKGROUND, "background")),
+        threading.Thread(target=worker, args=(Priority.INTERACTIVE, "interactive")),
+    ]
+    for thread in threads:
+        thread.start()
+        wait_for(lambda: controller.metrics()["queue_depth"] == threads.index(thread) + 1)
+        
+    assert controller.metrics()["queue_depth_by_priority"] == {
+        "interactive": 1, "background": 1, "training": 1
+    }
+    controller.release(0.01)
+    for thread in threads:
+        thread.join(timeout=2)
+        
+    assert order == ["interactive", "background", "training"]
+    assert controller.metrics()["in_flight"] == 0
+
+
+def test_aimd_limit_adapts_to_latency():
+    controller = AdmissionController(initial_limit=4, min_limit=1, max_limit=8, target_latency=1.0)
+    
+    for _ in range(20):
+        controller.acquire()
+        controller.release(0.1)
+    assert controller.current_limit > 4
+    
+    grown = controller.limit
+    controller.acquire()
+    controller.release(5.0)
+    assert controller.limit == pytest.approx(grown / 2)
+    assert controller.metrics()["congestion_events"] == 1
+
+
+def test_rejects_when_queue_full_or_wait_times_out():
+    controller = AdmissionController(initial_limit=1, max_limit=1, max_queue=0)
+    controller.acquire()
+    with pytest.raises(AdmissionRejected):
+        controller.acquire()
+        
+    controller = AdmissionController(initial_limit=1, max_limit=1)
+    controller.acquire()
+    with pytest.raises(AdmissionRejected):
+        controller.acquire(timeout=0.05)
+        
+    metrics = controller.metrics()
+    assert metrics["timeouts"] == 1
+    assert metrics["queue_depth"] == 0
+    
+    # Slot frees up normally once the holder releases
+    controller.release(0.01)
+    assert controller.acquire(timeout=0.05) == 0.0
+
+
+def test_client_generate_goes_through_admission():
+    controller = AdmissionController(initial_limit=1, max_limit=1)
+    client = OllamaClient(admission=controller)
+    client.session = MagicMock()
+    client.session.post.return_value.json.return_value = {"response": "ok"}
+    
+    assert client.generate("hi", priority=Priority.BACKGROUND) == "ok"
+    assert "priority" not in client.session.post.call_args.kwargs["json"]["options"]
+    assert controller.metrics()["admitted"] == 1
+    assert controller.metrics()["in_flight"] == 0
+    
+    controller.acquire()
+    controller.queue_timeout = 0.05
+    assert client.generate("hi") is None
+
+
+def test_clients_of_one_host_share_a_controller():
+    first = OllamaClient(host="http://ollama-a:11434")
+    second = OllamaClient(host="http://ollama-a:11434/")
+    other = OllamaClient(host="http://ollama-b:11434")
+    
+    assert first.admission is second.admission
+    assert first.admission is controller_for("http://ollama-a:11434")
+    assert other.admission is not first.admission
+    assert OllamaClient().admission is OllamaClient().admission
@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from src.agent.personality.engine import PersonalityEngine
+
+
+class SlowAgent:
+    def __init__(self, delay, reply="here you go"):
+        self.delay = delay
+        self.reply = reply
+        
+    def generate_response(self, prompt, **kwargs):
+        time.sleep(self.delay)
+        return self.reply
+
+
+class SlowArt:
+    def __init__(self, delay):
+        self.delay = delay
+        self.subjects = []
+        
+    def generate_art(self, subject):
+        self.subjects.append(subject)
+        time.sleep(self.delay)
+        return f"<{subject}>"
+
+
+def test_art_renders_while_llm_generates():
+    art = SlowArt(0.3)
+    engine = PersonalityEngine(ollama_agent=SlowAgent(0.3), ascii_art=art, art_timeout=5)
+    started = time.monotonic()
+    response, drawing = engine.generate_response("draw a cat")
+    elapsed = time.monotonic() - started
+    assert drawing == "<cat>"
+    assert "cat" in response
+    assert elapsed < 0.5
+    assert engine.context.last_art == "cat"
+
+
+def test_late_art_is_dropped():
+    engine = PersonalityEngine(ollama_agent=SlowAgent(0.0), ascii_art=SlowArt(1.0), art_timeout=0.05)
+    started = time.monotonic()
+    response, drawing = engine.generate_response("draw a cat")
+    assert time.monotonic() - started < 0.5
+    assert drawing is None
+    assert response == "Here you go"
+    assert engine.art_timeouts == 1
+    assert engine.context.last_art is None
+
+
+def test_subject_from_reply_rerenders():
+    art = SlowArt(0.0)
+    engine = PersonalityEngine(ollama_agent=SlowAgent(0.0, "thinking about dragons"), ascii_art=art, art_timeout=5)
+    _, drawing = engine.generate_response("visualize")
+    assert drawing == "<dragons>"
+    assert art.subjects == ["abstract", "dragons"]
+    assert engine.art_mispredictions == 1
+
+
+def test_mispredicted_render_is_cancelled():
+    art = SlowArt(0.0)
+    engine = PersonalityEngine(ollama_agent=SlowAgent(0.0, "thinking about dragons"), ascii_art=art, art_timeout=5)
+    engine._art_pool = ThreadPoolExecutor(max_workers=1)
+    # Keep the only worker busy so the predicted render is still queued
+    engine._art_pool.submit(time.sleep, 0.2)
+    
+    _, drawing = engine.generate_response("visualize")
+    assert drawing == "<dragons>"
+    assert art.subjects == ["dragons"]
+
+
+class StyledArt(SlowArt):
+    def styles_for(self, subject):
+        return ["dream"] if subject.startswith(("abstract", "dream")) else []
+
+
+def test_alias_of_predicted_subject_keeps_its_render():
+    art = StyledArt(0.0)
+    engine = PersonalityEngine(ollama_agent=SlowAgent(0.0, "thinking about dreams"), ascii_art=art, art_timeout=5)
+    _, drawing = engine.generate_response("visualize")
+    assert drawing == "<abstract>"
+    assert art.subjects == ["abstract"]
+    assert engine.art_mispredictions == 0
+    assert engine._same_art("a cat", "cats")
+    assert not engine._same_art("cat", "dragons")
+
+
+def test_mispredicted_render_gets_the_shorter_wait():
+    engine = PersonalityEngine(
+        ollama_agent=SlowAgent(0.0, "thinking about dragons"),
+        ascii_art=SlowArt(0.3),
+        art_timeout=5,
+        art_miss_timeout=0.05
+    )
+    started = time.monotonic()
+    _, drawing = engine.generate_response("visualize")
+    assert time.monotonic() - started < 0.25
+    assert drawing is None
+    assert (engine.art_mispredictions, engine.art_timeouts) == (1, 1)
@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+from aiohttp import web
+from src.agent.llm.ollama.async_client import AsyncOllamaClient
+from src.agent.llm.ollama.utils.vectors import l2_normalize
+
+
+class FakeOllama:
+    """Local aiohttp app speaking the subset of the Ollama API we use"""
+    
+    def __init__(self, delay: float = 0.0, batch_embed: bool = True):
+        self.delay = delay
+        self.batch_embed = batch_embed
+        self.embed_calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        
+    async def generate(self, request):
+        data = await request.json()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if not data.get("stream"):
+                return web.json_response({"response": f"echo: {data['prompt']}", "done": True})
+                
+            response = web.StreamResponse()
+            await response.prepare(request)
+            for word in data["prompt"].split():
+                await response.write(json.dumps({"response": word, "done": False}).encode() + b"\n")
+            await response.write(json.dumps({"response": "", "done": True}).encode() + b"\n")
+            await response.write_eof()
+            return response
+        finally:
+            self.in_flight -= 1
+            
+    async def embeddings(self, request):
+        data = await request.json()
+        return web.json_response({"embedding": [float(len(data["prompt"])), 1.0]})
+        
+    async def embed(self, request):
+        if not self.batch_embed:
+            raise web.HTTPNotFound()
+        self.embed_calls += 1
+        data = await request.json()
+        return web.json_response({"embeddings": [[float(len(text)), 1.0] for text in data["input"]]})
+
+
+async def start_fake_ollama(fake: FakeOllama):
+    app = web.Application()
+    app.router.add_post("/api/generate", fake.generate)
+    app.router.add_post("/api/embeddings", fake.embeddings)
+    app.router.add_post("/api/embed", fake.embed)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def make_client(host: str, **kwargs) -> AsyncOllamaClient:
+    return AsyncOllamaClient(
+        generate_endpoint=f"{host}/api/generate",
+        embeddings_endpoint=f"{host}/api/embeddings",
+        embed_endpoint=f"{host}/api/embed",
+        **kwargs
+    )
+
+
+def test_generate_and_embeddings():
+    async def run():
+        runner, host = await start_fake_ollama(FakeOllama())
+        try:
+            async with make_client(host) as client:
+                assert await client.generate("hi") == "echo: hi"
+                assert await client.get_embeddings("abc") == l2_normalize([3.0, 1.0])
+        finally:
+            await runner.cleanup()
+            
+    asyncio.run(run())
+
+
+def test_generate_stream():
+    async def run():
+        runner, host = await start_fake_ollama(FakeOllama())
+        try:
+            async with make_client(host) as client:
+                tokens = [token async for token in client.generate_stream("one two three")]
+                assert tokens == ["one", "two", "three"]
+        finally:
+            await runner.cleanup()
+            
+    asyncio.run(run())
+
+
+def test_concurrency_cap():
+    async def run():
+        fake = FakeOllama(delay=0.05)
+        runner, host = await start_fake_ollama(fake)
+        try:
+            async with make_client(host, max_concurrency=3) as client:
+                results = await asyncio.gather(*(client.generate(f"msg {i}") for i in range(12)))
+            assert results == [f"echo: msg {i}" for i in range(12)]
+            assert fake.max_in_flight == 3
+        finally:
+            await runner.cleanup()
+            
+    asyncio.run(run())
+
+
+def test_timeout_returns_none():
+    async def run():
+        runner, host = await start_fake_ollama(FakeOllama(delay=0.5))
+        try:
+            async with make_client(host) as client:
+                assert await client.generate("slow", timeout=0.05) is None
+        finally:
+            await runner.cleanup()
+            
+    asyncio.run(run())
+
+
+def test_embeddings_batch():
+    async def run():
+        for batch_embed in (True, False):
+            fake = FakeOllama(batch_embed=batch_embed)
+            runner, host = await start_fake_ollama(fake)
+            try:
+                async with make_client(host) as client:
+                    texts = ["a" * i for i in range(1, 8)]
+                    embeddings = await client.get_embeddings_batch(texts, batch_size=3)
+                    assert embeddings == [l2_normalize([float(i), 1.0]) for i in range(1, 8)]
+                    assert client.batch_embed_supported is batch_embed
+                    assert fake.embed_calls == (3 if batch_embed else 0)
+            finally:
+                await runner.cleanup()
+                
+    asyncio.run(run())
@@ -0,0 +1,53 @@
+import numpy as np
+
+from src.agent.personality.templates.default.automata import (
+    diffusion_step, life_step, neighborhood_sum, render_rows
+)
+
+
+def loop_life_step(grid):
+    new_grid = grid.copy()
+    for y in range(1, grid.shape[0] - 1):
+        for x in range(1, grid.shape[1] - 1):
+            neighbors = np.sum(grid[y-1:y+2, x-1:x+2]) - grid[y, x]
+            if grid[y, x] == 1:
+                if neighbors < 2 or neighbors > 3:
+                    new_grid[y, x] = 0
+            elif neighbors == 3:
+                new_grid[y, x] = 1
+    return new_grid
+
+
+def loop_diffusion_step(grid):
+    new_grid = grid.copy()
+    for y in range(1, grid.shape[0] - 1):
+        for x in range(1, grid.shape[1] - 1):
+            new_grid[y, x] += 0.2 * (np.mean(grid[y-1:y+2, x-1:x+2]) - grid[y, x])
+    return new_grid
+
+
+def test_life_step_matches_per_cell_rules():
+    rng = np.random.default_rng(0)
+    grid = rng.choice([0, 1], size=(23, 41), p=[0.7, 0.3])
+    expected = grid
+    for _ in range(5):
+        grid = life_step(grid)
+        expected = loop_life_step(expected)
+        assert np.array_equal(grid, expected)
+
+
+def test_diffusion_step_matches_per_cell_mean():
+    grid = np.random.default_rng(1).random((17, 29))
+    expected = grid
+    for _ in range(5):
+        grid = diffusion_step(grid, 0.2)
+        expected = loop_diffusion_step(expected)
+    assert np.allclose(grid, expected)
+    assert grid.min() >= 0 and grid.max() < 1
+
+
+def test_small_grids_and_rendering():
+    tiny = np.ones((2, 5), dtype=int)
+    assert neighborhood_sum(tiny).shape == (0, 3)
+    assert np.array_equal(life_step(tiny), tiny)
+    assert render_rows(np.array([[0, 1], [1, 0]]), " █") == [" █", "█ "]
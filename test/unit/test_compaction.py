@@ -0,0 +1,122 @@
+import time
+
+import pytest
+from src.memory.chroma.queries.compaction import MemoryCompactor
+from src.memory.chroma.queries.retrieval import HybridRetriever
+from src.memory.chroma.queries.storage import MemoryManager
+
+
+@pytest.fixture
+def memory(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHROMA_DB_PATH", str(tmp_path / "chromadb"))
+    return MemoryManager(write_behind=False)
+
+
+def add_rows(memory, user_id, count, age, thread_id=None):
+    ts = time.time() - age
+    for i in range(count):
+        memory.conversations.add(
+            documents=[f"USER: {user_id} message {i} {thread_id}"],
+            embeddings=[[1.0, float(i), 0.0]],
+            metadatas=[{
+                "user_id": user_id,
+                "timestamp": "2024-01-01T00:00:00",
+                "ts": ts + i,
+                "message_count": 2,
+                **({"thread_id": thread_id} if thread_id else {})
+            }],
+            ids=[f"{user_id}_{thread_id}_{age}_{i}"]
+        )
+
+
+def make_compactor(memory, **kwargs):
+    summaries = []
+    
+    def summarize(text):
+        summaries.append(text)
+        return f"summary of {text.count('USER:')} rows from {text.splitlines()[0]}"
+        
+    def embed_batch(texts):
+        return [[0.0, 0.0, 1.0] for _ in texts]
+        
+    options = {"min_age": 3600, "max_rows": 1000, "segment_size": 4}
+    options.update(kwargs)
+    return MemoryCompactor(memory, summarize, embed_batch, **options), summaries
+
+
+def test_old_rows_fold_into_summary_segments(memory):
+    add_rows(memory, "alice", 8, age=7200)
+    add_rows(memory, "alice", 3, age=0)
+    add_rows(memory, "bob", 1, age=7200)
+    retriever = HybridRetriever(memory)
+    compactor, summaries = make_compactor(memory)
+    
+    assert compactor.run_once() == {"segments": 2, "removed": 8}
+    rows = memory.conversations.get(where={"user_id": "alice"}, include=["metadatas"])
+    kinds = sorted(m.get("kind", "raw") for m in rows["metadatas"])
+    assert kinds == ["raw", "raw", "raw", "summary", "summary"]
+    assert [m["source_rows"] for m in rows["metadatas"] if m.get("kind") == "summary"] == [4, 4]
+    # bob's single old row has nothing to merge with
+    assert memory.conversations.count() == 6
+    
+    # The lexical index dropped the superseded rows too
+    found = {r["id"] for r in retriever.search("message", mode="lexical", user_id="alice", limits=10)}
+    assert len(found) == 5
+    assert not any(row_id.startswith("alice_None_7200_") for row_id in found)
+    
+    # Two summaries are fewer than segment_size, so they stay as they are
+    assert compactor.run_once() == {"segments": 0, "removed": 0}
+
+
+def test_size_policy_compacts_recent_rows_and_keeps_threads_apart(memory):
+    add_rows(memory, "alice", 6, age=0, thread_id="t1")
+    add_rows(memory, "alice", 6, age=0, thread_id="t2")
+    compactor, summaries = make_compactor(memory, max_rows=8, segment_size=6)
+    
+    stats = compactor.compact_user("alice")
+    assert stats["removed"] >= 6
+    assert memory.conversations.count() <= 8
+    assert all(("t1" in text) != ("t2" in text) for text in summaries)
+
+
+def test_failed_summary_keeps_source_rows(memory):
+    add_rows(memory, "alice", 4, age=7200)
+    compactor = MemoryCompactor(memory, lambda text: None, lambda texts: [], min_age=3600, segment_size=4)
+    
+    assert compactor.run_once() == {"segments": 0, "removed": 0}
+    assert memory.conversations.count() == 4
+    assert compactor.stats()["failed_segments"] == 1
+
+
+def test_summaries_fold_into_higher_levels(memory):
+    add_rows(memory, "alice", 8, age=7200)
+    compactor, summaries = make_compactor(memory, segment_size=2)
+    
+    counts = []
+    for _ in range(4):
+        compactor.run_once()
+        counts.append(memory.conversations.count())
+    assert counts == [4, 2, 1, 1]
+    top = memory.conversations.get(include=["metadatas"])["metadatas"][0]
+    assert top["level"] == 3 and top["message_count"] == 16
+
+
+def test_select_matches_run_by_run_policy(memory):
+    compactor, _ = make_compactor(memory, min_age=100, max_rows=7, segment_size=3)
+    rows = [
+        {"id": str(i), "text": "", "metadata": {"ts": float(i), "thread_id": f"t{i % 3 // 2}"}}
+        for i in range(40)
+    ] + [{"id": "s", "text": "", "metadata": {"ts": 0.0, "kind": "summary"}}]
+    
+    # Fold one more row at a time, as the size policy is defined
+    raw = rows[:-1]
+    count = 5
+    while count < len(raw) and len(rows) - sum(len(run) - 1 for run in compactor._runs(raw[:count])) > 7:
+        count += 1
+    assert compactor._select(rows, now=105.0) == raw[:count]
+    
+    many = [{"id": str(i), "text": "", "metadata": {"ts": float(i)}} for i in range(50000)]
+    started = time.monotonic()
+    # Even folding every row leaves more than max_rows, so all are selected
+    assert len(compactor._select(many, now=0.0)) == 50000
+    assert time.monotonic() - started < 1.0
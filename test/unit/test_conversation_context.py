@@ -0,0 +1,40 @@
+import pytest
+
+from src.agent.personality.engine import ConversationContext, Exchange
+
+
+def test_keeps_only_the_last_capacity_exchanges():
+    context = ConversationContext(capacity=3)
+    for i in range(10):
+        context.add_exchange(f"q{i}", f"a{i}")
+    assert [e.user for e in context.history] == ["q7", "q8", "q9"]
+    assert context.get_context_string() == "User: q7\nAssistant: a7\nUser: q8\nAssistant: a8\nUser: q9\nAssistant: a9"
+
+
+def test_rendering_matches_old_format_and_is_cached():
+    context = ConversationContext()
+    assert context.get_context_string() == ""
+    context.add_exchange("draw a cat", "here you go", art="cat")
+    rendered = context.get_context_string()
+    assert rendered == "User: draw a cat\n[Generated ASCII art about: cat]\nAssistant: here you go"
+    assert context.get_context_string() is rendered
+    assert context.last_art == "cat"
+    
+    context.add_exchange("thanks", "np")
+    assert context.get_context_string().endswith("User: thanks\nAssistant: np")
+    assert context.last_art == "cat"
+
+
+def test_exchange_supports_dict_style_access():
+    exchange = Exchange("hi", "gm")
+    assert not hasattr(exchange, "__dict__")
+    assert exchange["user"] == "hi"
+    assert exchange.get("art") is None
+    assert exchange.get("missing", 1) == 1
+    with pytest.raises(KeyError):
+        exchange["missing"]
+        
+    context = ConversationContext()
+    assert context.get_last_exchange() is None
+    context.add_exchange("hi", "gm")
+    assert context.get_last_exchange()["response"] == "gm"
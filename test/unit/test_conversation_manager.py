@@ -0,0 +1,107 @@
+import pytest
+from src.agent.context import conversation_manager
+
+
+class FakeAgent:
+    def __init__(self):
+        self.embedded = []
+        self.sessions = {}
+        
+    def get_embeddings(self, text):
+        self.embedded.append(text)
+        return [1.0, float(len(text) % 7), 0.0]
+        
+    def get_embeddings_batch(self, texts):
+        return [self.get_embeddings(t) for t in texts]
+        
+    def summarize(self, text):
+        return None
+        
+    def generate_response(self, message, context=None, session_id="default", **kwargs):
+        self.sessions.setdefault(session_id, [])
+        return f"reply to {message}"
+        
+    def generate_response_stream(self, message, context=None, session_id="default", **kwargs):
+        self.sessions.setdefault(session_id, [])
+        yield "streamed "
+        yield "reply"
+        
+    def has_session(self, session_id):
+        return session_id in self.sessions
+        
+    def seed_session(self, session_id, history):
+        self.sessions.setdefault(session_id, list(history))
+        
+    def reset_session(self, session_id):
+        self.sessions.pop(session_id, None)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHROMA_DB_PATH", str(tmp_path / "chromadb"))
+    monkeypatch.setenv("SESSION_STORE_PATH", str(tmp_path / "sessions.db"))
+    monkeypatch.setenv("MEMORY_WRITE_BEHIND", "false")
+    monkeypatch.setattr(conversation_manager, "OllamaAgent", FakeAgent)
+    return conversation_manager.ConversationManager()
+
+
+def test_each_exchange_is_embedded_once_and_stored_once(manager):
+    for i in range(3):
+        assert manager.generate_response("alice", f"question {i}") == f"reply to question {i}"
+        
+    # One embedding per turn: the query embedding is reused to store the exchange
+    assert manager.agent.embedded == ["question 0", "question 1", "question 2"]
+    assert manager.memory.conversations.count() == 3
+    assert len(manager.active_conversations.get("alice")) == 6
+
+
+def test_lexical_turn_embeds_the_exchange_once(manager):
+    assert "".join(manager.generate_response_stream("alice", "$SOL")) == "streamed reply"
+    
+    assert manager.agent.embedded == ["USER: $SOL\nASSISTANT: streamed reply"]
+    assert manager.memory.conversations.count() == 1
+
+
+def test_clear_conversation_is_not_undone_by_rehydration(manager):
+    manager.generate_response("alice", "secret plans")
+    manager.clear_conversation("alice")
+    
+    manager.generate_response("alice", "fresh start")
+    history = [m.content for m in manager.active_conversations.get("alice")]
+    assert history == ["fresh start", "reply to fresh start"]
+
+
+def test_lexical_index_is_opt_in_for_large_collections(manager, monkeypatch):
+    manager.generate_response("alice", "first question")
+    monkeypatch.setenv("MEMORY_LEXICAL_INDEX_MAX_ROWS", "0")
+    large = conversation_manager.ConversationManager()
+    assert large.retriever is None
+    
+    # Without the lexical index even ticker-only queries go through vector search
+    assert large.embed_query("$SOL") is not None
+    assert "first question" in large.get_context("alice", "question")
+    
+    monkeypatch.setenv("MEMORY_LEXICAL_INDEX", "true")
+    assert conversation_manager.ConversationManager().retriever is not None
+
+
+def test_resumed_user_gets_stored_history_once(manager):
+    manager.generate_response("alice", "first question")
+    
+    # A restarted process has neither the agent session nor the resident history
+    restarted = conversation_manager.ConversationManager()
+    calls = []
+    rehydrate = restarted.active_conversations.rehydrate
+    restarted.active_conversations.rehydrate = lambda user_id: calls.append(user_id) or rehydrate(user_id)
+    
+    restarted.generate_response("alice", "second question")
+    restarted.generate_response("alice", "third question")
+    assert calls == ["alice"]
+    assert restarted.agent.sessions["alice"] == [
+        {"role": "user", "content": "first question"},
+        {"role": "assistant", "content": "reply to first question"}
+    ]
+    
+    # New users are looked up once too, not again when their exchange is stored
+    restarted.generate_response("bob", "hello")
+    assert calls == ["alice", "bob"]
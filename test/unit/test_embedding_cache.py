@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock
+
+from src.agent.llm.ollama.client import OllamaClient
+from src.agent.llm.ollama.utils.embedding_cache import EmbeddingCache
+
+
+def test_lru_eviction_and_stats():
+    cache = EmbeddingCache("jeff", max_entries=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a") == [1.0]  # "a" becomes most recently used
+    cache.put("c", [3.0])
+    
+    assert cache.get("b") is None
+    assert cache.get("c") == [3.0]
+    
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["memory_entries"] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache("jeff", max_entries=8, db_path=db_path)
+    cache.put("hello", [0.1, 0.2, 0.3])
+    cache.close()
+    
+    reopened = EmbeddingCache("jeff", max_entries=8, db_path=db_path)
+    assert reopened.get("hello") == [0.1, 0.2, 0.3]
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_model_change_invalidates(tmp_path):
+    db_path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache("jeff", db_path=db_path)
+    cache.put("hello", [1.0])
+    cache.close()
+    
+    other_model = EmbeddingCache("mistral", db_path=db_path)
+    assert other_model.get("hello") is None
+    other_model.put("hello", [2.0])
+    other_model.close()
+    
+    # Opening the file for another model does not purge this one's rows
+    assert EmbeddingCache("jeff", db_path=db_path).get("hello") == [1.0]
+    assert EmbeddingCache("mistral", db_path=db_path).get("hello") == [2.0]
+    
+    cache = EmbeddingCache("jeff")
+    cache.put("hello", [1.0])
+    cache.set_model("mistral")
+    assert cache.get("hello") is None
+
+
+def test_put_many_commits_once(tmp_path):
+    db_path = str(tmp_path / "embeddings.sqlite3")
+    cache = EmbeddingCache("jeff", max_entries=8, db_path=db_path)
+    commits = []
+    real_db = cache._db
+    cache._db = MagicMock(wraps=real_db)
+    cache._db.commit.side_effect = lambda: commits.append(real_db.commit())
+    cache.put_many([("a", [1.0]), ("b", [2.0]), ("c", [3.0])])
+    assert len(commits) == 1
+    cache._db = real_db
+    cache.close()
+    
+    reopened = EmbeddingCache("jeff", db_path=db_path)
+    assert [reopened.get(t) for t in "abc"] == [[1.0], [2.0], [3.0]]
+
+
+def test_client_serves_repeated_text_from_cache():
+    client = OllamaClient(embedding_cache=EmbeddingCache("jeff", max_entries=16))
+    client.session = MagicMock()
+    client.session.post.return_value.json.return_value = {"embedding": [0.6, 0.8]}
+    
+    assert client.get_embeddings("same text") == [0.6, 0.8]
+    assert client.get_embeddings("same text") == [0.6, 0.8]
+    assert client.session.post.call_count == 1
+    
+    client.session.post.return_value.status_code = 404
+    embeddings = client.get_embeddings_batch(["same text", "new text", "new text"])
+    assert embeddings == [[0.6, 0.8]] * 3
+    # One failed /api/embed probe, then only the uncached text is embedded once
+    assert client.session.post.call_count == 3
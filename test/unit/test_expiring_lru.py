@@ -0,0 +1,40 @@
+from src.utils.expiring_lru import ExpiringLRU
+
+
+def test_evicts_least_recently_used_and_idle_entries(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("src.utils.expiring_lru.time.time", lambda: clock[0])
+    evicted = []
+    cache = ExpiringLRU(2, ttl=60, on_evict=lambda key, value: evicted.append(key))
+    
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert evicted == ["b"]
+    assert cache.peek("b") is None
+    
+    clock[0] += 120
+    cache.set("d", 4)
+    assert evicted == ["b", "a", "c"]
+    assert list(cache) == ["d"]
+    assert (cache.lru_evictions, cache.ttl_evictions) == (2, 1)
+    assert cache.pop("d") == 4 and len(cache) == 0
+
+
+def test_stale_entry_misses_on_get(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("src.utils.expiring_lru.time.time", lambda: clock[0])
+    evicted = []
+    cache = ExpiringLRU(10, ttl=60, on_evict=lambda key, value: evicted.append((key, value)))
+    cache.set("a", 1)
+    cache.set("b", 2)
+    
+    clock[0] += 30
+    assert cache.get("b") == 2
+    clock[0] += 45
+    # "a" has been idle for 75s, "b" only for 45s
+    assert cache.get("a") is None
+    assert evicted == [("a", 1)]
+    assert cache.get("b") == 2
+    assert cache.ttl_evictions == 1 and list(cache) == ["b"]
@@ -0,0 +1,53 @@
+import random
+
+from src.agent.personality.engine import ART_TRIGGERS, TEMPERATURE_KEYWORDS, PersonalityEngine
+from src.agent.personality.matcher import KeywordMatcher
+
+
+def naive(tables, text):
+    text = text.lower()
+    return {category for category, words in tables.items() if any(w.lower() in text for w in words)}
+
+
+def test_overlapping_and_prefix_keywords_are_all_found():
+    tables = {"short": ["art"], "long": ["artist"], "inner": ["tis"], "phrase": ["what if"]}
+    matcher = KeywordMatcher(tables)
+    assert matcher.match("The ARTIST said: what if") == {"short", "long", "inner", "phrase"}
+    assert matcher.match("start") == {"short"}
+    assert matcher.match("") == set()
+
+
+def test_matches_naive_substring_scan_on_random_text():
+    tables = dict(TEMPERATURE_KEYWORDS)
+    tables["art"] = ART_TRIGGERS
+    matcher = KeywordMatcher(tables)
+    rng = random.Random(0)
+    vocabulary = [w for words in tables.values() for w in words] + ["gm", "ser", "wen", "moon", "x"]
+    for _ in range(500):
+        text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 8)))
+        text = "".join(c.upper() if rng.random() < 0.2 else c for c in text)
+        assert matcher.match(text) == naive(tables, text)
+
+
+def test_engine_uses_single_pass_hits():
+    engine = PersonalityEngine()
+    hits = engine.matcher.match("imagine: the silicon spirits whisper... about quantum memes")
+    assert {"temp:creative", "temp:abstract", "art", "framework:tech_shaman",
+            "aspect:quantum_jester", "aspect:meme_necromancer"} <= hits
+    assert engine._select_framework("the silicon spirits whisper...", hits) is engine.response_frameworks["tech_shaman"]
+    assert engine._should_generate_art("please draw a cat")
+    assert not engine._should_generate_art("gm")
+
+    engine.context.add_exchange("deep thoughts", "ok")
+    assert engine._generate_mood_matrix() == "intellectual"
+
+
+def test_generate_response_survives_braces_in_message():
+    class Agent:
+        def generate_response(self, prompt, **kwargs):
+            return "ok {not a placeholder}"
+
+    engine = PersonalityEngine(ollama_agent=Agent())
+    response, art = engine.generate_response("what is {this}?")
+    assert response.startswith("Ok")
+    assert art is None
@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta
+
+import pytest
+from src.memory.chroma.queries.storage import MemoryManager
+
+
+@pytest.fixture
+def memory(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHROMA_DB_PATH", str(tmp_path / "chromadb"))
+    return MemoryManager(write_behind=False)
+
+
+def exchange(text):
+    return [{"role": "user", "content": text}, {"role": "assistant", "content": "ok"}]
+
+
+def test_search_is_scoped_to_user(memory):
+    memory.store_conversation("alice", exchange("alice likes dogs"), [1.0, 0.0, 0.0])
+    memory.store_conversation("bob", exchange("bob likes dogs"), [1.0, 0.0, 0.0])
+    memory.store_conversation("bob", exchange("bob likes cats"), [0.9, 0.1, 0.0])
+    
+    results = memory.search_conversations([1.0, 0.0, 0.0], limit=5, user_id="alice")
+    assert [r["metadata"]["user_id"] for r in results] == ["alice"]
+    
+    assert len(memory.search_conversations([1.0, 0.0, 0.0], limit=5)) == 3
+
+
+def test_search_by_thread_and_time_window(memory):
+    memory.store_conversation("alice", exchange("thread one"), [1.0, 0.0, 0.0], thread_id="t1")
+    memory.store_conversation("alice", exchange("thread two"), [1.0, 0.0, 0.0], thread_id="t2")
+    
+    results = memory.search_conversations([1.0, 0.0, 0.0], user_id="alice", thread_id="t2")
+    assert [r["metadata"]["thread_id"] for r in results] == ["t2"]
+    
+    future = datetime.now() + timedelta(hours=1)
+    assert memory.search_conversations([1.0, 0.0, 0.0], since=future) == []
+    assert len(memory.search_conversations([1.0, 0.0, 0.0], until=future)) == 2
+
+
+def test_backfill_adds_numeric_timestamp(memory):
+    memory.conversations.add(
+        documents=["USER: legacy"],
+        embeddings=[[1.0, 0.0, 0.0]],
+        metadatas=[{"user_id": "alice", "timestamp": "2024-01-01T12:00:00", "message_count": 2}],
+        ids=["conv_legacy"]
+    )
+    assert memory.backfill_conversation_metadata() == 1
+    assert memory.backfill_conversation_metadata() == 0
+    
+    results = memory.search_conversations([1.0, 0.0, 0.0], until=datetime(2024, 6, 1))
+    assert [r["text"] for r in results] == ["USER: legacy"]
+
+
+def test_write_behind_batches_off_request_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHROMA_DB_PATH", str(tmp_path / "chromadb"))
+    memory = MemoryManager(write_behind=True)
+    memory.write_buffer.flush_interval = 60
+    
+    for i in range(5):
+        memory.store_conversation("alice", exchange(f"message {i}"), [1.0, float(i), 0.0])
+    memory.store_facts(["fact a", "fact b"], "test", [[0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    
+    assert memory.write_stats()["pending"] == 7
+    assert memory.conversations.count() == 0
+    
+    assert memory.flush(timeout=5)
+    stats = memory.write_stats()
+    assert stats["pending"] == 0
+    assert stats["written"] == 7
+    assert memory.conversations.count() == 5
+    assert memory.facts.count() == 2
+    memory.close()
+
+
+def test_write_behind_flushes_on_close(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHROMA_DB_PATH", str(tmp_path / "chromadb"))
+    memory = MemoryManager(write_behind=True)
+    memory.store_fact("persist me", "test", [1.0, 0.0, 0.0])
+    memory.close()
+    assert memory.facts.count() == 1
+
+
+def test_replayed_writes_are_idempotent(memory):
+    for _ in range(3):
+        memory.store_conversation("alice", exchange("same words"), [1.0, 0.0, 0.0])
+        memory.store_fact("the sky is blue", "test", [0.0, 1.0, 0.0])
+    memory.store_conversation("bob", exchange("same words"), [1.0, 0.0, 0.0])
+    memory.store_facts(["a", "a", "b"], "test", [[1.0, 0.0, 0.0]] * 3)
+    
+    assert memory.conversations.count() == 2
+    assert memory.facts.count() == 3
+
+
+def test_dedupe_collapses_legacy_rows(memory):
+    memory.conversations.add(
+        documents=["USER: hi", "USER: hi", "USER: other"],
+        embeddings=[[1.0, 0.0, 0.0]] * 3,
+        metadatas=[
+            {"user_id": "alice", "timestamp": "2024-01-01T12:00:00"},
+            {"user_id": "alice", "timestamp": "2024-01-02T12:00:00"},
+            {"user_id": "alice", "timestamp": "2024-01-03T12:00:00"},
+        ],
+        ids=["conv_1", "conv_2", "conv_3"]
+    )
+    memory.facts.add(
+        documents=["fact", "fact"],
+        embeddings=[[0.0, 1.0, 0.0]] * 2,
+        metadatas=[{"source": "a"}, {"source": "b"}],
+        ids=["fact_1", "fact_1_0"]
+    )
+    
+    stats = memory.dedupe(batch_size=2)
+    assert stats["conversations"] == {"scanned": 3, "migrated": 2, "removed": 1}
+    assert stats["facts"]["removed"] == 1
+    
+    rows = memory.conversations.get(include=["metadatas"])
+    assert sorted(rows["ids"]) == sorted([
+        MemoryManager.conversation_id("alice", "USER: hi"),
+        MemoryManager.conversation_id("alice", "USER: other"),
+    ])
+    kept = memory.conversations.get(ids=[MemoryManager.conversation_id("alice", "USER: hi")])
+    assert kept["metadatas"][0]["timestamp"] == "2024-01-02T12:00:00"
+    assert memory.facts.count() == 1
+    
+    assert memory.dedupe()["conversations"] == {"scanned": 2, "migrated": 0, "removed": 0}
+
+
+def test_search_merges_collections_by_score(memory):
+    memory.store_conversation("alice", exchange("near"), [1.0, 0.0, 0.0])
+    memory.store_conversation("bob", exchange("other user"), [1.0, 0.0, 0.0])
+    memory.store_fact("close fact", "test", [0.9, 0.1, 0.0])
+    memory.store_fact("far fact", "test", [0.0, 0.0, 1.0])
+    
+    results = memory.search(
+        [1.0, 0.0, 0.0],
+        collections=["conversations", "facts"],
+        limits={"conversations": 2, "facts": 1},
+        user_id="alice"
+    )
+    assert [r["collection"] for r in results] == ["conversations", "facts"]
+    assert results[1]["text"] == "close fact"
+    assert results[0]["score"] >= results[1]["score"]
+    
+    assert {r["collection"] for r in memory.search([1.0, 0.0, 0.0], collections=["facts"])} == {"facts"}
+
+
+def test_recent_conversations_reads_pending_writes_without_flushing(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHROMA_DB_PATH", str(tmp_path / "chromadb"))
+    memory = MemoryManager(write_behind=True)
+    memory.write_buffer.flush_interval = 60
+    memory.conversations.add(
+        documents=["USER: stored"],
+        embeddings=[[1.0, 0.0, 0.0]],
+        metadatas=[{"user_id": "alice", "ts": datetime.now().timestamp() - 60}],
+        ids=["conv_stored"]
+    )
+    for i in range(3):
+        memory.store_conversation("alice", exchange(f"pending {i}"), [1.0, 0.0, 0.0])
+    memory.store_conversation("bob", exchange("not alice"), [1.0, 0.0, 0.0])
+    
+    recent = memory.recent_conversations("alice", limit=3)
+    assert memory.write_stats()["pending"] == 4
+    assert [r["text"].split("\n")[0] for r in recent] == ["USER: pending 0", "USER: pending 1", "USER: pending 2"]
+    assert len(memory.recent_conversations("alice", limit=10)) == 4
+    memory.close()
+
+
+class Listener:
+    def __init__(self):
+        self.upserted = []
+        
+    def on_upsert(self, collection, ids, documents, metadatas):
+        self.upserted.extend(ids)
+        
+    def on_delete(self, collection, ids):
+        pass
+
+
+def test_dropped_writes_do_not_reach_side_indexes(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHROMA_DB_PATH", str(tmp_path / "chromadb"))
+    memory = MemoryManager(write_behind=True, local_index=["conversations", "facts"])
+    memory.write_buffer.flush_interval = 60
+    listener = Listener()
+    memory.add_listener(listener)
+    
+    # Only the first write fits, the rest are dropped under backpressure
+    memory.write_buffer.max_pending = 1
+    memory.write_buffer.put_timeout = 0.0
+    memory.store_conversation("alice", exchange("kept"), [1.0, 0.0, 0.0])
+    memory.store_conversation("alice", exchange("dropped"), [1.0, 0.0, 0.0])
+    memory.store_facts(["dropped fact"], "test", [[0.0, 1.0, 0.0]])
+    
+    assert memory.write_stats()["dropped"] == 2
+    assert len(listener.upserted) == 1
+    assert len(memory.local_indexes["conversations"]) == 1
+    assert len(memory.local_indexes["facts"]) == 0
+    memory.close()
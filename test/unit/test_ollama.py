@@ -0,0 +1,292 @@
+import json
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from src.agent.llm.ollama.client import OllamaClient, OllamaAgent
+from src.agent.llm.ollama.utils.vectors import l2_normalize
+
+
+class FakeStreamResponse:
+    """Minimal stand-in for a streamed requests.Response"""
+    
+    def __init__(self, chunks):
+        self.lines = [json.dumps(chunk).encode() for chunk in chunks]
+        self.closed = False
+        self.lines_read = 0
+        
+    def raise_for_status(self):
+        pass
+        
+    def iter_lines(self):
+        for line in self.lines:
+            self.lines_read += 1
+            yield line
+            
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def stream_chunks():
+    return [
+        {"response": "Hello", "done": False},
+        {"response": " there", "done": False},
+        {"response": " friend", "done": False},
+        {"response": "", "done": True, "eval_count": 3},
+    ]
+
+
+@pytest.fixture
+def streaming_client(stream_chunks):
+    client = OllamaClient()
+    client.session = MagicMock()
+    client.session.post.return_value = FakeStreamResponse(stream_chunks)
+    return client
+
+
+def test_generate_stream_yields_tokens(streaming_client):
+    tokens = list(streaming_client.generate_stream("hi"))
+    assert tokens == ["Hello", " there", " friend"]
+    
+    payload = streaming_client.session.post.call_args.kwargs["json"]
+    assert payload["stream"] is True
+    assert streaming_client.session.post.call_args.kwargs["stream"] is True
+    assert streaming_client.session.post.return_value.closed
+
+
+def test_generate_stream_early_close(streaming_client):
+    stream = streaming_client.generate_stream("hi")
+    assert next(stream) == "Hello"
+    stream.close()
+    
+    response = streaming_client.session.post.return_value
+    assert response.closed
+    assert response.lines_read == 1
+
+
+def test_generate_stream_cancel_event(streaming_client):
+    cancel = threading.Event()
+    tokens = []
+    for token in streaming_client.generate_stream("hi", cancel_event=cancel):
+        tokens.append(token)
+        cancel.set()
+        
+    assert tokens == ["Hello"]
+    assert streaming_client.session.post.return_value.closed
+
+
+def test_agent_stream_records_history(streaming_client):
+    agent = OllamaAgent()
+    agent.client = streaming_client
+    
+    tokens = list(agent.generate_response("hi", stream=True))
+    assert "".join(tokens) == "Hello there friend"
+    assert agent.conversation_history[-1] == {"role": "assistant", "content": "Hello there friend"}
+
+
+def test_agent_stream_partial_history(streaming_client):
+    agent = OllamaAgent()
+    agent.client = streaming_client
+    
+    stream = agent.generate_response_stream("hi")
+    next(stream)
+    stream.close()
+    assert agent.conversation_history[-1]["content"] == "Hello"
+
+
+def test_agent_stream_fallback_on_error():
+    agent = OllamaAgent()
+    agent.client.session = MagicMock()
+    agent.client.session.post.side_effect = ConnectionError("ollama down")
+    
+    tokens = list(agent.generate_response_stream("hi"))
+    assert tokens == ["I apologize, I'm having trouble generating a response right now."]
+    assert agent.conversation_history == []
+
+
+class FakeJSONResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+            
+    def json(self):
+        return self.payload
+
+
+def fake_vector(text):
+    return [float(len(text)), 1.0]
+
+
+def fake_embedding_post(batch_supported):
+    """Like Ollama, /api/embed returns unit vectors and /api/embeddings raw ones"""
+    def post(url, json=None, **kwargs):
+        if url.endswith("/api/embed"):
+            if not batch_supported:
+                return FakeJSONResponse({}, status_code=404)
+            return FakeJSONResponse({"embeddings": [l2_normalize(fake_vector(text)) for text in json["input"]]})
+        return FakeJSONResponse({"embedding": fake_vector(json["prompt"])})
+    return post
+
+
+def test_embeddings_batch_uses_embed_endpoint():
+    client = OllamaClient()
+    client.session = MagicMock()
+    client.session.post.side_effect = fake_embedding_post(batch_supported=True)
+    
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+    embeddings = client.get_embeddings_batch(texts, batch_size=2)
+    assert [e == pytest.approx(l2_normalize(fake_vector(t))) for e, t in zip(embeddings, texts)] == [True] * 5
+    assert client.session.post.call_count == 3
+    assert client.batch_embed_supported is True
+
+
+def test_embeddings_batch_falls_back_to_fan_out():
+    client = OllamaClient()
+    client.session = MagicMock()
+    client.session.post.side_effect = fake_embedding_post(batch_supported=False)
+    
+    texts = [f"text {'x' * i}" for i in range(10)]
+    assert client.get_embeddings_batch(texts) == [l2_normalize(fake_vector(t)) for t in texts]
+    assert client.batch_embed_supported is False
+    
+    # Subsequent batches skip the missing endpoint entirely
+    client.session.post.reset_mock()
+    client.get_embeddings_batch(["one", "two"])
+    assert all(call.args[0].endswith("/api/embeddings") for call in client.session.post.call_args_list)
+
+
+def fake_generate_post(context_limit=None):
+    """Fake /api/generate that grows the KV context by one token per prompt word"""
+    def post(url, json=None, **kwargs):
+        context = list(json.get("context", []))
+        if context_limit is not None and len(context) > context_limit:
+            return FakeJSONResponse({"error": "context too long"}, status_code=500)
+        prompt_tokens = len(json["prompt"].split())
+        return FakeJSONResponse({
+            "response": f"reply {len(context)}",
+            "context": context + [1] * (prompt_tokens + 2),
+            "prompt_eval_count": prompt_tokens,
+            "done": True
+        })
+    return post
+
+
+def test_session_mode_reuses_kv_context():
+    agent = OllamaAgent(session_mode=True)
+    agent.client.session = MagicMock()
+    agent.client.session.post.side_effect = fake_generate_post()
+    
+    agent.generate_response("first message here")
+    agent.generate_response("second message")
+    
+    first, second = [call.kwargs["json"] for call in agent.client.session.post.call_args_list]
+    assert "context" not in first
+    assert second["context"]
+    # Only the new turn is sent, not the re-serialized history
+    assert "first message here" not in second["prompt"]
+    
+    stats = agent.session_stats()
+    assert stats["turns"] == 2
+    assert stats["reused_turns"] == 1
+    assert stats["reused_context_tokens"] == len(second["context"])
+
+
+def test_session_mode_rebuilds_near_num_ctx():
+    agent = OllamaAgent(session_mode=True)
+    agent.client.session = MagicMock()
+    agent.client.session.post.side_effect = fake_generate_post()
+    
+    agent.generate_response("one two three four five six seven eight")
+    # Simulate a context that has grown close to num_ctx
+    agent.kv_sessions.peek("default").context = [1] * 4000
+    agent.generate_response("again")
+    
+    last = agent.client.session.post.call_args.kwargs["json"]
+    assert "context" not in last
+    assert "one two three" in last["prompt"]
+    assert agent.session_stats()["rebuilds"] == 1
+
+
+def test_session_mode_falls_back_when_context_rejected():
+    agent = OllamaAgent(session_mode=True)
+    agent.client.session = MagicMock()
+    agent.client.session.post.side_effect = fake_generate_post(context_limit=0)
+    
+    agent.generate_response("hello")
+    assert agent.generate_response("again") == "reply 0"
+    retry = agent.client.session.post.call_args.kwargs["json"]
+    assert "context" not in retry
+    assert "USER: hello" in retry["prompt"]
+
+
+def test_sessions_are_isolated():
+    agent = OllamaAgent(session_mode=True)
+    agent.client.session = MagicMock()
+    agent.client.session.post.side_effect = fake_generate_post()
+    
+    agent.generate_response("hello", session_id="alice")
+    agent.generate_response("hello", session_id="bob")
+    assert agent.session_stats("alice")["turns"] == 1
+    assert agent.session_stats("bob")["reused_turns"] == 0
+    
+    agent.reset_session("alice")
+    assert agent.session_stats("alice")["turns"] == 0
+
+
+def test_history_is_kept_per_session():
+    for session_mode in (False, True):
+        agent = OllamaAgent(session_mode=session_mode)
+        agent.client.session = MagicMock()
+        agent.client.session.post.side_effect = fake_generate_post()
+        
+        agent.generate_response("my password is hunter2", session_id="bob")
+        agent.generate_response("hello", session_id="alice")
+        alice_prompt = agent.client.session.post.call_args.kwargs["json"]["prompt"]
+        assert "hunter2" not in alice_prompt
+        
+        agent.generate_response("again", session_id="bob")
+        if not session_mode:
+            assert "hunter2" in agent.client.session.post.call_args.kwargs["json"]["prompt"]
+        assert agent.conversation_history == []
+
+
+def test_sessions_are_bounded():
+    agent = OllamaAgent()
+    agent.kv_sessions.max_entries = 3
+    agent.client.session = MagicMock()
+    agent.client.session.post.side_effect = fake_generate_post()
+    
+    for i in range(10):
+        agent.generate_response("hi", session_id=f"user{i}")
+    assert len(agent.kv_sessions) == 3
+    assert list(agent.kv_sessions) == ["user7", "user8", "user9"]
+
+
+def test_single_and_batch_embeddings_share_one_space():
+    batch_client = OllamaClient()
+    batch_client.session = MagicMock()
+    batch_client.session.post.side_effect = fake_embedding_post(batch_supported=True)
+    single_client = OllamaClient()
+    single_client.session = MagicMock()
+    single_client.session.post.side_effect = fake_embedding_post(batch_supported=True)
+    
+    batched = batch_client.get_embeddings_batch(["some words"])[0]
+    single = single_client.get_embeddings("some words")
+    assert single == pytest.approx(batched)
+    assert sum(x * x for x in single) == pytest.approx(1.0)
+
+
+def test_seed_session_only_starts_missing_sessions():
+    agent = OllamaAgent()
+    assert not agent.has_session("alice")
+    agent.seed_session("alice", [{"role": "user", "content": "earlier"}])
+    assert agent.has_session("alice")
+    assert agent.kv_sessions.peek("alice").history == [{"role": "user", "content": "earlier"}]
+    
+    agent.seed_session("alice", [])
+    assert len(agent.kv_sessions.peek("alice").history) == 1
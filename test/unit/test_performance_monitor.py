@@ -0,0 +1,70 @@
+import json
+from unittest.mock import MagicMock
+
+from src.agent.llm.ollama.client import OllamaClient
+from src.agent.llm.ollama.utils.performance_monitor import PerformanceMonitor
+
+
+def ollama_result(eval_count=50, eval_seconds=1.0, prompt_count=100, prompt_seconds=0.5):
+    return {
+        "response": "ok",
+        "load_duration": 10_000_000,
+        "prompt_eval_count": prompt_count,
+        "prompt_eval_duration": int(prompt_seconds * 1e9),
+        "eval_count": eval_count,
+        "eval_duration": int(eval_seconds * 1e9),
+    }
+
+
+def test_percentiles_and_tokens_per_second():
+    monitor = PerformanceMonitor(window=100)
+    for i in range(1, 101):
+        monitor.record("jeff", "generate", i / 100, ollama_result())
+    monitor.record("jeff", "generate", 0.0, error=True)
+
+    stats = monitor.summary()["jeff generate"]
+    assert stats["calls"] == 101
+    assert stats["errors"] == 1
+    assert stats["total_seconds"]["p50"] == 0.5
+    assert stats["total_seconds"]["p95"] == 0.95
+    assert stats["total_seconds"]["p99"] == 0.99
+    assert stats["eval_tokens_per_second"]["p50"] == 50.0
+    assert stats["prompt_tokens_per_second"]["p50"] == 200.0
+    assert stats["load_seconds"]["max"] == 0.01
+    assert sum(stats["total_seconds"]["histogram"].values()) == 100
+
+
+def test_rolling_window_and_filters():
+    monitor = PerformanceMonitor(window=10)
+    for _ in range(10):
+        monitor.record("jeff", "generate", 5.0, ollama_result())
+    for _ in range(10):
+        monitor.record("jeff", "generate", 1.0, ollama_result())
+    monitor.record("mistral", "embeddings", 0.1)
+
+    assert monitor.summary(model="jeff")["jeff generate"]["total_seconds"]["max"] == 1.0
+    assert list(monitor.summary(endpoint="embeddings")) == ["mistral embeddings"]
+
+
+def test_json_dump(tmp_path):
+    monitor = PerformanceMonitor()
+    monitor.record("jeff", "generate", 0.2, ollama_result())
+    path = tmp_path / "perf.json"
+    monitor.dump(str(path))
+    report = json.loads(path.read_text())
+    assert report["stats"]["jeff generate"]["eval_tokens"] == 50
+
+
+def test_client_records_calls():
+    monitor = PerformanceMonitor()
+    client = OllamaClient(monitor=monitor)
+    client.session = MagicMock()
+    client.session.post.return_value.json.return_value = ollama_result()
+
+    client.generate("hi")
+    client.session.post.return_value.json.return_value = {"embedding": [1.0]}
+    client.get_embeddings("hi")
+
+    summary = monitor.summary(model=client.model)
+    assert summary[f"{client.model} generate"]["eval_tokens"] == 50
+    assert summary[f"{client.model} embeddings"]["calls"] == 1
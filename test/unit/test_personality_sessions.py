@@ -0,0 +1,88 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.agent.llm.ollama.client import OllamaAgent
+from src.agent.personality.engine import PersonalityEngine, PersonalityState
+from src.agent.personality.session import SessionRegistry
+
+
+class Agent:
+    def generate_response(self, prompt, **kwargs):
+        return "ok"
+
+
+def test_engines_share_one_immutable_definition():
+    first, second = PersonalityEngine(), PersonalityEngine()
+    assert first.definition is second.definition
+    assert first.matcher is second.matcher
+    with pytest.raises(TypeError):
+        first.response_frameworks["new"] = {}
+    with pytest.raises(AttributeError):
+        first.definition.base_prompt = "x"
+    assert isinstance(first.personality_matrix["cyber_monk"]["triggers"], tuple)
+
+
+def test_sessions_keep_separate_context():
+    engine = PersonalityEngine(ollama_agent=Agent())
+    engine.generate_response("hello from alice", session_id="alice")
+    engine.generate_response("hello from bob", session_id="bob")
+    engine.generate_response("hello from default")
+    
+    assert "alice" in engine.session("alice").context.get_context_string()
+    assert "bob" not in engine.session("alice").context.get_context_string()
+    assert engine.context is engine.default_session.context
+    assert "default" in engine.context.get_context_string()
+    assert len(engine.sessions) == 2
+
+
+def test_default_session_attributes_are_writable():
+    engine = PersonalityEngine()
+    engine.chaos_factor = 0.9
+    assert engine.default_session.chaos_factor == 0.9
+    assert isinstance(engine.session("x"), PersonalityState)
+
+
+def test_registry_evicts_lru_and_idle_sessions(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("src.utils.expiring_lru.time.time", lambda: clock[0])
+    registry = SessionRegistry(PersonalityState, max_sessions=2, ttl=60)
+    a = registry.get("a")
+    registry.get("b")
+    assert registry.get("a") is a
+    registry.get("c")
+    assert "b" not in registry and "a" in registry
+    
+    clock[0] += 120
+    registry.get("d")
+    assert len(registry) == 1
+    assert registry.get("a") is not a
+    stats = registry.stats()
+    assert (stats["lru_evictions"], stats["ttl_evictions"]) == (2, 1)
+
+
+def test_session_state_is_small():
+    engine = PersonalityEngine(ollama_agent=Agent())
+    for i in range(20):
+        engine.generate_response(f"message number {i}", session_id="u")
+    assert len(engine.session("u").context.history) == 5
+    assert engine.sessions.stats()["approx_bytes"] < 4096
+
+
+def test_sessions_do_not_share_agent_history():
+    agent = OllamaAgent()
+    prompts = []
+    agent.client = MagicMock()
+    agent.client.generate.side_effect = lambda prompt, **kwargs: prompts.append(prompt) or "ok"
+    engine = PersonalityEngine(ollama_agent=agent, max_sessions=1)
+    
+    engine.generate_response("my secret password is hunter2", session_id="alice")
+    engine.generate_response("hello", session_id="bob")
+    assert "hunter2" in prompts[0]
+    assert "hunter2" not in prompts[1]
+    
+    # alice was evicted for bob, and her agent-side history went with her
+    assert agent.kv_sessions.peek("alice") is None
+    assert agent.kv_sessions.peek("bob") is not None
+    engine.sessions.pop("bob")
+    assert agent.kv_sessions.peek("bob") is None
@@ -0,0 +1,129 @@
+import time
+import pytest
+from src.agent.llm.ollama import client as ollama_client
+from src.agent.llm.ollama.client import OllamaAgent
+from src.agent.llm.ollama.utils.rate_limiter import Priority
+from src.agent.llm.ollama.utils.vectors import l2_normalize
+from src.agent.llm.providers.base import ProviderError
+from src.agent.llm.providers.fake_ollama import FakeOllamaServer
+from src.agent.llm.providers import fallback_provider
+from src.agent.llm.providers.fallback_provider import FallbackProvider
+from src.agent.llm.providers.ollama_provider import OllamaProvider
+
+
+@pytest.fixture
+def servers():
+    started = [FakeOllamaServer(reply=f"from {i}").start() for i in range(3)]
+    yield started
+    for server in started:
+        server.stop()
+
+
+def make_router(servers, **kwargs):
+    providers = [OllamaProvider(server.url, "jeff") for server in servers]
+    return FallbackProvider(providers, **kwargs)
+
+
+def test_ollama_provider_round_trip(servers):
+    provider = OllamaProvider(servers[0].url, "jeff")
+    assert provider.generate("hi") == "from 0"
+    assert provider.get_embeddings("abc") == l2_normalize([3.0, float(sum(map(ord, "abc")) % 97), 1.0])
+    assert provider.health_check()
+
+
+def test_routes_to_lowest_latency_backend(servers):
+    servers[0].delay = 0.15
+    servers[1].delay = 0.15
+    router = make_router(servers, hedge_delay=5.0)
+    
+    # Warm up every backend's latency estimate
+    for _ in range(3):
+        router.generate("hi", priority=Priority.BACKGROUND)
+        
+    servers[2].requests = 0
+    for _ in range(3):
+        assert router.generate("hi", priority=Priority.BACKGROUND) == "from 2"
+    assert servers[2].requests == 3
+
+
+def test_fails_over_and_marks_backend_unhealthy(servers):
+    servers[0].failing = True
+    servers[1].delay = 0.05
+    servers[2].delay = 0.05
+    router = make_router(servers, failure_threshold=1, cooldown=60)
+    
+    assert router.generate("hi", priority=Priority.BACKGROUND) in ("from 1", "from 2")
+    stats = router.stats()["backends"]
+    assert stats[0]["healthy"] is False
+    assert stats[0]["failures"] == 1
+    
+    requests_before = servers[0].requests
+    router.generate("hi", priority=Priority.BACKGROUND)
+    assert servers[0].requests == requests_before
+
+
+def test_hedges_slow_interactive_requests(servers):
+    servers[0].delay = 1.0
+    router = make_router(servers[:2], hedge_delay=0.1)
+    
+    assert router.generate("hi") == "from 1"
+    stats = router.stats()
+    assert stats["hedges"] == 1
+    assert stats["backends"][1]["hedge_wins"] == 1
+
+
+def test_hedge_win_aborts_losing_stream(servers):
+    servers[0].reply = " ".join(["word"] * 40)
+    servers[0].token_delay = 0.05
+    router = make_router(servers[:2], hedge_delay=0.1)
+    
+    assert router.generate("hi") == "from 1"
+    deadline = time.monotonic() + 2.0
+    while servers[0].aborted_streams == 0 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert servers[0].aborted_streams == 1
+    stats = router.stats()
+    assert stats["cancelled"] == 1
+    assert stats["backends"][0]["failures"] == 0
+    assert stats["backends"][0]["healthy"]
+
+
+def test_all_backends_failing_raises(servers):
+    for server in servers:
+        server.failing = True
+    router = make_router(servers)
+    with pytest.raises(ProviderError):
+        router.generate("hi")
+
+
+def test_embeddings_only_use_matching_model(servers):
+    providers = [OllamaProvider(servers[0].url, "jeff"), OllamaProvider(servers[1].url, "tiny")]
+    router = FallbackProvider(providers, tiers=[0, 1], failure_threshold=1)
+    servers[0].failing = True
+    with pytest.raises(ProviderError):
+        router.get_embeddings("abc")
+    assert servers[1].requests == 0
+
+
+def test_agent_generates_through_router(servers):
+    servers[0].failing = True
+    agent = OllamaAgent(session_mode=True, router=make_router(servers, failure_threshold=1))
+    
+    # KV contexts do not carry across backends, so session mode is turned off
+    assert agent.session_mode is False
+    assert agent.generate_response("hi", session_id="alice") in ("from 1", "from 2")
+    assert [m["role"] for m in agent.kv_sessions.peek("alice").history] == ["user", "assistant"]
+    
+    for server in servers:
+        server.failing = True
+    assert agent.generate_response("hi") == "I apologize, I'm having trouble generating a response right now."
+
+
+def test_router_flag_builds_router_from_env(servers, monkeypatch):
+    monkeypatch.setattr(ollama_client, "ROUTER_ENABLED", True)
+    monkeypatch.setattr(fallback_provider, "OLLAMA_HOSTS", [server.url for server in servers[:2]])
+    monkeypatch.setattr(fallback_provider, "MODEL_NAME", "jeff")
+    agent = OllamaAgent()
+    
+    assert [b["name"] for b in agent.router.stats()["backends"]] == [f"jeff@{server.url}" for server in servers[:2]]
+    assert agent.summarize("USER: hi") in ("from 0", "from 1")
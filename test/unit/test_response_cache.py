@@ -0,0 +1,50 @@
+from unittest.mock import MagicMock, patch
+
+from src.agent.llm.ollama.client import OllamaClient
+from src.agent.llm.ollama.utils.response_cache import ResponseCache
+
+
+def test_only_deterministic_requests_are_cached():
+    cache = ResponseCache()
+    cache.put("jeff", "", "Hello", {"temperature": 0.7}, "hi")
+    assert cache.get("jeff", "", "Hello", {"temperature": 0.7}) is None
+
+    cache.put("jeff", "", "Hello", {"temperature": 0}, "hi")
+    assert cache.get("jeff", "", "Hello", {"temperature": 0}) == "hi"
+
+    cache.put("jeff", "", "Hello", {"temperature": 0.9, "seed": 42}, "seeded")
+    assert cache.get("jeff", "", "Hello", {"seed": 42, "temperature": 0.9}) == "seeded"
+    assert cache.get("jeff", "", "Hello", {"seed": 7, "temperature": 0.9}) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["bypassed"] == 1
+
+
+def test_ttl_and_size_bound():
+    cache = ResponseCache(max_entries=2, ttl=10)
+    options = {"temperature": 0}
+    with patch("src.agent.llm.ollama.utils.response_cache.time.monotonic", return_value=100.0):
+        cache.put("jeff", "", "a", options, "A")
+        cache.put("jeff", "", "b", options, "B")
+        cache.put("jeff", "", "c", options, "C")
+        assert cache.get("jeff", "", "a", options) is None
+        assert cache.stats()["evictions"] == 1
+
+    with patch("src.agent.llm.ollama.utils.response_cache.time.monotonic", return_value=111.0):
+        assert cache.get("jeff", "", "b", options) is None
+        assert cache.stats()["expirations"] == 1
+
+
+def test_client_skips_inference_on_hit():
+    client = OllamaClient(response_cache=ResponseCache())
+    client.session = MagicMock()
+    client.session.post.return_value.json.return_value = {"response": "pong"}
+
+    assert client.generate("ping", temperature=0) == "pong"
+    assert client.generate("ping", temperature=0) == "pong"
+    assert client.session.post.call_count == 1
+
+    client.generate("ping")
+    client.generate("ping")
+    assert client.session.post.call_count == 3
@@ -0,0 +1,98 @@
+import pytest
+from src.memory.chroma.queries.retrieval import BM25Index, HybridRetriever, is_lexical_query, tokenize
+from src.memory.chroma.queries.storage import MemoryManager
+
+
+@pytest.fixture
+def memory(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHROMA_DB_PATH", str(tmp_path / "chromadb"))
+    return MemoryManager(write_behind=False)
+
+
+def exchange(text):
+    return [{"role": "user", "content": text}, {"role": "assistant", "content": "ok"}]
+
+
+def test_tokenize_keeps_tags_tickers_and_users_whole():
+    assert tokenize("GM #Solana fam, $SOL to the moon @jeff_bot!") == [
+        "gm", "#solana", "solana", "fam", "$sol", "sol", "to", "the", "moon", "@jeff_bot", "jeff_bot"
+    ]
+    assert is_lexical_query("$SOL #gm")
+    assert not is_lexical_query("what about $SOL")
+
+
+def test_bm25_index_updates_incrementally():
+    index = BM25Index()
+    index.add("a", "solana is fast")
+    index.add("b", "ethereum gas fees")
+    index.add("c", "solana solana validators")
+    assert [r["id"] for r in index.search("solana")] == ["c", "a"]
+    
+    index.add("c", "nothing relevant")
+    index.remove("a")
+    assert index.search("solana") == []
+    assert len(index) == 2
+
+
+def test_lexical_query_skips_embedding(memory):
+    calls = []
+    retriever = HybridRetriever(memory, lambda text: calls.append(text) or [1.0, 0.0, 0.0])
+    memory.store_conversation("alice", exchange("bullish on $SOL today"), [0.0, 1.0, 0.0])
+    memory.store_conversation("alice", exchange("soldering a keyboard"), [1.0, 0.0, 0.0])
+    
+    results = retriever.search("$SOL", user_id="alice")
+    assert calls == []
+    assert [r["text"] for r in results] == ["USER: bullish on $SOL today\nASSISTANT: ok"]
+    assert retriever.search("$SOL", user_id="bob") == []
+
+
+def test_hybrid_search_fuses_both_rankings(memory):
+    memory.store_fact("the sky is blue", "test", [0.0, 1.0, 0.0])
+    memory.store_fact("$BONK launched on solana", "test", [0.0, 0.0, 1.0])
+    memory.store_fact("unrelated", "test", [1.0, 0.0, 0.0])
+    retriever = HybridRetriever(memory, lambda text: [1.0, 0.0, 0.0])
+    assert retriever.stats()["documents"]["facts"] == 3
+    
+    results = retriever.search("what happened with $BONK", collections=["facts"], limits=3)
+    # Lexical and vector each rank a different fact first; the lexical hit also
+    # appears in the vector ranking so it wins the fusion
+    assert results[0]["text"] == "$BONK launched on solana"
+    assert {r["text"] for r in results} == {"$BONK launched on solana", "unrelated", "the sky is blue"}
+    assert retriever.embed_calls == 1
+
+
+def test_dedupe_keeps_lexical_index_in_sync(memory):
+    retriever = HybridRetriever(memory)
+    memory.conversations.add(
+        documents=["USER: #gm", "USER: #gm"],
+        embeddings=[[1.0, 0.0, 0.0]] * 2,
+        metadatas=[{"user_id": "alice", "timestamp": "1"}, {"user_id": "alice", "timestamp": "2"}],
+        ids=["conv_1", "conv_2"]
+    )
+    retriever._load("conversations", memory.conversations)
+    memory.dedupe()
+    assert [r["id"] for r in retriever.search("#gm")] == [MemoryManager.conversation_id("alice", "USER: #gm")]
+
+
+def test_role_prefixes_and_stopwords_are_not_indexed():
+    index = BM25Index()
+    index.add("a", "USER: what is the price of $SOL\nASSISTANT: it is rising", {"user_id": "alice"})
+    assert set(index.doc_freq) == {"price", "$sol", "sol", "rising"}
+    assert index.search("the user") == []
+    
+    index.remove("a")
+    assert index.doc_freq == {} and index.postings == {}
+
+
+def test_user_filter_only_walks_that_users_postings():
+    index = BM25Index()
+    index.add("a1", "solana validators", {"user_id": "alice", "ts": 1.0})
+    index.add("a2", "solana fees", {"user_id": "alice", "ts": 2.0})
+    index.add("b1", "solana solana solana", {"user_id": "bob", "ts": 3.0})
+    assert set(index.postings) == {"alice", "bob"}
+    
+    assert [r["id"] for r in index.search("solana", limit=1)] == ["b1"]
+    assert {r["id"] for r in index.search("solana", where={"user_id": "alice"})} == {"a1", "a2"}
+    where = {"$and": [{"user_id": "alice"}, {"ts": {"$gte": 2.0}}]}
+    assert [r["id"] for r in index.search("solana", where=where)] == ["a2"]
+    assert index.search("solana", where={"user_id": "carol"}) == []
@@ -0,0 +1,99 @@
+import threading
+import time
+
+from src.agent.context.state.conversation_state import Message, SessionStore
+
+
+def test_message_record_is_compact_and_dict_compatible():
+    message = Message("user", "gm", ts=0.0)
+    assert not hasattr(message, "__dict__")
+    assert message["role"] == "user"
+    assert message["content"] == "gm"
+    assert message.to_dict()["timestamp"] == message["timestamp"]
+
+
+def test_lru_eviction_spills_and_rehydrates_from_disk(tmp_path):
+    store = SessionStore(max_sessions=2, db_path=str(tmp_path / "sessions.db"))
+    store.append("alice", "user", "hi")
+    store.append("alice", "assistant", "hello")
+    store.append("bob", "user", "yo")
+    store.append("carol", "user", "hey")
+    
+    assert "alice" not in store
+    assert len(store) == 2
+    assert [m.content for m in store.get("alice")] == ["hi", "hello"]
+    stats = store.stats()
+    assert stats["lru_evictions"] == 2
+    assert stats["disk_rehydrations"] == 1
+    assert stats["sessions"] == 2
+
+
+def test_ttl_eviction_and_message_cap():
+    store = SessionStore(ttl=0.05, max_messages=3)
+    for i in range(5):
+        store.append("alice", "user", str(i))
+    assert [m.content for m in store.get("alice")] == ["2", "3", "4"]
+    
+    time.sleep(0.1)
+    store.append("bob", "user", "new")
+    assert "alice" not in store
+    assert store.stats()["ttl_evictions"] == 1
+
+
+def test_miss_falls_back_to_rehydrate_callback():
+    calls = []
+    
+    def rehydrate(user_id):
+        calls.append(user_id)
+        return [Message("user", "from chroma")] if user_id == "known" else []
+        
+    store = SessionStore(rehydrate=rehydrate)
+    assert store.get("stranger") == []
+    messages = store.append("known", "assistant", "welcome back")
+    assert [m.content for m in messages] == ["from chroma", "welcome back"]
+    assert store.stats()["memory_rehydrations"] == 1
+    
+    store.pop("known")
+    assert "known" not in store
+
+
+def test_close_persists_resident_sessions(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(db_path=path)
+    store.append("alice", "user", "remember me")
+    assert store.stats()["approx_bytes"] > 0
+    store.close()
+    
+    assert [m.content for m in SessionStore(db_path=path).get("alice")] == ["remember me"]
+
+
+def test_pop_keeps_cleared_messages_from_coming_back(tmp_path):
+    old = Message("user", "before clear", ts=time.time() - 10)
+    store = SessionStore(db_path=str(tmp_path / "sessions.db"), rehydrate=lambda user_id: [old])
+    assert [m.content for m in store.get("alice")] == ["before clear"]
+    
+    store.pop("alice")
+    assert store.get("alice") == []
+    assert [m.content for m in store.append("alice", "user", "after clear")] == ["after clear"]
+    
+    # The clear survives a restart when sessions spill to disk
+    restarted = SessionStore(db_path=str(tmp_path / "sessions.db"), rehydrate=lambda user_id: [old])
+    assert restarted.get("alice") == []
+
+
+def test_rehydration_does_not_hold_the_store_lock():
+    results = []
+    
+    def rehydrate(user_id):
+        if user_id == "slow":
+            reader = threading.Thread(target=lambda: results.append(store.get("fast")))
+            reader.start()
+            reader.join(1)
+            results.append(reader.is_alive())
+        return []
+        
+    store = SessionStore(rehydrate=rehydrate)
+    store.append("fast", "user", "hi")
+    store.get("slow")
+    assert results[1] is False
+    assert [m.content for m in results[0]] == ["hi"]
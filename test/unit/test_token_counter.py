@@ -0,0 +1,71 @@
+from src.agent.llm.ollama.utils.prompt_assembler import PromptAssembler
+from src.agent.llm.ollama.utils.token_counter import TokenCounter, estimate_tokens
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("hi there") == 2
+    assert estimate_tokens("hello, world!") == 4
+    assert estimate_tokens("internationalization") == 4
+
+
+def test_missing_tokenizer_falls_back_to_estimate(tmp_path):
+    counter = TokenCounter(tokenizer_file=str(tmp_path / "missing.json"))
+    assert not counter.exact
+    assert counter.count("hi there") == 2
+
+
+def test_truncate_keeps_start_or_end():
+    counter = TokenCounter()
+    text = "one two three four five six"
+    assert counter.truncate(text, 3) == "one two three"
+    assert counter.truncate(text, 2, keep="end") == "five six"
+    assert counter.truncate(text, 100) == text
+
+
+def make_history(exchanges):
+    history = []
+    for i in range(exchanges):
+        history.append({"role": "user", "content": f"question number {i} " + "word " * 20})
+        history.append({"role": "assistant", "content": f"answer number {i} " + "word " * 20})
+    return history
+
+
+def test_assembler_fills_budget_newest_history_first():
+    assembler = PromptAssembler()
+    history = make_history(20)
+    result = assembler.assemble(
+        budget=200,
+        user_input="what now?",
+        system_prompt="You are JEFF.",
+        memory="Previous conversations:\nUSER: hi",
+        history=history
+    )
+
+    assert result.tokens_used <= 200
+    assert result.history_messages > 0
+    assert result.dropped_history_messages == len(history) - result.history_messages
+    assert "answer number 19" in result.prompt
+    assert "question number 0 " not in result.prompt
+    assert result.prompt.endswith("CONTEXT: Previous conversations:\nUSER: hi\nUSER: what now?\nASSISTANT:")
+    assert result.section_tokens["system"] == TokenCounter().count("You are JEFF.")
+
+
+def test_assembler_prioritizes_memory_over_history():
+    assembler = PromptAssembler()
+    result = assembler.assemble(
+        budget=40,
+        user_input="hello",
+        memory="fact " * 100,
+        history=make_history(3)
+    )
+    assert result.history_messages == 0
+    assert "memory" in result.truncated
+    assert result.tokens_used <= 40
+
+
+def test_assembler_always_keeps_user_input():
+    result = PromptAssembler().assemble(budget=8, user_input="tell me " * 50)
+    assert "user_input" in result.truncated
+    assert result.prompt.startswith("me tell me") or result.prompt.startswith("tell me")
+    assert result.tokens_used <= 8
@@ -0,0 +1,149 @@
+import numpy as np
+import pytest
+from src.memory.chroma.queries.vector_index import VectorIndex
+from src.memory.chroma.queries.storage import MemoryManager
+
+
+def random_vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def brute_force(vectors, query, k):
+    distances = ((vectors - query) ** 2).sum(axis=1)
+    return list(np.argsort(distances)[:k])
+
+
+def test_exact_search_matches_brute_force():
+    vectors = random_vectors(500)
+    index = VectorIndex(initial_capacity=8)
+    index.add([f"v{i}" for i in range(500)], vectors)
+    query = random_vectors(1, seed=1)[0]
+    
+    results = index.search(query, k=10)
+    assert [r["id"] for r in results] == [f"v{i}" for i in brute_force(vectors, query, 10)]
+    assert results[0]["distance"] == pytest.approx(((vectors[int(results[0]["id"][1:])] - query) ** 2).sum(), rel=1e-4)
+
+
+def test_upsert_and_delete_keep_rows_consistent():
+    index = VectorIndex()
+    index.add(["a", "b", "c"], [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]], documents=["A", "B", "C"])
+    index.add(["b"], [[5.0, 5.0]], documents=["B2"])
+    assert len(index) == 3
+    
+    assert index.delete(["a", "missing"]) == 1
+    assert "a" not in index
+    results = index.search([5.0, 5.0], k=3)
+    assert [(r["id"], r["text"]) for r in results] == [("b", "B2"), ("c", "C")]
+
+
+def test_where_filter_uses_chroma_operators():
+    index = VectorIndex()
+    index.add(
+        ["a", "b", "c"],
+        [[1.0, 0.0], [1.0, 0.0], [1.0, 0.0]],
+        metadatas=[{"user_id": "alice", "ts": 1.0}, {"user_id": "alice", "ts": 5.0}, {"user_id": "bob", "ts": 5.0}]
+    )
+    where = {"$and": [{"user_id": "alice"}, {"ts": {"$gte": 2.0}}]}
+    assert [r["id"] for r in index.search([1.0, 0.0], k=5, where=where)] == ["b"]
+
+
+def test_user_filter_tracks_rows_through_updates_and_deletes():
+    vectors = random_vectors(300, seed=5)
+    users = [f"u{i % 7}" for i in range(300)]
+    index = VectorIndex()
+    index.add([str(i) for i in range(300)], vectors, metadatas=[{"user_id": u} for u in users])
+    index.delete([str(i) for i in range(0, 300, 3)])
+    index.add(["1"], [vectors[1]], metadatas=[{"user_id": "u6"}])
+    users[1] = "u6"
+    index.train(nlist=4)
+    
+    for user in ("u0", "u6"):
+        expected = [str(i) for i in range(300) if i % 3 and users[i] == user]
+        assert {r["id"] for r in index.search(vectors[2], k=300, where={"user_id": user})} == set(expected)
+        for exact in (True, False):
+            results = index.search(vectors[2], k=5, where={"user_id": user}, exact=exact, nprobe=4)
+            assert [r["metadata"]["user_id"] for r in results] == [user] * 5
+    assert index.search(vectors[2], k=5, where={"user_id": "nobody"}) == []
+
+
+def test_approximate_search_has_high_recall():
+    centers = random_vectors(20, seed=2) * 10
+    labels = np.random.default_rng(3).integers(0, 20, 4000)
+    vectors = centers[labels] + random_vectors(4000, seed=4)
+    index = VectorIndex()
+    index.add([str(i) for i in range(4000)], vectors)
+    index.train(nlist=20)
+    
+    hits = 0
+    for q in range(20):
+        query = vectors[q * 100]
+        exact = {r["id"] for r in index.search(query, k=10)}
+        approx = {r["id"] for r in index.search(query, k=10, exact=False, nprobe=3)}
+        hits += len(exact & approx)
+    assert hits / 200 >= 0.9
+    
+    index.add(["new"], [centers[0]])
+    assert index.search(centers[0], k=1, exact=False, nprobe=1)[0]["id"] == "new"
+
+
+def test_memory_manager_serves_queries_from_local_index(tmp_path, monkeypatch):
+    monkeypatch.setenv("CHROMA_DB_PATH", str(tmp_path / "chromadb"))
+    memory = MemoryManager(write_behind=False)
+    memory.store_fact("stored before the index", "test", [1.0, 0.0, 0.0])
+    
+    indexed = MemoryManager(write_behind=False, local_index=["facts", "conversations"])
+    assert len(indexed.local_indexes["facts"]) == 1
+    indexed.store_fact("near", "test", [0.9, 0.1, 0.0])
+    indexed.store_conversation("alice", [{"role": "user", "content": "hi"}], [1.0, 0.0, 0.0])
+    
+    local = indexed.search_facts([1.0, 0.0, 0.0], limit=2)
+    indexed.local_indexes.clear()
+    remote = indexed.search_facts([1.0, 0.0, 0.0], limit=2)
+    assert [r["id"] for r in local] == [r["id"] for r in remote]
+    assert [r["distance"] for r in local] == pytest.approx([r["distance"] for r in remote], abs=1e-5)
+
+
+def clustered(n, dim=64, seed=5):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((16, dim)).astype(np.float32) * 3
+    return centres[rng.integers(0, 16, n)] + rng.standard_normal((n, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize("quantization", ["int8", "pq"])
+def test_quantized_index_reranks_to_exact_order(quantization):
+    vectors = clustered(2000)
+    ids = [str(i) for i in range(2000)]
+    full = dict(zip(ids, vectors))
+    index = VectorIndex(
+        quantization=quantization,
+        subvectors=16,
+        rerank=16,
+        full_precision=lambda wanted: {i: full[i] for i in wanted}
+    )
+    index.add(ids, vectors)
+    index.fit_quantizer()
+    assert index.encoded
+    
+    hits = 0
+    for q in range(0, 2000, 100):
+        expected = [str(i) for i in brute_force(vectors, vectors[q], 5)]
+        results = index.search(vectors[q], k=5)
+        hits += len(set(expected) & {r["id"] for r in results})
+        assert [r["distance"] for r in results] == sorted(r["distance"] for r in results)
+    assert hits / 100 >= 0.9
+    
+    reference = VectorIndex()
+    reference.add(ids, vectors)
+    assert index.memory_bytes() < reference.memory_bytes() / 3
+
+
+def test_int8_index_supports_delete_and_ivf_without_reranker():
+    vectors = clustered(500)
+    index = VectorIndex(quantization="int8")
+    index.add([str(i) for i in range(500)], vectors)
+    index.delete(["0"])
+    index.train(nlist=8)
+    
+    results = index.search(vectors[1], k=1, exact=False, nprobe=2)
+    assert results[0]["id"] == "1"
+    assert "0" not in {r["id"] for r in index.search(vectors[0], k=10)}
@@ -0,0 +1,99 @@
+import threading
+import time
+
+from src.memory.chroma.queries.write_buffer import WriteBehindBuffer
+
+
+class FakeCollection:
+    def __init__(self, name="conversations", fail_ids=(), delay=0.0):
+        self.name = name
+        self.fail_ids = set(fail_ids)
+        self.delay = delay
+        self.rows = {}
+        self.add_calls = 0
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self.add_calls += 1
+        assert len(set(ids)) == len(ids)
+        time.sleep(self.delay)
+        if self.fail_ids.intersection(ids):
+            raise ValueError("bad record")
+        for doc_id, document in zip(ids, documents):
+            self.rows[doc_id] = document
+
+
+def test_flushes_by_count():
+    collection = FakeCollection()
+    buffer = WriteBehindBuffer(max_batch=10, flush_interval=60)
+    for i in range(10):
+        buffer.enqueue(collection, f"id{i}", f"doc {i}", [1.0], {})
+
+    deadline = time.monotonic() + 2
+    while len(collection.rows) < 10 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(collection.rows) == 10
+    assert collection.add_calls == 1
+    buffer.close()
+
+
+def test_flushes_by_time():
+    collection = FakeCollection()
+    buffer = WriteBehindBuffer(max_batch=100, flush_interval=0.05)
+    buffer.enqueue(collection, "id", "doc", [1.0], {})
+    time.sleep(0.3)
+    assert collection.rows == {"id": "doc"}
+    buffer.close()
+
+
+def test_bad_record_does_not_lose_batch():
+    collection = FakeCollection(fail_ids={"id3"})
+    buffer = WriteBehindBuffer(max_batch=100, flush_interval=60)
+    for i in range(5):
+        buffer.enqueue(collection, f"id{i}", f"doc {i}", [1.0], {})
+    assert buffer.flush(timeout=2)
+
+    stats = buffer.stats()
+    assert stats["written"] == 4
+    assert stats["failed"] == 1
+    assert stats["last_error"] == "bad record"
+    assert "id3" not in collection.rows
+    buffer.close()
+
+
+def test_backpressure_drops_after_timeout():
+    collection = FakeCollection(delay=0.5)
+    buffer = WriteBehindBuffer(max_batch=1, flush_interval=60, max_pending=1, put_timeout=0.05)
+    buffer.enqueue(collection, "a", "doc", [1.0], {})
+    time.sleep(0.05)  # writer picks up "a" and is busy
+    assert buffer.enqueue(collection, "b", "doc", [1.0], {})
+    assert not buffer.enqueue(collection, "c", "doc", [1.0], {})
+    assert buffer.stats()["dropped"] == 1
+    buffer.close()
+    assert set(collection.rows) == {"a", "b"}
+
+
+def test_close_flushes_pending_writes():
+    collection = FakeCollection()
+    buffer = WriteBehindBuffer(max_batch=100, flush_interval=60)
+    threads = [
+        threading.Thread(target=buffer.enqueue, args=(collection, f"id{i}", "doc", [1.0], {}))
+        for i in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    buffer.close()
+    assert len(collection.rows) == 20
+    assert not buffer.enqueue(collection, "late", "doc", [1.0], {})
+
+
+def test_repeated_ids_in_batch_keep_latest():
+    collection = FakeCollection()
+    buffer = WriteBehindBuffer(max_batch=100, flush_interval=60)
+    buffer.enqueue(collection, "id", "first", [1.0], {})
+    buffer.enqueue(collection, "id", "second", [1.0], {})
+    assert buffer.flush(timeout=2)
+    assert collection.rows == {"id": "second"}
+    assert buffer.stats()["written"] == 2
+    buffer.close()